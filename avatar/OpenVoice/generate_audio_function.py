@@ -1,13 +1,25 @@
+import hashlib
+import io
+import json
 import os
 import shutil
+import struct
 import sys
 import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple
 
+import numpy as np
+import soundfile
 import torch
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse, ORJSONResponse
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from melo.api import TTS
 from openvoice.api import ToneColorConverter
 from pydantic import BaseModel
@@ -22,6 +34,7 @@ def _env_or(conf: dict, dotted_key: str, default):
     env_map = {
         "runtime.device": "AUDIO_DEVICE",
         "runtime.language": "AUDIO_LANGUAGE",
+        "runtime.warmup": "AUDIO_WARMUP",
         "paths.ckpt_converter": "AUDIO_CKPT_CONVERTER",
         "paths.output_dir": "AUDIO_OUTPUT_DIR",
         "paths.base_speakers_dir": "AUDIO_BASE_SPEAKERS_DIR",
@@ -31,8 +44,13 @@ def _env_or(conf: dict, dotted_key: str, default):
         "tts.noise_scale": "AUDIO_TTS_NOISE_SCALE",
         "tts.noise_scale_w": "AUDIO_TTS_NOISE_SCALE_W",
         "tts.sdp_ratio": "AUDIO_TTS_SDP_RATIO",
+        "tts.in_memory": "AUDIO_TTS_IN_MEMORY",
+        "tts.watermark": "AUDIO_TTS_WATERMARK",
         "nlp.nltk_auto_download": "AUDIO_NLTK_AUTO",
-        "deps.auto_install_silero_vad": "AUDIO_AUTO_SILERO_VAD"
+        "deps.auto_install_silero_vad": "AUDIO_AUTO_SILERO_VAD",
+        "se_cache.dir": "AUDIO_SE_CACHE_DIR",
+        "se_cache.max_memory_entries": "AUDIO_SE_CACHE_MEMORY_ENTRIES",
+        "se_cache.max_disk_mb": "AUDIO_SE_CACHE_DISK_MB",
         # (defaults.* are not env-overridden by design; keep them in file)
     }
     env_name = env_map.get(dotted_key, "")
@@ -72,8 +90,6 @@ def load_config() -> dict:
     applies env overrides, resolves relative paths against the config dir
     (or this script's dir if config missing).
     """
-    import json
-
     cfg_path = Path(os.getenv("AUDIO_CONFIG", "./audio_config.json")).resolve()
     if cfg_path.exists():
         with cfg_path.open("r", encoding="utf-8") as f:
@@ -95,12 +111,16 @@ def load_config() -> dict:
         "runtime": {
             "device": _env_or(raw, "runtime.device", "auto"),  # auto|cuda|mps|cpu
             "language": _env_or(raw, "runtime.language", "EN_NEWEST"),
+            "warmup": _env_or(raw, "runtime.warmup", True),
         },
         "tts": {
             "speed": _env_or(raw, "tts.speed", 1.0),
             "noise_scale": _env_or(raw, "tts.noise_scale", 0.667),
             "noise_scale_w": _env_or(raw, "tts.noise_scale_w", 0.8),
             "sdp_ratio": _env_or(raw, "tts.sdp_ratio", 0.5),
+            "in_memory": _env_or(raw, "tts.in_memory", True),
+            # false for internal preview renders: skips loading wavmark and embedding the watermark
+            "watermark": _env_or(raw, "tts.watermark", True),
         },
         "nlp": {
             "nltk_auto_download": _env_or(raw, "nlp.nltk_auto_download", True),
@@ -108,6 +128,11 @@ def load_config() -> dict:
         "deps": {
             "auto_install_silero_vad": _env_or(raw, "deps.auto_install_silero_vad", True),
         },
+        "se_cache": {
+            "dir": _resolve(base_dir, _env_or(raw, "se_cache.dir", "./se_cache")),
+            "max_memory_entries": _env_or(raw, "se_cache.max_memory_entries", 16),
+            "max_disk_mb": _env_or(raw, "se_cache.max_disk_mb", 256),
+        },
         "server": {
             "title": (raw.get("server") or {}).get("title", "Service Video-Generation APIs"),
             "version": (raw.get("server") or {}).get("version", "0.1"),
@@ -245,127 +270,518 @@ def _load_tts(language: str, device: str) -> TTS:
     return TTS(language=language, device=device)
 
 
-def _load_converter(ckpt_dir: Path, device: str) -> ToneColorConverter:
+def _load_converter(ckpt_dir: Path, device: str, enable_watermark: bool = True) -> ToneColorConverter:
     cfg_json = ckpt_dir / "config.json"
     pth = ckpt_dir / "checkpoint.pth"
     if not cfg_json.exists() or not pth.exists():
         raise RuntimeError(f"Converter files missing in {ckpt_dir} (need config.json & checkpoint.pth)")
-    conv = ToneColorConverter(str(cfg_json), device=device)
+    conv = ToneColorConverter(str(cfg_json), device=device, enable_watermark=enable_watermark)
     conv.load_ckpt(str(pth))
     return conv
 
 
-def generate_audio(
+# =========================
+# Resident model pool
+# =========================
+
+@dataclass
+class ResidentModels:
+    """Models that stay loaded for the lifetime of the process."""
+    language: str
+    device: str
+    converter: ToneColorConverter
+    tts: TTS
+    # (speaker_key, speaker_id, source_se) in TTS speaker order, only speakers with an SE file
+    speakers: List[Tuple[str, int, torch.Tensor]]
+    load_seconds: Dict[str, float] = field(default_factory=dict)
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def _load_resident_models(language: str, device: str) -> ResidentModels:
+    paths = CFG["paths"]
+    ckpt_converter = Path(paths["ckpt_converter"]).resolve()
+    ses_dir = _speaker_embeddings_dir(Path(paths["base_speakers_dir"]).resolve(), paths["ses_subdir"])
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    converter = _load_converter(ckpt_converter, device, enable_watermark=bool(CFG["tts"]["watermark"]))
+    timings["converter"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tts = _load_tts(language=language, device=device)
+    timings["tts"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    available_ses: Dict[str, Path] = {}
+    for p in _iter_ses_files(ses_dir):
+        available_ses[p.stem.lower().replace("_", "-")] = p
+
+    speakers: List[Tuple[str, int, torch.Tensor]] = []
+    for speaker_key, speaker_id in tts.hps.data.spk2id.items():
+        ses_path = available_ses.get(str(speaker_key).lower().replace("_", "-"))
+        if ses_path is None:
+            continue
+        speakers.append((str(speaker_key), int(speaker_id), torch.load(ses_path, map_location=device)))
+    timings["source_ses"] = time.perf_counter() - t0
+    timings["total"] = sum(timings.values())
+
+    return ResidentModels(
+        language=language,
+        device=device,
+        converter=converter,
+        tts=tts,
+        speakers=speakers,
+        load_seconds=timings,
+    )
+
+
+class ModelPool:
+    """
+    Process-lifetime registry of loaded models keyed by (language, device).
+    Loading happens at most once per key; later requests reuse the resident models.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str], ResidentModels] = {}
+        self._lock = threading.Lock()
+        self._runtime_ready = False
+        self.last_error: Optional[str] = None
+
+    def _prepare_runtime(self) -> None:
+        if self._runtime_ready:
+            return
+        _ensure_nltk(CFG["nlp"]["nltk_auto_download"])
+        _maybe_install_silero_vad(CFG["deps"]["auto_install_silero_vad"])
+        self._runtime_ready = True
+
+    def get(self, language: str, device: str) -> ResidentModels:
+        key = (language, device)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    self._prepare_runtime()
+                    entry = _load_resident_models(language, device)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    raise
+                self._entries[key] = entry
+                self.last_error = None
+                print(f"✓ models resident for {key} in {entry.load_seconds['total']:.2f}s")
+            return entry
+
+    def status(self) -> Dict[str, Any]:
+        entries = list(self._entries.values())
+        return {
+            "state": "warm" if entries else "cold",
+            "entries": [
+                {
+                    "language": e.language,
+                    "device": e.device,
+                    "speakers": [s[0] for s in e.speakers],
+                    "load_seconds": {k: round(v, 3) for k, v in e.load_seconds.items()},
+                    "loaded_at": e.loaded_at.isoformat(),
+                }
+                for e in entries
+            ],
+            "last_error": self.last_error,
+        }
+
+
+MODEL_POOL = ModelPool()
+
+
+# =========================
+# Speaker-embedding cache
+# =========================
+
+class SECache:
+    """
+    Target speaker embeddings keyed by converter version + reference audio content hash.
+    Memory tier: LRU bounded by entry count. Disk tier: LRU (by mtime) bounded by total size.
+    Registered voices live in <dir>/voices and are never evicted.
+    """
+
+    def __init__(self, cache_dir: Path, max_memory_entries: int, max_disk_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.voices_dir = cache_dir / "voices"
+        self.max_memory_entries = max(0, max_memory_entries)
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self._mem: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key_for(audio_path: Path, version: str) -> str:
+        h = hashlib.sha256()
+        with audio_path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return f"{version}_{h.hexdigest()[:32]}"
+
+    def _remember(self, key: str, se: torch.Tensor) -> None:
+        if self.max_memory_entries == 0:
+            return
+        with self._lock:
+            self._mem[key] = se
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory_entries:
+                self._mem.popitem(last=False)
+
+    def _lookup(self, key: str, device: str, registered_only: bool = False) -> Optional[torch.Tensor]:
+        with self._lock:
+            se = self._mem.get(key)
+            if se is not None:
+                self._mem.move_to_end(key)
+                self.hits["memory"] += 1
+                return se
+        paths = [self.voices_dir / f"{key}.pth"]
+        if not registered_only:
+            paths.append(self.cache_dir / f"{key}.pth")
+        for path in paths:
+            if not path.is_file():
+                continue
+            try:
+                se = torch.load(path, map_location=device)
+                os.utime(path)  # refresh LRU position on disk
+            except Exception as e:
+                print(f"[se-cache] unreadable entry {path}: {e}")
+                continue
+            with self._lock:
+                self.hits["disk"] += 1
+            self._remember(key, se)
+            return se
+        return None
+
+    def _store(self, key: str, se: torch.Tensor, registered: bool) -> None:
+        target_dir = self.voices_dir if registered else self.cache_dir
+        target_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target_dir / f".{key}.pth.tmp"
+        torch.save(se.detach().cpu(), tmp)
+        tmp.replace(target_dir / f"{key}.pth")
+        if not registered:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = sorted(self.cache_dir.glob("*.pth"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for p in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+
+    def _extract(self, audio_path: Path, converter: ToneColorConverter) -> torch.Tensor:
+        work_dir = Path(tempfile.mkdtemp(prefix="se_extract_"))
+        try:
+            se, _ = se_extractor.get_se(str(audio_path), converter, target_dir=str(work_dir), vad=True)
+            return se
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def get_or_extract(self, audio_path: Path, converter: ToneColorConverter) -> Tuple[str, torch.Tensor]:
+        key = self.key_for(audio_path, converter.version)
+        se = self._lookup(key, converter.device)
+        if se is not None:
+            return key, se
+        with self._lock:
+            self.misses += 1
+        se = self._extract(audio_path, converter)
+        self._store(key, se, registered=False)
+        self._remember(key, se)
+        return key, se
+
+    def register(self, audio_path: Path, converter: ToneColorConverter) -> Tuple[str, bool]:
+        """Pin the embedding of `audio_path` under its content-derived voice id. Returns (voice_id, was_cached)."""
+        key = self.key_for(audio_path, converter.version)
+        se = self._lookup(key, converter.device)
+        was_cached = se is not None
+        if se is None:
+            with self._lock:
+                self.misses += 1
+            se = self._extract(audio_path, converter)
+            self._remember(key, se)
+        if not (self.voices_dir / f"{key}.pth").is_file():
+            self._store(key, se, registered=True)
+        return key, was_cached
+
+    def get_registered(self, voice_id: str, device: str) -> Optional[torch.Tensor]:
+        """Embedding of a voice from register(); entries of the evictable disk tier are not voices."""
+        if not voice_id or "/" in voice_id or voice_id.startswith("."):
+            return None
+        return self._lookup(voice_id, device, registered_only=True)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = dict(self.hits), self.misses
+        return {
+            "dir": str(self.cache_dir),
+            "memory_entries": len(self._mem),
+            "disk_entries": len(list(self.cache_dir.glob("*.pth"))) if self.cache_dir.exists() else 0,
+            "registered_voices": len(list(self.voices_dir.glob("*.pth"))) if self.voices_dir.exists() else 0,
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+SE_CACHE = SECache(
+    Path(CFG["se_cache"]["dir"]).resolve(),
+    max_memory_entries=int(CFG["se_cache"]["max_memory_entries"]),
+    max_disk_bytes=int(CFG["se_cache"]["max_disk_mb"]) * 1024 * 1024,
+)
+
+
+@app.on_event("startup")
+def _warmup_models() -> None:
+    if not CFG["runtime"]["warmup"]:
+        return
+    try:
+        MODEL_POOL.get(CFG["runtime"]["language"], _pick_device(CFG["runtime"]["device"]))
+    except Exception as e:
+        # Stay up in cold state; the next request retries the load.
+        print(f"✗ model warm-up failed: {e}")
+
+
+def _resolve_target_se(
+        converter: ToneColorConverter,
+        device: str,
+        reference_voice_path: Optional[Path],
+        voice_id: Optional[str],
+) -> torch.Tensor:
+    if voice_id:
+        registered_se = SE_CACHE.get_registered(voice_id, device)
+        if registered_se is None:
+            raise HTTPException(status_code=404, detail=f"voice_id not registered: {voice_id}")
+        return registered_se
+    if reference_voice_path is None or not reference_voice_path.exists():
+        raise HTTPException(status_code=400, detail=f"voice_file not found: {reference_voice_path}")
+    _, target_se = SE_CACHE.get_or_extract(reference_voice_path, converter)
+    return target_se
+
+
+def synthesize_slides(
         slide_texts: List[str],
         *,
-        course_id: str,
-        user_profile: Optional[UserProfile] = None,
-        reference_voice_path: Path,
-) -> List[str]:
+        reference_voice_path: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+) -> Tuple[List[Optional[np.ndarray]], int]:
     """
-    Create per-slide audio files from text using:
+    Synthesize per-slide audio in memory using:
       1) Melo TTS (synthesis)
       2) OpenVoice ToneColorConverter (timbre transfer)
-    Returns: list of output .wav file paths (empty string for slides that failed)
+    The target voice is either a reference audio file or a voice_id registered via /v1/voices.
+    With tts.in_memory the TTS output is handed to the converter as a float32 buffer; otherwise
+    it goes through per-call temp WAVs (fallback).
+    Returns: (per-slide float32 audio or None for slides that failed/were empty, sample rate)
     """
-    paths = CFG["paths"]
     runtime = CFG["runtime"]
     tts_cfg = CFG["tts"]
-    nlp_cfg = CFG["nlp"]
-    deps_cfg = CFG["deps"]
-
-    ckpt_converter = Path(paths["ckpt_converter"]).resolve()
-    output_dir = Path("./output").resolve()
-    base_speakers_dir = Path(paths["base_speakers_dir"]).resolve()
-    ses_dir = _speaker_embeddings_dir(base_speakers_dir, paths["ses_subdir"])
-    # reference_speaker_dir is configured but not directly used here
-    # ref_dir = Path(paths["reference_speaker_dir"]).resolve()
-
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    _ensure_nltk(nlp_cfg["nltk_auto_download"])
-    _maybe_install_silero_vad(deps_cfg["auto_install_silero_vad"])
 
     device = _pick_device(runtime["device"])
     language = runtime["language"]
 
-    tone_color_converter = _load_converter(ckpt_converter, device)
-
-    if not reference_voice_path.exists():
-        raise HTTPException(status_code=400, detail=f"voice_file not found: {reference_voice_path}")
-
-    target_se, _ = se_extractor.get_se(str(reference_voice_path), tone_color_converter, vad=True)
+    models = MODEL_POOL.get(language, device)
+    tone_color_converter = models.converter
+    model = models.tts
+    tts_sr = int(model.hps.data.sampling_rate)
+    out_sr = int(tone_color_converter.hps.data.sampling_rate)
 
-    model = _load_tts(language=language, device=device)
-    speaker_ids = model.hps.data.spk2id
+    target_se = _resolve_target_se(tone_color_converter, device, reference_voice_path, voice_id)
 
     speed = float(tts_cfg["speed"])
     noise_scale = float(tts_cfg["noise_scale"])
     noise_scale_w = float(tts_cfg["noise_scale_w"])
     sdp_ratio = float(tts_cfg["sdp_ratio"])
+    in_memory = bool(tts_cfg["in_memory"])
+
+    tmp_dir: Optional[Path] = None
+    if not in_memory:
+        output_dir = Path("./output").resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix="tts_", dir=output_dir))
+
+    results: List[Optional[np.ndarray]] = [None] * len(slide_texts)
+    wanted = [i for i, text in enumerate(slide_texts) if text and text.strip()]
+
+    def _synthesize(i: int, speaker_id: int) -> Any:
+        """Returns the TTS output as a float32 buffer (in-memory) or a temp WAV path (fallback)."""
+        target = None if tmp_dir is None else str(tmp_dir / f"tmp_{i}.wav")
+        audio = model.tts_to_file(
+            slide_texts[i],
+            speaker_id,
+            target,
+            speed=speed,
+            noise_scale=noise_scale,
+            noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio,
+        )
+        return audio if target is None else target
 
-    available_ses: Dict[str, Path] = {}
-    for p in _iter_ses_files(ses_dir):
-        key = p.stem.lower().replace("_", "-")
-        available_ses[key] = p
+    try:
+        # 1) Synthesize every slide with the primary speaker, then convert them in one batched pass.
+        if models.speakers and len(wanted) > 1:
+            speaker_key, speaker_id, source_se = models.speakers[0]
+            synthesized: List[int] = []
+            sources: List[Any] = []
+            for i in wanted:
+                try:
+                    sources.append(_synthesize(i, speaker_id))
+                    synthesized.append(i)
+                except Exception as e:
+                    print(f"[slide {i + 1}] speaker={speaker_key} failed: {e}")
+            if synthesized:
+                try:
+                    converted = tone_color_converter.convert_batch(
+                        sources,
+                        src_se=source_se,
+                        tgt_se=target_se,
+                        message="@MyShell",
+                        src_sr=tts_sr,
+                    )
+                    for i, audio in zip(synthesized, converted):
+                        results[i] = audio
+                        print(f"✓ slide {i + 1}")
+                except Exception as e:
+                    print(f"[batch] conversion failed, falling back to per-slide: {e}")
+
+        # 2) Per-slide path (single slide, or whatever the batch could not produce), trying each speaker in turn.
+        for i in wanted:
+            if results[i] is not None:
+                continue
+            for speaker_key, speaker_id, source_se in models.speakers:
+                try:
+                    results[i] = tone_color_converter.convert(
+                        _synthesize(i, speaker_id),
+                        src_se=source_se,
+                        tgt_se=target_se,
+                        message="@MyShell",
+                        src_sr=tts_sr,
+                    )
+                    print(f"✓ slide {i + 1}")
+                    break
 
-    audio_paths: List[str] = []
+                except Exception as e:
+                    print(f"[slide {i + 1}] speaker={speaker_key} failed: {e}")
+                    continue
+
+            if results[i] is None:
+                print(f"✗ slide {i + 1}: generation failed")
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    for i, text in enumerate(slide_texts):
-        if not text or not text.strip():
+    return results, out_sr
+
+
+def generate_audio(
+        slide_texts: List[str],
+        *,
+        course_id: str,
+        user_profile: Optional[UserProfile] = None,
+        reference_voice_path: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+) -> List[str]:
+    """
+    File-based wrapper around synthesize_slides.
+    Returns: list of output .wav file paths (empty string for slides that failed)
+    """
+    output_dir = Path("./output").resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    audios, sr = synthesize_slides(slide_texts, reference_voice_path=reference_voice_path, voice_id=voice_id)
+
+    audio_paths: List[str] = []
+    for i, audio in enumerate(audios):
+        if audio is None:
             audio_paths.append("")
             continue
-
-        tmp_src = output_dir / f"tmp_{i}.wav"
         save_path = output_dir / f"{course_id}_slide_{i + 1}.wav"
-        success = False
+        soundfile.write(str(save_path), audio, sr)
+        audio_paths.append(str(save_path))
+    return audio_paths
 
-        for speaker_key, speaker_id in speaker_ids.items():
-            norm_key = str(speaker_key).lower().replace("_", "-")
-            ses_path = available_ses.get(norm_key)
-            if ses_path is None:
-                continue
-            try:
-                source_se = torch.load(ses_path, map_location=device)
-
-                model.tts_to_file(
-                    text,
-                    speaker_id,
-                    str(tmp_src),
-                    speed=speed,
-                    noise_scale=noise_scale,
-                    noise_scale_w=noise_scale_w,
-                    sdp_ratio=sdp_ratio,
-                )
-
-                tone_color_converter.convert(
-                    audio_src_path=str(tmp_src),
-                    src_se=source_se,
-                    tgt_se=target_se,
-                    output_path=str(save_path),
-                    message="@MyShell",
-                )
-
-                audio_paths.append(str(save_path))
-                success = True
-                print(f"✓ slide {i + 1}: {save_path}")
-                break
 
-            except Exception as e:
-                print(f"[slide {i + 1}] speaker={speaker_key} failed: {e}")
-                continue
+def _wav_bytes(audio: np.ndarray, sr: int) -> bytes:
+    buf = io.BytesIO()
+    soundfile.write(buf, audio, sr, format="WAV")
+    return buf.getvalue()
 
-        if not success:
-            print(f"✗ slide {i + 1}: generation failed")
-            audio_paths.append("")
 
-        try:
-            if tmp_src.exists():
-                tmp_src.unlink()
-        except Exception:
-            pass
+def _sentence_pieces(model: TTS, text: str) -> List[str]:
+    """Same sentence split Melo applies internally in tts_to_file."""
+    try:
+        pieces = model.split_sentences_into_pieces(text, model.language, quiet=True)
+    except Exception:
+        pieces = [text]
+    return [p for p in pieces if p and p.strip()]
 
-    return audio_paths
+
+def stream_sentences(
+        text: str,
+        *,
+        reference_voice_path: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+) -> Tuple[Iterator[np.ndarray], int]:
+    """
+    Resolves models and the target voice eagerly (so errors surface before a response starts),
+    then returns a lazy iterator yielding the converted audio of one sentence at a time
+    (float32, followed by the same 50ms gap Melo inserts) and the output sample rate.
+    """
+    tts_cfg = CFG["tts"]
+    device = _pick_device(CFG["runtime"]["device"])
+    models = MODEL_POOL.get(CFG["runtime"]["language"], device)
+    converter = models.converter
+    model = models.tts
+    tts_sr = int(model.hps.data.sampling_rate)
+    out_sr = int(converter.hps.data.sampling_rate)
+    target_se = _resolve_target_se(converter, device, reference_voice_path, voice_id)
+    pieces = _sentence_pieces(model, text)
+
+    speed = float(tts_cfg["speed"])
+    gap = np.zeros(int(out_sr * 0.05 / speed), dtype=np.float32)
+
+    def _iter() -> Iterator[np.ndarray]:
+        for n, piece in enumerate(pieces):
+            for speaker_key, speaker_id, source_se in models.speakers:
+                try:
+                    audio = model.tts_to_file(
+                        piece,
+                        speaker_id,
+                        None,
+                        speed=speed,
+                        noise_scale=float(tts_cfg["noise_scale"]),
+                        noise_scale_w=float(tts_cfg["noise_scale_w"]),
+                        sdp_ratio=float(tts_cfg["sdp_ratio"]),
+                        quiet=True,
+                    )
+                    converted = converter.convert(audio, src_se=source_se, tgt_se=target_se, message="@MyShell", src_sr=tts_sr)
+                    yield np.concatenate([converted, gap])
+                    break
+                except Exception as e:
+                    print(f"[sentence {n + 1}] speaker={speaker_key} failed: {e}")
+            else:
+                print(f"✗ sentence {n + 1}: generation failed, skipped")
+
+    return _iter(), out_sr
+
+
+def _pcm16(audio: np.ndarray) -> bytes:
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def _streaming_wav_header(sr: int, channels: int = 1, bits: int = 16) -> bytes:
+    """RIFF header with unknown (max) sizes, as used for open-ended WAV streams."""
+    byte_rate = sr * channels * bits // 8
+    block_align = channels * bits // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sr, byte_rate, block_align, bits)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
 
 
 @app.get("/health")
@@ -385,13 +801,63 @@ def health():
             "slide_texts": bool(CFG["defaults"].get("slide_texts")),
             "course_id": bool(CFG["defaults"].get("course_id")),
             "voice_file": bool(CFG["defaults"].get("voice_file"))
-        }
+        },
+        "models": MODEL_POOL.status(),
+        "se_cache": SE_CACHE.status(),
     }
 
 
+async def _save_upload(upload: UploadFile, target: Path) -> None:
+    with target.open("wb") as out_f:
+        while True:
+            chunk = await upload.read(1024 * 1024)
+            if not chunk:
+                break
+            out_f.write(chunk)
+
+
+@app.post("/v1/voices")
+async def register_voice_endpoint(
+        voice_file: UploadFile = File(..., description="Reference voice MP3 (raw file, not base64)")):
+    """
+    Extracts the speaker embedding of the uploaded reference voice once and pins it.
+    The returned voice_id is content-derived (same audio -> same id) and can be passed
+    to /v1/audio/generate instead of uploading the voice file again.
+    """
+    tmp_dir = Path(tempfile.mkdtemp(prefix="voice_reg_"))
+    ref_path = tmp_dir / (Path(voice_file.filename or "reference.mp3").name or "reference.mp3")
+    try:
+        await _save_upload(voice_file, ref_path)
+        models = MODEL_POOL.get(CFG["runtime"]["language"], _pick_device(CFG["runtime"]["device"]))
+        voice_id, was_cached = SE_CACHE.register(ref_path, models.converter)
+        return {"voice_id": voice_id, "cached": was_cached}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Voice registration failed: {e}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _resolve_slide_texts(slide_texts: Optional[List[str]], slide_text: Optional[str]) -> List[str]:
+    if (not slide_texts or len(slide_texts) == 0) and not slide_text:
+        # fallback to CFG default only if you want; else require at least one text
+        default_texts = CFG["defaults"].get("slide_texts", [])
+        if not default_texts:
+            raise HTTPException(status_code=400, detail="Provide 'slide_texts' (can be repeated) or 'slide_text'.")
+        slide_texts = default_texts
+    elif not slide_texts:
+        slide_texts = [slide_text or ""]
+
+    if not isinstance(slide_texts, list) or not all(isinstance(x, str) for x in slide_texts):
+        raise HTTPException(status_code=400, detail="'slide_texts' must be a list of strings.")
+    return slide_texts
+
+
 @app.post("/v1/audio/generate")
 async def generate_audio_endpoint(
-        voice_file: UploadFile = File(..., description="Reference voice MP3 (raw file, not base64)"),
+        voice_file: Optional[UploadFile] = File(None, description="Reference voice MP3 (raw file, not base64)"),
+        voice_id: Optional[str] = Form(None, description="Voice registered via /v1/voices (alternative to voice_file)"),
         # Prefer slide_texts list; accept a single slide_text for convenience
         slide_texts: Optional[List[str]] = Form(None, description="One or more slide texts"),
         slide_text: Optional[str] = Form(None, description="Single slide text (alternative to slide_texts)"),
@@ -400,25 +866,15 @@ async def generate_audio_endpoint(
         debug: str = Form("not debug", description="is debug?")):
     """
     Accepts multipart/form-data:
-      - voice_file: MP3 file upload
+      - voice_file: MP3 file upload, or
+      - voice_id: id returned by /v1/voices
       - slide_texts: repeated form field (or 'slide_text' once)
       - course_id: optional (falls back to config default)
 
     Returns the first generated WAV as a binary response (audio/wav).
     """
 
-    # Resolve texts
-    if (not slide_texts or len(slide_texts) == 0) and not slide_text:
-        # fallback to CFG default only if you want; else require at least one text
-        default_texts = CFG["defaults"].get("slide_texts", [])
-        if not default_texts:
-            raise HTTPException(status_code=400, detail="Provide 'slide_texts' (can be repeated) or 'slide_text'.")
-        slide_texts = default_texts
-    elif not slide_texts:
-        slide_texts = [slide_text]
-
-    if not isinstance(slide_texts, list) or not all(isinstance(x, str) for x in slide_texts):
-        raise HTTPException(status_code=400, detail="'slide_texts' must be a list of strings.")
+    slide_texts = _resolve_slide_texts(slide_texts, slide_text)
 
     # Resolve course_id (optional -> default)
     if not course_id:
@@ -436,64 +892,156 @@ async def generate_audio_endpoint(
             headers={"Cache-Control": "no-store"},
             # background tasks are not used in debug mode
         )
+    if voice_file is None and not voice_id:
+        raise HTTPException(status_code=400, detail="Provide 'voice_file' or a registered 'voice_id'.")
+
     # Save uploaded MP3 to a temp path
     tmp_dir = Path(tempfile.mkdtemp(prefix="audio_gen_"))
-    ref_mp3_path = tmp_dir / "reference.mp3"
+    ref_mp3_path: Optional[Path] = None
     try:
-        with ref_mp3_path.open("wb") as out_f:
-            while True:
-                chunk = await voice_file.read(1024 * 1024)
-                if not chunk:
-                    break
-                out_f.write(chunk)
-
-        # Call your internal generator (expects a file path for reference voice)
-        # NOTE: this is your existing backend function you already have.
-        paths = generate_audio(
-            slide_texts=slide_texts,
-            course_id=course_id,
-            user_profile=None,  # pass through if you support it via form later
-            reference_voice_path=ref_mp3_path,
-        )
+        if not voice_id and voice_file is not None:
+            ref_mp3_path = tmp_dir / "reference.mp3"
+            await _save_upload(voice_file, ref_mp3_path)
 
-        # Pick the first valid WAV produced
-        first_path = next((Path(p) for p in paths if p and Path(p).exists()), None)
-        if not first_path:
-            raise HTTPException(status_code=500, detail="Audio generation produced no files.")
-
-        # Schedule temp cleanup after the response is sent
-        def _cleanup():
-            try:
-                # If your output WAV is meant to be ephemeral, you can delete it here too:
-                # if first_path.exists(): first_path.unlink(missing_ok=True)
-                if tmp_dir.exists():
-                    shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
+        audios, sr = synthesize_slides(slide_texts, reference_voice_path=ref_mp3_path, voice_id=voice_id)
 
-        background = BackgroundTasks()
-        background.add_task(_cleanup)
+        # Pick the first valid slide produced
+        first = next(((i, a) for i, a in enumerate(audios) if a is not None), None)
+        if first is None:
+            raise HTTPException(status_code=500, detail="Audio generation produced no files.")
+        idx, audio = first
 
-        # Stream WAV back to the client
-        return FileResponse(
-            path=str(first_path),
+        # Encode straight into the response body; nothing is written to disk
+        return Response(
+            content=_wav_bytes(audio, sr),
             media_type="audio/wav",
-            filename=first_path.name,
-            headers={"Cache-Control": "no-store"},
-            background=background,
+            headers={
+                "Cache-Control": "no-store",
+                "Content-Disposition": f'attachment; filename="{course_id}_slide_{idx + 1}.wav"',
+            },
         )
 
     except HTTPException:
         # Re-raise FastAPI errors untouched
         raise
     except Exception as e:
-        # Cleanup temp dir on error
-        try:
-            if tmp_dir.exists():
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-        except Exception:
-            pass
         raise HTTPException(status_code=500, detail=f"Audio generation failed: {e}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@app.post("/v1/audio/generate/batch")
+async def generate_audio_batch_endpoint(
+        voice_file: Optional[UploadFile] = File(None, description="Reference voice MP3 (raw file, not base64)"),
+        voice_id: Optional[str] = Form(None, description="Voice registered via /v1/voices (alternative to voice_file)"),
+        slide_texts: Optional[List[str]] = Form(None, description="All slide texts of a lecture, in order"),
+        course_id: Optional[str] = Form(None),
+        debug: str = Form("not debug", description="is debug?")):
+    """
+    Synthesizes all slides of a lecture in one call (one voice upload, one model pass per stage).
+
+    Returns application/zip with:
+      - slide_<n>.wav for every slide that was produced (n is 1-based)
+      - manifest.json: {"course_id": ..., "slides": [{"slide": n, "file": "slide_<n>.wav" | null}, ...]}
+    """
+    slide_texts = _resolve_slide_texts(slide_texts, None)
+    if not course_id:
+        course_id = CFG["defaults"].get("course_id", "")
+    if voice_file is None and not voice_id and debug != 'debug':
+        raise HTTPException(status_code=400, detail="Provide 'voice_file' or a registered 'voice_id'.")
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="audio_batch_"))
+    try:
+        wavs: List[Optional[bytes]]
+        if debug == 'debug':
+            mock_bytes = Path(os.getenv("VOICE_GEN_DEBUG_WAV_PATH", "./debug/mock.wav")).read_bytes()
+            wavs = [mock_bytes if t and t.strip() else None for t in slide_texts]
+        else:
+            ref_mp3_path: Optional[Path] = None
+            if not voice_id and voice_file is not None:
+                ref_mp3_path = tmp_dir / "reference.mp3"
+                await _save_upload(voice_file, ref_mp3_path)
+            audios, sr = synthesize_slides(slide_texts, reference_voice_path=ref_mp3_path, voice_id=voice_id)
+            wavs = [None if a is None else _wav_bytes(a, sr) for a in audios]
+
+        if not any(w is not None for w in wavs):
+            raise HTTPException(status_code=500, detail="Audio generation produced no files.")
+
+        buf = io.BytesIO()
+        manifest: Dict[str, Any] = {"course_id": course_id, "slides": []}
+        with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+            for i, wav in enumerate(wavs):
+                name: Optional[str] = None
+                if wav is not None:
+                    name = f"slide_{i + 1}.wav"
+                    zf.writestr(name, wav)
+                manifest["slides"].append({"slide": i + 1, "file": name})
+            zf.writestr("manifest.json", json.dumps(manifest))
+
+        return Response(
+            content=buf.getvalue(),
+            media_type="application/zip",
+            headers={
+                "Cache-Control": "no-store",
+                "Content-Disposition": f'attachment; filename="{course_id or "slides"}_audio.zip"',
+            },
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Audio generation failed: {e}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@app.post("/v1/audio/generate/stream")
+async def generate_audio_stream_endpoint(
+        voice_file: Optional[UploadFile] = File(None, description="Reference voice MP3 (raw file, not base64)"),
+        voice_id: Optional[str] = Form(None, description="Voice registered via /v1/voices (alternative to voice_file)"),
+        slide_text: str = Form(..., description="Text of one slide"),
+        audio_format: Literal["wav", "pcm"] = Form("wav", description="wav: streaming WAV header + PCM; pcm: raw s16le mono"),
+        debug: str = Form("not debug", description="is debug?")):
+    """
+    Streams the narration sentence by sentence as chunked 16-bit PCM (optionally behind a WAV header),
+    so consumers can start on the first sentence while later ones are still being synthesized.
+    The sample rate is sent in the X-Sample-Rate header.
+    """
+    if debug == 'debug':
+        mock_path = Path(os.getenv("VOICE_GEN_DEBUG_WAV_PATH", "./debug/mock.wav"))
+        return FileResponse(path=str(mock_path), media_type="audio/wav", headers={"Cache-Control": "no-store"})
+    if not slide_text.strip():
+        raise HTTPException(status_code=400, detail="'slide_text' must not be empty.")
+    if voice_file is None and not voice_id:
+        raise HTTPException(status_code=400, detail="Provide 'voice_file' or a registered 'voice_id'.")
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="audio_stream_"))
+    try:
+        ref_mp3_path: Optional[Path] = None
+        if not voice_id and voice_file is not None:
+            ref_mp3_path = tmp_dir / "reference.mp3"
+            await _save_upload(voice_file, ref_mp3_path)
+        sentences, sr = stream_sentences(slide_text, reference_voice_path=ref_mp3_path, voice_id=voice_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Audio generation failed: {e}")
+    finally:
+        # the voice embedding is resolved eagerly, so the upload is no longer needed
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _body() -> Iterator[bytes]:
+        if audio_format == "wav":
+            yield _streaming_wav_header(sr)
+        for audio in sentences:
+            yield _pcm16(audio)
+
+    # sync generator -> Starlette iterates it in the threadpool, so synthesis does not block the loop
+    return StreamingResponse(
+        _body(),
+        media_type="audio/wav" if audio_format == "wav" else "audio/L16",
+        headers={"Cache-Control": "no-store", "X-Sample-Rate": str(sr), "X-Channels": "1"},
+    )
 
 
 if __name__ == "__main__":
@@ -56,11 +56,14 @@ class BaseSpeakerTTS(OpenVoiceBaseClass):
 
     @staticmethod
     def audio_numpy_concat(segment_data_list, sr, speed=1.):
-        audio_segments = []
+        gap = int((sr * 0.05)/speed)
+        total = sum(segment_data.size + gap for segment_data in segment_data_list)
+        audio_segments = np.zeros(total, dtype=np.float32)
+        pos = 0
         for segment_data in segment_data_list:
-            audio_segments += segment_data.reshape(-1).tolist()
-            audio_segments += [0] * int((sr * 0.05)/speed)
-        audio_segments = np.array(audio_segments).astype(np.float32)
+            segment_data = segment_data.reshape(-1)
+            audio_segments[pos:pos + segment_data.size] = segment_data
+            pos += segment_data.size + gap
         return audio_segments
 
     @staticmethod
@@ -72,12 +75,21 @@ class BaseSpeakerTTS(OpenVoiceBaseClass):
         return texts
 
     def tts(self, text, output_path, speaker, language='English', speed=1.0):
+        audio_list = list(self.tts_iter(text, speaker, language=language, speed=speed))
+        audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+
+        if output_path is None:
+            return audio
+        else:
+            soundfile.write(output_path, audio, self.hps.data.sampling_rate)
+
+    def tts_iter(self, text, speaker, language='English', speed=1.0):
+        """Yields the synthesized audio of one sentence at a time (float32, without inter-sentence gaps)."""
         mark = self.language_marks.get(language.lower(), None)
         assert mark is not None, f"language {language} is not supported"
 
         texts = self.split_sentences_into_pieces(text, mark)
 
-        audio_list = []
         for t in texts:
             t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
             t = f'[{mark}]{t}[{mark}]'
@@ -90,20 +102,15 @@ class BaseSpeakerTTS(OpenVoiceBaseClass):
                 sid = torch.LongTensor([speaker_id]).to(device)
                 audio = self.model.infer(x_tst, x_tst_lengths, sid=sid, noise_scale=0.667, noise_scale_w=0.6,
                                     length_scale=1.0 / speed)[0][0, 0].data.cpu().float().numpy()
-            audio_list.append(audio)
-        audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
-
-        if output_path is None:
-            return audio
-        else:
-            soundfile.write(output_path, audio, self.hps.data.sampling_rate)
+            yield audio
 
 
 class ToneColorConverter(OpenVoiceBaseClass):
     def __init__(self, *args, **kwargs):
+        enable_watermark = kwargs.pop('enable_watermark', True)
         super().__init__(*args, **kwargs)
 
-        if kwargs.get('enable_watermark', True):
+        if enable_watermark:
             import wavmark
             self.watermark_model = wavmark.load_model().to(self.device)
         else:
@@ -139,10 +146,24 @@ class ToneColorConverter(OpenVoiceBaseClass):
 
         return gs
 
-    def convert(self, audio_src_path, src_se, tgt_se, output_path=None, tau=0.3, message="default"):
+    def _load_src(self, audio_src, src_sr=None):
+        """Path -> decoded via librosa; numpy/torch buffer -> used as-is, resampled only if src_sr differs."""
+        sr = self.hps.data.sampling_rate
+        if isinstance(audio_src, (str, os.PathLike)):
+            audio, _ = librosa.load(audio_src, sr=sr)
+            return audio
+        if torch.is_tensor(audio_src):
+            audio_src = audio_src.detach().cpu().float().numpy()
+        audio = np.asarray(audio_src, dtype=np.float32).reshape(-1)
+        if src_sr is not None and src_sr != sr:
+            audio = librosa.resample(audio, orig_sr=src_sr, target_sr=sr)
+        return audio
+
+    def convert(self, audio_src_path, src_se, tgt_se, output_path=None, tau=0.3, message="default", src_sr=None):
+        """`audio_src_path` may also be a float32 numpy array / tensor sampled at `src_sr`."""
         hps = self.hps
         # load audio
-        audio, sample_rate = librosa.load(audio_src_path, sr=hps.data.sampling_rate)
+        audio = self._load_src(audio_src_path, src_sr)
         audio = torch.tensor(audio).float()
         
         with torch.no_grad():
@@ -159,7 +180,62 @@ class ToneColorConverter(OpenVoiceBaseClass):
                 return audio
             else:
                 soundfile.write(output_path, audio, hps.data.sampling_rate)
-    
+
+    def convert_batch(self, audio_src_paths, src_se, tgt_se, output_paths=None, tau=0.3, message="default", max_batch_frames=8000, src_sr=None):
+        """
+        Batched variant of `convert`: spectrograms are grouped by length and run through
+        `voice_conversion` as padded [B, C, T] tensors. A group is closed once B * T_max
+        would exceed `max_batch_frames`, so very uneven lengths fall back to small batches.
+        Items may be paths or in-memory buffers (see `convert`).
+        """
+        hps = self.hps
+        hop = hps.data.hop_length
+        specs = []
+        with torch.no_grad():
+            for src in audio_src_paths:
+                audio = self._load_src(src, src_sr)
+                y = torch.FloatTensor(audio).to(self.device).unsqueeze(0)
+                spec = spectrogram_torch(y, hps.data.filter_length,
+                                        hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
+                                        center=False).to(self.device)
+                specs.append(spec[0])
+
+        order = sorted(range(len(specs)), key=lambda i: specs[i].size(-1))
+        groups, cur = [], []
+        for i in order:
+            t_max = specs[i].size(-1)
+            if cur and (len(cur) + 1) * t_max > max_batch_frames:
+                groups.append(cur)
+                cur = []
+            cur.append(i)
+        if cur:
+            groups.append(cur)
+
+        results = [None] * len(specs)
+        with torch.no_grad():
+            for group in groups:
+                lengths = [specs[i].size(-1) for i in group]
+                batch = torch.zeros(len(group), specs[group[0]].size(0), max(lengths), device=self.device)
+                for b, i in enumerate(group):
+                    batch[b, :, :lengths[b]] = specs[i]
+                spec_lengths = torch.LongTensor(lengths).to(self.device)
+                out = self.model.voice_conversion(batch, spec_lengths, sid_src=src_se, sid_tgt=tgt_se, tau=tau)[0]
+                out = out[:, 0].data.cpu().float().numpy()
+                for b, i in enumerate(group):
+                    results[i] = self.add_watermark(out[b, :lengths[b] * hop].copy(), message)
+
+        if output_paths is None:
+            return results
+        for audio, path in zip(results, output_paths):
+            soundfile.write(path, audio, hps.data.sampling_rate)
+
+    @staticmethod
+    def _watermark_windows(n_samples, n_repeat, K=16000, coeff=2):
+        """Sample indices [n, K] of the watermark windows (every `coeff`-th K-sized block) that fit in the audio."""
+        n_fit = 0 if n_samples < K else min(n_repeat, (n_samples - K) // (coeff * K) + 1)
+        starts = np.arange(n_fit) * (coeff * K)
+        return starts[:, None] + np.arange(K)[None, :]
+
     def add_watermark(self, audio, message):
         if self.watermark_model is None:
             return audio
@@ -167,37 +243,29 @@ class ToneColorConverter(OpenVoiceBaseClass):
         bits = utils.string_to_bits(message).reshape(-1)
         n_repeat = len(bits) // 32
 
-        K = 16000
-        coeff = 2
-        for n in range(n_repeat):
-            trunck = audio[(coeff * n) * K: (coeff * n + 1) * K]
-            if len(trunck) != K:
-                print('Audio too short, fail to add watermark')
-                break
-            message_npy = bits[n * 32: (n + 1) * 32]
-            
-            with torch.no_grad():
-                signal = torch.FloatTensor(trunck).to(device)[None]
-                message_tensor = torch.FloatTensor(message_npy).to(device)[None]
-                signal_wmd_tensor = self.watermark_model.encode(signal, message_tensor)
-                signal_wmd_npy = signal_wmd_tensor.detach().cpu().squeeze()
-            audio[(coeff * n) * K: (coeff * n + 1) * K] = signal_wmd_npy
+        idx = self._watermark_windows(len(audio), n_repeat)
+        n = len(idx)
+        if n < n_repeat:
+            print('Audio too short, fail to add watermark')
+        if n == 0:
+            return audio
+
+        # all windows go through the watermark model as one [n, K] batch
+        with torch.no_grad():
+            signal = torch.from_numpy(np.ascontiguousarray(audio[idx], dtype=np.float32)).to(device)
+            message_tensor = torch.from_numpy(bits[:n * 32].reshape(n, 32).astype(np.float32)).to(device)
+            signal_wmd = self.watermark_model.encode(signal, message_tensor).detach().cpu().numpy()
+        audio[idx] = signal_wmd
         return audio
 
     def detect_watermark(self, audio, n_repeat):
-        bits = []
-        K = 16000
-        coeff = 2
-        for n in range(n_repeat):
-            trunck = audio[(coeff * n) * K: (coeff * n + 1) * K]
-            if len(trunck) != K:
-                print('Audio too short, fail to detect watermark')
-                return 'Fail'
-            with torch.no_grad():
-                signal = torch.FloatTensor(trunck).to(self.device).unsqueeze(0)
-                message_decoded_npy = (self.watermark_model.decode(signal) >= 0.5).int().detach().cpu().numpy().squeeze()
-            bits.append(message_decoded_npy)
-        bits = np.stack(bits).reshape(-1, 8)
+        idx = self._watermark_windows(len(audio), n_repeat)
+        if len(idx) < n_repeat:
+            print('Audio too short, fail to detect watermark')
+            return 'Fail'
+        with torch.no_grad():
+            signal = torch.from_numpy(np.ascontiguousarray(audio[idx], dtype=np.float32)).to(self.device)
+            bits = (self.watermark_model.decode(signal) >= 0.5).int().detach().cpu().numpy()
+        bits = bits.reshape(-1, 8)
         message = utils.bits_to_string(bits)
         return message
-    
@@ -6,6 +6,7 @@ from glob import glob
 
 import librosa
 import numpy as np
+import torch
 from faster_whisper import WhisperModel
 from pydub import AudioSegment
 from whisper_timestamped.transcribe import get_audio_tensor, get_vad_segments
@@ -131,9 +132,9 @@ def get_se(audio_path, vc_model, target_dir='processed', vad=True):
     audio_name = f"{os.path.basename(audio_path).rsplit('.', 1)[0]}_{version}_{hash_numpy_array(audio_path)}"
     se_path = os.path.join(target_dir, audio_name, 'se.pth')
 
-    # if os.path.isfile(se_path):
-    #     se = torch.load(se_path).to(device)
-    #     return se, audio_name
+    if os.path.isfile(se_path):
+        se = torch.load(se_path, map_location=device)
+        return se, audio_name
     # if os.path.isdir(audio_path):
     #     wavs_folder = audio_path
     
@@ -26,8 +26,11 @@ if not DITTO_DATA_ROOT.exists():
 if not DITTO_CFG_PKL.exists():
     raise RuntimeError(f"DITTO_CFG_PKL not found: {DITTO_CFG_PKL}")
 
-# Instantiate SDK once (heavy)
+# Instantiate SDK once (heavy); every request runs in its own StreamSession
 SDK = StreamSDK(str(DITTO_CFG_PKL), str(DITTO_DATA_ROOT))
+if not SDK.thread_safe and MAX_CONCURRENT > 1:
+    print("TensorRT models cannot be shared between sessions; MAX_CONCURRENT forced to 1")
+    MAX_CONCURRENT = 1
 
 app = FastAPI(title="Ditto Talking Head", default_response_class=ORJSONResponse)
 _sem = asyncio.Semaphore(MAX_CONCURRENT)
@@ -87,7 +90,7 @@ async def infer(
     async with _sem:
         try:
             def _do_run():
-                # inference.run calls SDK.setup internally
+                # inference.run opens a session (SDK.new_session) and sets it up itself
                 run_inference(SDK, str(aud_path), str(img_path), str(out_path))
             await run_in_threadpool(_do_run)
         except Exception as e:
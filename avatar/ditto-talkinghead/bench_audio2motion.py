@@ -0,0 +1,107 @@
+"""
+Fusion/smoothing cost of Audio2Motion on long audio: the previous concatenate + per-frame mean
+implementation vs the preallocated in-place one.
+
+    python bench_audio2motion.py --minutes 5 --runs 3
+
+LMDM is replaced by a cheap stand-in so only the bookkeeping around it is measured.
+Peak memory is the tracemalloc peak of one run.
+"""
+import time
+import tracemalloc
+
+import numpy as np
+from core.atomic_components.audio2motion import Audio2Motion
+
+
+class _FakeLMDM:
+    seq_frames = 80
+    motion_feat_dim = 265
+
+    def setup(self, sampling_timesteps):
+        pass
+
+    def __call__(self, kp_cond, aud_cond, sampling_timesteps):
+        return aud_cond[..., :self.motion_feat_dim] + kp_cond[:, None, :self.motion_feat_dim] * 0.1
+
+
+class _LegacyAudio2Motion(Audio2Motion):
+    """The previous implementation: the sequence grows by concatenate and _smo copies it every clip."""
+
+    def _smo(self, res_kp_seq, s, e):
+        if self.smo_k_d <= 1:
+            return res_kp_seq
+        new_res_kp_seq = res_kp_seq.copy()
+        n = res_kp_seq.shape[1]
+        half_k = self.smo_k_d // 2
+        for i in range(s, e):
+            ss = max(0, i - half_k)
+            ee = min(n, i + half_k + 1)
+            res_kp_seq[:, i, :202] = np.mean(new_res_kp_seq[:, ss:ee, :202], axis=1)
+        return res_kp_seq
+
+    def run_clips(self, aud_cond_list):
+        res_kp_seq = None
+        for aud_cond in aud_cond_list:
+            res_kp_seq = self(aud_cond, res_kp_seq)
+        return res_kp_seq
+
+
+def _make(cls):
+    a2m = cls.__new__(cls)
+    a2m.lmdm = _FakeLMDM()
+    x_s_info = {
+        "scale": np.ones((1, 1), np.float32), "pitch": np.zeros((1, 66), np.float32), "yaw": np.zeros((1, 66), np.float32),
+        "roll": np.zeros((1, 66), np.float32), "t": np.zeros((1, 3), np.float32), "exp": np.zeros((1, 63), np.float32),
+        "kp": np.zeros((1, 63), np.float32),
+    }
+    a2m.setup(x_s_info)
+    return a2m
+
+
+def bench(cls, aud_cond_list, num_frames, runs):
+    def _one():
+        a2m = _make(cls)
+        res_kp_seq = a2m.run_clips(aud_cond_list)[:, :num_frames]
+        return a2m._smo(res_kp_seq, 0, res_kp_seq.shape[1])
+
+    res = _one()   # warm-up
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        _one()
+    seconds = (time.perf_counter() - t0) / runs
+
+    tracemalloc.start()
+    _one()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, seconds, peak
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=5.0, help="audio length")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    seq_frames, valid_clip_len = _FakeLMDM.seq_frames, _FakeLMDM.seq_frames - 10
+    rng = np.random.default_rng(0)
+    aud_cond_all = rng.standard_normal((num_frames, 1024 + 35)).astype(np.float32)
+    aud_cond_list = []
+    for idx in range(0, num_frames, valid_clip_len):
+        aud_cond = aud_cond_all[idx:idx + seq_frames][None]
+        if aud_cond.shape[1] < seq_frames:
+            pad = np.stack([aud_cond[:, -1]] * (seq_frames - aud_cond.shape[1]), 1)
+            aud_cond = np.concatenate([aud_cond, pad], 1)
+        aud_cond_list.append(aud_cond)
+
+    old, old_s, old_peak = bench(_LegacyAudio2Motion, aud_cond_list, num_frames, args.runs)
+    new, new_s, new_peak = bench(Audio2Motion, aud_cond_list, num_frames, args.runs)
+
+    print(f"audio={args.minutes:.1f}min frames={num_frames} clips={len(aud_cond_list)} runs={args.runs}")
+    print(f"concatenate: {old_s * 1000:8.1f} ms  peak {old_peak / 2**20:7.1f} MiB")
+    print(f"in place   : {new_s * 1000:8.1f} ms  peak {new_peak / 2**20:7.1f} MiB  ({old_s / new_s:.1f}x)")
+    print(f"max |concatenate - in place| = {np.abs(old - new).max():.2e}")
@@ -0,0 +1,63 @@
+"""
+Throughput of concurrent StreamSessions on one shared StreamSDK.
+
+    python bench_sessions.py --data_root ./checkpoints/ditto_onnx --cfg_pkl ./checkpoints/ditto_cfg/v0.4_hubert_cfg_onnx.pkl \
+        --audio_path example/audio.wav --source_path example/image.png --sessions 1 2 4 --requests 8
+
+For every session count, `--requests` videos are rendered by that many threads in parallel.
+The avatar registration is warmed up once first, so only the per-request pipeline is measured.
+"""
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import librosa
+from inference import run, seed_everything
+from stream_pipeline_offline import StreamSDK
+
+
+def bench(SDK, audio_path, source_path, n_sessions, n_requests, out_dir):
+    def _one(i):
+        run(SDK, audio_path, source_path, os.path.join(out_dir, f"s{n_sessions}_{i}.mp4"))
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        list(pool.map(_one, range(n_requests)))
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_root", type=str, default="./checkpoints/ditto_pytorch", help="path to model data_root")
+    parser.add_argument("--cfg_pkl", type=str, default="./checkpoints/ditto_cfg/v0.4_hubert_cfg_pytorch.pkl", help="path to cfg_pkl")
+    parser.add_argument("--audio_path", type=str, required=True, help="path to input wav")
+    parser.add_argument("--source_path", type=str, required=True, help="path to input image")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=8, help="videos rendered per session count")
+    args = parser.parse_args()
+
+    seed_everything(1024)
+    SDK = StreamSDK(args.cfg_pkl, args.data_root)
+    if not SDK.thread_safe:
+        print("warning: TensorRT models are not safe to share between sessions; results for >1 session are not meaningful")
+
+    audio, _ = librosa.core.load(args.audio_path, sr=16000)
+    n_frames = math.ceil(len(audio) / 16000 * 25)
+
+    with tempfile.TemporaryDirectory(prefix="ditto_bench_") as out_dir:
+        SDK.register_avatar(args.source_path)
+        run(SDK, args.audio_path, args.source_path, os.path.join(out_dir, "warmup.mp4"))
+
+        results = []
+        for n in args.sessions:
+            seconds = bench(SDK, args.audio_path, args.source_path, n, args.requests, out_dir)
+            results.append((n, seconds))
+
+    print(f"audio={len(audio) / 16000:.1f}s frames/video={n_frames} requests={args.requests}")
+    base = results[0][1]
+    for n, seconds in results:
+        fps = n_frames * args.requests / seconds
+        print(f"sessions={n}: {seconds:7.1f}s  {args.requests / seconds * 60:6.2f} videos/min  {fps:7.1f} frames/s  ({base / seconds:.2f}x)")
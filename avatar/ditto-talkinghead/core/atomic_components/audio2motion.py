@@ -12,6 +12,13 @@ lmdm_cfg = {
 }
 """
 
+# speed/quality presets for offline sampling, explicit setup kwargs take precedence
+SAMPLING_PRESETS = {
+    "quality": {"sampling_timesteps": 50, "batch_clips": 1},
+    "balanced": {"sampling_timesteps": 25, "batch_clips": 4},
+    "fast": {"sampling_timesteps": 10, "batch_clips": 8},
+}
+
 
 def _cvt_LP_motion_info(inp, mode, ignore_keys=()):
     ks_shape_map = [
@@ -78,8 +85,10 @@ class Audio2Motion:
         online_mode=False,
         v_min_max_for_clip=None,
         smo_k_d=3,
+        batch_clips=1,
     ):
         self.smo_k_d = smo_k_d
+        self.batch_clips = max(1, int(batch_clips))
         self.overlap_v2 = overlap_v2
         self.seq_frames = self.lmdm.seq_frames
         self.valid_clip_len = self.seq_frames - self.overlap_v2
@@ -137,6 +146,20 @@ class Audio2Motion:
         res_kp_seq = np.concatenate([res_kp_seq, pred_kp_seq[:, fuse_r2_e:]], 1)  # len(res_kp_seq) + valid_clip_len
 
         return res_kp_seq
+
+    def _fuse_into(self, res_kp_seq, n, pred_kp_seq):
+        """
+        offline fuse into a preallocated res_kp_seq [1, N, dim] holding n frames;
+        returns the new length (n + valid_clip_len)
+        """
+        fuse_r2_s = self.seq_frames - self.valid_clip_len - self.fuse_length
+        fuse_r2_e = self.seq_frames - self.valid_clip_len
+
+        r1 = res_kp_seq[:, n - self.fuse_length:n]
+        r1 *= 1 - self.fuse_alpha
+        r1 += pred_kp_seq[:, fuse_r2_s:fuse_r2_e] * self.fuse_alpha
+        res_kp_seq[:, n:n + self.valid_clip_len] = pred_kp_seq[:, fuse_r2_e:]
+        return n + self.valid_clip_len
     
     def _update_kp_cond(self, res_kp_seq, idx):
         if self.fix_kp_cond == 0:  # 不重置
@@ -150,16 +173,31 @@ class Audio2Motion:
             else:
                 self.kp_cond = res_kp_seq[:, idx-1]
 
-    def _smo(self, res_kp_seq, s, e):
-        if self.smo_k_d <= 1:
+    def _smo(self, res_kp_seq, s, e, block=1024):
+        """
+        moving average (k=smo_k_d) of frames [s, e) in place, from a cumsum over each block of
+        `block` frames plus its neighbours; the original values a block needs from the previous
+        (already smoothed) block are carried over
+        """
+        if self.smo_k_d <= 1 or s >= e:
             return res_kp_seq
-        new_res_kp_seq = res_kp_seq.copy()
         n = res_kp_seq.shape[1]
         half_k = self.smo_k_d // 2
-        for i in range(s, e):
-            ss = max(0, i - half_k)
-            ee = min(n, i + half_k + 1)
-            res_kp_seq[:, i, :202] = np.mean(new_res_kp_seq[:, ss:ee, :202], axis=1)
+        carry = None
+        for bs in range(s, e, block):
+            be = min(e, bs + block)
+            ws, we = max(0, bs - half_k), min(n, be + half_k)
+            win = res_kp_seq[:, ws:we, :202].astype(np.float64)
+            if carry is not None:
+                win[:, :carry.shape[1]] = carry
+            carry = win[:, max(0, be - half_k) - ws:be - ws].copy()
+
+            csum = np.zeros((win.shape[0], win.shape[1] + 1, 202), dtype=np.float64)
+            np.cumsum(win, axis=1, out=csum[:, 1:])
+            i = np.arange(bs, be)
+            lo = np.maximum(i - half_k, 0) - ws
+            hi = np.minimum(i + half_k + 1, n) - ws
+            res_kp_seq[:, bs:be, :202] = (csum[:, hi] - csum[:, lo]) / (hi - lo)[None, :, None]
         return res_kp_seq
     
     def __call__(self, aud_cond, res_kp_seq=None):
@@ -181,6 +219,46 @@ class Audio2Motion:
         self._update_kp_cond(res_kp_seq, idx)
 
         return res_kp_seq
+
+    def _append_clip_into(self, res_kp_seq, n, pred_kp_seq):
+        if n == 0:
+            res_kp_seq[:, :self.seq_frames] = pred_kp_seq
+            n = self.seq_frames
+            self._smo(res_kp_seq[:, :n], 0, n)
+        else:
+            n = self._fuse_into(res_kp_seq, n, pred_kp_seq)
+            self._smo(res_kp_seq[:, :n], n - self.valid_clip_len - self.fuse_length, n - self.valid_clip_len + 1)
+
+        self.clip_idx += 1
+        self._update_kp_cond(res_kp_seq[:, :n], n - self.overlap_v2)
+        return n
+
+    def run_clips(self, aud_cond_list):
+        """
+        aud_cond_list: [(1, seq_frames, dim)] * n, offline only
+        return: (1, seq_frames + (n - 1) * valid_clip_len, motion_feat_dim)
+
+        The output is allocated once and fused/smoothed in place.
+        With batch_clips > 1 the clips are denoised batch_clips at a time and fused in order
+        afterwards. A batched clip can't wait for the last frame of its predecessor, so every
+        clip is conditioned on the source keypoints (as with fix_kp_cond=1).
+        """
+        total = self.seq_frames + (len(aud_cond_list) - 1) * self.valid_clip_len
+        res_kp_seq = np.empty((1, total, self.lmdm.motion_feat_dim), dtype=np.float32)
+        n = 0
+        if self.batch_clips <= 1:
+            for aud_cond in aud_cond_list:
+                pred_kp_seq = self.lmdm(self.kp_cond, aud_cond, self.sampling_timesteps)
+                n = self._append_clip_into(res_kp_seq, n, pred_kp_seq)
+            return res_kp_seq
+
+        for s in range(0, len(aud_cond_list), self.batch_clips):
+            aud_cond = np.concatenate(aud_cond_list[s:s + self.batch_clips], 0)
+            kp_cond = np.repeat(self.s_kp_cond, len(aud_cond), 0)
+            pred_kp_seq = self.lmdm(kp_cond, aud_cond, self.sampling_timesteps)
+            for b in range(len(pred_kp_seq)):
+                n = self._append_clip_into(res_kp_seq, n, pred_kp_seq[b:b + 1])
+        return res_kp_seq
     
     def cvt_fmt(self, res_kp_seq):
         # res_kp_seq: [1, n, dim]
@@ -1,3 +1,7 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
 
 from .loader import load_source_frames
@@ -36,6 +40,75 @@ def smooth_x_s_info_lst(x_s_info_list, ignore_keys=(), smo_k=13):
     return smo_res
 
 
+def _nbytes(obj):
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"):  # torch.Tensor
+        return obj.element_size() * obj.nelement()
+    return 0
+
+
+class SourceInfoCache:
+    """
+    source_info of registered avatars, keyed by source file content + registration kwargs.
+    LRU, evicted by memory footprint. Entries are shared between requests: treat them as read-only.
+    """
+    def __init__(self, max_bytes=2 << 30):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # key -> (source_info, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(source_path, **kwargs):
+        h = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        opts = ",".join(f"{k}={kwargs[k]!r}" for k in sorted(kwargs))
+        return f"{h.hexdigest()}|{opts}"
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, source_info):
+        nbytes = _nbytes(source_info)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (source_info, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, dropped) = self._items.popitem(last=False)
+                self._bytes -= dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
 class AvatarRegistrar:
     """
     source image|video -> rgb_list -> source_info
@@ -18,4 +18,7 @@ class DecodeF3D:
     def __call__(self, f_s):
         out = self.decoder(f_s)
         return out
-    
\ No newline at end of file
+
+    def batch(self, f_3d):
+        """f_3d: (N, ...) -> [N, h, w, c]"""
+        return self.decoder.batch(f_3d)
@@ -25,6 +25,10 @@ kwargs:
 """
 
 
+# ctrl kwargs handled by ctrl_motion; MotionStitch.batch runs frames using them one by one
+_CTRL_MOTION_KEYS = ("delta_pitch", "delta_yaw", "delta_roll", "alpha_pitch", "alpha_yaw", "alpha_roll", "delta_exp")
+
+
 def ctrl_motion(x_d_info, **kwargs):
     # pose + offset
     for kk in ["delta_pitch", "delta_yaw", "delta_roll"]:
@@ -205,6 +209,27 @@ def _fix_gaze(pose_s, x_d_info):
     return x_d_info
 
 
+def _fix_gaze_batch(pose_s, x_d_info):
+    """_fix_gaze for stacked x_d_info {k: (B, dim)}"""
+    x_ratio = 0.26
+    y_ratio = 0.28
+
+    yaw_s, pitch_s = pose_s
+    yaw_d = bin66_to_degree(x_d_info['yaw']).astype(np.float64)
+    pitch_d = bin66_to_degree(x_d_info['pitch']).astype(np.float64)
+
+    dx = (yaw_d - yaw_s) * x_ratio
+    dy = (pitch_d - pitch_s) * y_ratio
+
+    exp = x_d_info['exp'].copy()
+    exp[:, 33] += np.where(dx > 0, dx * 0.0007, dx * 0.001)
+    exp[:, 45] += np.where(dx > 0, dx * 0.001, dx * 0.0007)
+    exp[:, 34] += dy * -0.001
+    exp[:, 46] += dy * -0.001
+    x_d_info['exp'] = exp
+    return x_d_info
+
+
 def get_rotation_matrix(pitch_, yaw_, roll_):
     """ the input is in degree
     """
@@ -489,3 +514,113 @@ class MotionStitch:
         self.idx += 1
 
         return x_s, x_d
+
+    def batch(self, x_s_info, x_d_info_list, ctrl_kwargs_list):
+        """
+        x_s_info: {k: (1, dim)} shared by all frames, or {k: (B, dim)} one row per frame
+        x_d_info_list: [{k: (1, dim)}] * B, consecutive frames
+        ctrl_kwargs_list: [dict] * B
+        return: x_s (1|B, 21, 3), x_d (B, 21, 3)
+
+        Same as calling the stitcher frame by frame, but mixing, eye/lip fixes, fades, gaze,
+        keypoint transforms and the stitching network run once on stacked arrays.
+        Batches with pose/exp controls (ctrl_motion) or mixed fade_out_keys go frame by frame.
+        """
+        B = len(x_d_info_list)
+        kwargs_list = [self._merge_kwargs(self.overall_ctrl_info, dict(kw)) for kw in ctrl_kwargs_list]
+        fade_keys_set = {tuple(kw.get("fade_out_keys", self.fade_out_keys) or ()) for kw in kwargs_list}
+        if len(fade_keys_set) > 1 or any(k in kw for kw in kwargs_list for k in _CTRL_MOTION_KEYS):
+            return self._batch_by_frame(x_s_info, x_d_info_list, kwargs_list)
+
+        s0 = {k: v[0:1] for k, v in x_s_info.items()}
+        if self.scale_ratio is None:
+            self.scale_b = s0['scale'].item()
+            self.scale_ratio = self.scale_a / self.scale_b
+            self._set_scale_ratio(self.scale_ratio)
+
+        if self.relative_d and self.d0 is None:
+            self.d0 = copy.deepcopy(x_d_info_list[0])
+
+        x_d_info = {k: np.concatenate([d[k] for d in x_d_info_list], 0) for k in x_d_info_list[0]}
+        x_d_info = _mix_s_d_info(
+            x_s_info,
+            x_d_info,
+            self.use_d_keys,
+            self.d0,
+        )
+        x_d_info = {k: v if len(v) == B else np.repeat(v, B, 0) for k, v in x_d_info.items()}
+
+        delta_eye = 0
+        if self.drive_eye and self.delta_eye_arr is not None:
+            n = len(self.delta_eye_idx_list)
+            delta_eye = self.delta_eye_arr[[self.delta_eye_idx_list[(self.idx + b) % n] for b in range(B)]]
+        x_d_info = _fix_exp_for_x_d_info_v2(
+            x_d_info,
+            x_s_info,
+            delta_eye,
+            self.fix_exp_a1,
+            self.fix_exp_a2,
+            self.fix_exp_a3,
+        )
+
+        vad_alpha = np.array([kw.get("vad_alpha", 1) for kw in kwargs_list], dtype=np.float32)[:, None]
+        if (vad_alpha < 1).any():
+            exp = x_d_info["exp"]
+            x_d_info["exp"] = np.where(vad_alpha < 1, exp * vad_alpha + x_s_info["exp"] * (1 - vad_alpha), exp)
+
+        if self.fade_type == "d0" and self.fade_dst is None:
+            self.fade_dst = {k: v[0:1].copy() for k, v in x_d_info.items()}
+
+        # fade
+        fade_mask = np.array(["fade_alpha" in kw for kw in kwargs_list])[:, None]
+        if fade_mask.any() and self.fade_type in ["d0", "s"]:
+            fade_alpha = np.array([kw.get("fade_alpha", 1) for kw in kwargs_list], dtype=np.float32)[:, None]
+            fade_keys = kwargs_list[0].get("fade_out_keys", self.fade_out_keys)
+            if self.fade_type == "d0":
+                fade_dst = self.fade_dst
+            elif self.fade_type == "s":
+                if self.fade_dst is not None:
+                    fade_dst = self.fade_dst
+                else:
+                    fade_dst = copy.deepcopy(x_s_info)
+                    if self.is_image_flag:
+                        self.fade_dst = fade_dst
+            for k in (x_d_info.keys() if fade_keys is None else fade_keys):
+                if k == 'kp':
+                    continue
+                v = x_d_info[k]
+                x_d_info[k] = np.where(fade_mask, v * fade_alpha + fade_dst[k] * (1 - fade_alpha), v)
+
+        if self.drive_eye:
+            if self.pose_s is None:
+                yaw_s = bin66_to_degree(s0['yaw']).item()
+                pitch_s = bin66_to_degree(s0['pitch']).item()
+                self.pose_s = [yaw_s, pitch_s]
+            x_d_info = _fix_gaze_batch(self.pose_s, x_d_info)
+
+        if self.x_s is not None:
+            x_s = self.x_s
+        else:
+            x_s = transform_keypoint(x_s_info)
+            if self.is_image_flag:
+                self.x_s = x_s
+
+        x_d = transform_keypoint(x_d_info)
+
+        if self.flag_stitching:
+            x_d = self.stitch_net(x_s if len(x_s) == B else np.repeat(x_s, B, 0), x_d)
+
+        self.idx += B
+
+        return x_s, x_d
+
+    def _batch_by_frame(self, x_s_info, x_d_info_list, kwargs_list):
+        per_frame = len(next(iter(x_s_info.values()))) > 1
+        x_s_list, x_d_list = [], []
+        for b, (x_d_info, kwargs) in enumerate(zip(x_d_info_list, kwargs_list)):
+            x_s_info_b = {k: v[b:b + 1] for k, v in x_s_info.items()} if per_frame else x_s_info
+            x_s, x_d = self(x_s_info_b, x_d_info, **kwargs)
+            x_s_list.append(x_s)
+            x_d_list.append(x_d)
+        x_s = np.concatenate(x_s_list, 0) if per_frame else x_s_list[0]
+        return x_s, np.concatenate(x_d_list, 0)
@@ -1,3 +1,6 @@
+import queue
+import threading
+
 import cv2
 import numpy as np
 
@@ -31,6 +34,30 @@ class PutBackNumpy:
         return result
     
 
+class BufferPool:
+    """
+    Reusable output frames for PutBack. A frame goes back with release() once
+    nothing reads it anymore (after the writer); at most max_free are kept.
+    """
+    def __init__(self, max_free=8):
+        self._free = queue.Queue(maxsize=max_free)
+
+    def acquire(self, shape, dtype=np.uint8):
+        try:
+            buf = self._free.get_nowait()
+            if buf.shape == shape and buf.dtype == dtype:
+                return buf
+        except queue.Empty:
+            pass
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buf):
+        try:
+            self._free.put_nowait(buf)
+        except queue.Full:
+            pass
+
+
 class PutBack:
     def __init__(
         self,
@@ -43,19 +70,45 @@ class PutBack:
             mask = cv2.imread(mask_template_path, cv2.IMREAD_COLOR).astype(np.float32) / 255.0
 
         self.mask_ori_float = np.ascontiguousarray(mask)[:,:,0]
-        self.result_buffer = None
+        self.mask_cache = None    # see setup
+        self._scratch = threading.local()   # per-thread warp output
 
-    def __call__(self, frame_rgb, render_image, M_c2o):
-        h, w = frame_rgb.shape[:2]
+    def setup(self, is_image_flag=True):
+        """
+        Per session. A static image has a single M_c2o, so its warped mask is computed
+        once and then only read (by every putback worker); video sources warp per frame.
+        """
+        self.mask_cache = {} if is_image_flag else None
+
+    def _warp_mask(self, M_c2o, h, w):
+        key = (M_c2o[:2].tobytes(), h, w)
+        if self.mask_cache is not None:
+            mask_warped = self.mask_cache.get(key)
+            if mask_warped is not None:
+                return mask_warped
         mask_warped = cv2.warpAffine(
             self.mask_ori_float, M_c2o[:2, :], dsize=(w, h), flags=cv2.INTER_LINEAR
         ).clip(0, 1)
+        if self.mask_cache is not None:
+            self.mask_cache[key] = mask_warped
+        return mask_warped
+
+    def __call__(self, frame_rgb, render_image, M_c2o, out=None):
+        """out: optional (h, w, 3) uint8 buffer for the result, e.g. from a BufferPool"""
+        h, w = frame_rgb.shape[:2]
+        mask_warped = self._warp_mask(M_c2o, h, w)
+
+        frame_warped = getattr(self._scratch, "frame_warped", None)
+        if frame_warped is None or frame_warped.shape != (h, w, 3) or frame_warped.dtype != render_image.dtype:
+            frame_warped = None
         frame_warped = cv2.warpAffine(
-            render_image, M_c2o[:2, :], dsize=(w, h), flags=cv2.INTER_LINEAR
+            render_image, M_c2o[:2, :], dsize=(w, h), dst=frame_warped, flags=cv2.INTER_LINEAR
         )
-        self.result_buffer = np.empty((h, w, 3), dtype=np.uint8)
+        self._scratch.frame_warped = frame_warped
+
+        result = np.empty((h, w, 3), dtype=np.uint8) if out is None else out
 
         # Use Cython implementation for blending
-        blend_images_cy(mask_warped, frame_warped, frame_rgb, self.result_buffer)
+        blend_images_cy(mask_warped, frame_warped, frame_rgb, result)
 
-        return self.result_buffer
\ No newline at end of file
+        return result
@@ -1,3 +1,4 @@
+import hashlib
 import math
 
 import librosa
@@ -28,6 +29,9 @@ class Wav2Feat:
             self.support_streaming = True
         else:
             raise ValueError(f"Unsupported w2f_type: {w2f_type}")
+
+        # offline features of audio rendered before, keyed by sample hash; a SourceInfoCache set by the SDK
+        self.feat_cache = None
         
     def __call__(
         self, 
@@ -52,12 +56,24 @@ class Wav2Feat:
         chunksize=(3, 5, 2),
     ):
         # for offline
+        key = None
+        if self.feat_cache is not None and norm_mean_std is None:
+            h = hashlib.sha256(np.ascontiguousarray(audio).tobytes()).hexdigest()
+            key = f"{h}|{self.w2f_type}|sr={sr}|chunksize={tuple(chunksize)}"
+            feat = self.feat_cache.get(key)
+            if feat is not None:
+                return feat
+
         if self.w2f_type == "hubert":
             feat = self.w2f.wav2feat(audio, sr=sr, chunksize=chunksize)
         elif self.w2f_type == "s2g":
             feat = self.w2f(audio, sr=sr, norm_mean_std=norm_mean_std)
         else:
             raise ValueError(f"Unsupported w2f_type: {self.w2f_type}")
+
+        if key is not None:
+            feat.setflags(write=False)    # shared by every session that renders this audio
+            self.feat_cache.put(key, feat)
         return feat
     
 
@@ -80,8 +96,8 @@ class Wav2FeatHubert:
         valid_feat = valid_encoding.reshape(chunksize[1], 2, 1024).mean(1)    # [5, 1024]
         return valid_feat
 
-    def wav2feat(self, audio, sr, chunksize=(3, 5, 2)):
-        # for offline
+    def wav2feat(self, audio, sr, chunksize=(3, 5, 2), batch_size=32):
+        # for offline: the windows are independent, so they go through HuBERT batch_size at a time
         if sr != 16000:
             audio_16k = librosa.resample(audio, orig_sr=sr, target_sr=16000)
         else:
@@ -89,23 +105,21 @@ class Wav2FeatHubert:
 
         num_f = math.ceil(len(audio_16k) / 16000 * 25)
         split_len = int(sum(chunksize) * 0.04 * 16000) + 80    # 6480
+        valid_feat_s = - sum(chunksize[1:]) * 2   # -7
+        valid_feat_e = - chunksize[2] * 2   # -2
 
         speech_pad = np.concatenate([
             np.zeros((split_len - int(sum(chunksize[1:]) * 0.04 * 16000),), dtype=audio_16k.dtype),
             audio_16k,
             np.zeros((split_len,), dtype=audio_16k.dtype),
         ], 0)
-        
-        i = 0
-        res_lst = []
-        while i < num_f:
-            sss = int(i * 0.04 * 16000)
-            eee = sss + split_len
-            audio_chunk = speech_pad[sss:eee]
-            valid_feat = self.__call__(audio_chunk, chunksize)
-            res_lst.append(valid_feat)
-            i += chunksize[1]
-        
-        ret = np.concatenate(res_lst, 0)
-        ret = ret[:num_f]
-        return ret
+        starts = [int(i * 0.04 * 16000) for i in range(0, num_f, chunksize[1])]
+        windows = np.lib.stride_tricks.sliding_window_view(speech_pad, split_len)
+
+        ret = np.empty((len(starts) * chunksize[1], 1024), dtype=np.float32)
+        for b in range(0, len(starts), batch_size):
+            audio_chunks = np.ascontiguousarray(windows[starts[b:b + batch_size]])
+            encoding = self.hubert.batch(audio_chunks)[:, valid_feat_s:valid_feat_e]
+            valid_feat = encoding.reshape(len(audio_chunks), chunksize[1], 2, 1024).mean(2)
+            ret[b * chunksize[1]:(b + len(audio_chunks)) * chunksize[1]] = valid_feat.reshape(-1, 1024)
+        return ret[:num_f]
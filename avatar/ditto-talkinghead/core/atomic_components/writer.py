@@ -1,6 +1,10 @@
 import os
+import subprocess
+import tempfile
+import threading
 
 import imageio
+import numpy as np
 
 
 class VideoWriterByImageIO:
@@ -35,3 +39,107 @@ class VideoWriterByImageIO:
 
     def close(self):
         self.writer.close()
+
+
+class VideoWriterByFFmpeg:
+    """
+    Raw RGB frames go straight into one ffmpeg process on stdin. With audio_path the WAV is
+    the second input and gets muxed in the same pass, so no temporary video and no remux.
+    fragmented=True writes fragmented MP4 that players can start on while it is still written.
+    With on_data=callable nothing is written to disk: ffmpeg writes to stdout and every chunk
+    (fragmented MP4, or MPEG-TS with container="mpegts") is handed to on_data as it comes out.
+    low_latency=True tunes x264 for zero latency and flushes every frame, for live streams.
+    The process starts with the first frame, once the frame size is known.
+    """
+    def __init__(self, video_path=None, fps=25, audio_path=None, **kwargs):
+        self.video_path = video_path
+        self.fps = fps
+        self.audio_path = audio_path
+        self.vcodec = kwargs.get("vcodec", "libx264")
+        self.preset = kwargs.get("preset", "veryfast")
+        self.crf = kwargs.get("crf", 18)
+        self.pixelformat = kwargs.get("pixelformat", "yuv420p")
+        self.acodec = kwargs.get("acodec", "aac")
+        self.on_data = kwargs.get("on_data", None)
+        self.container = kwargs.get("container", "mp4")    # "mp4" | "mpegts"
+        self.fragmented = kwargs.get("fragmented", False) or self.on_data is not None
+        self.low_latency = kwargs.get("low_latency", False)
+        # short GOPs so fragments/segments (cut at keyframes) come out every couple of seconds
+        self.gop = kwargs.get("gop", fps * 2 if self.fragmented else None)
+        self.ffmpeg_bin = kwargs.get("ffmpeg_bin", "ffmpeg")
+
+        if self.on_data is None:
+            os.makedirs(os.path.dirname(video_path) or ".", exist_ok=True)
+        self.proc = None
+        self._stderr = None
+        self._pump_thread = None
+
+    def _cmd(self, w, h):
+        cmd = [
+            self.ffmpeg_bin, "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(self.fps), "-i", "pipe:0",
+        ]
+        if self.audio_path is not None:
+            cmd += ["-i", self.audio_path, "-map", "0:v", "-map", "1:a", "-c:a", self.acodec]
+        cmd += [
+            "-c:v", self.vcodec, "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", self.pixelformat,
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",   # yuv420p needs even sizes
+        ]
+        if self.gop is not None:
+            cmd += ["-g", str(self.gop)]
+        if self.low_latency:
+            cmd += ["-tune", "zerolatency", "-flush_packets", "1"]
+        if self.container == "mp4" and self.fragmented:
+            movflags = "+frag_keyframe+empty_moov+default_base_moof"
+            cmd += ["-movflags", movflags + "+frag_every_frame" if self.low_latency else movflags]
+        cmd += ["-f", self.container, "pipe:1" if self.on_data is not None else self.video_path]
+        return cmd
+
+    def _start(self, w, h):
+        self._stderr = tempfile.TemporaryFile()
+        stdout = subprocess.DEVNULL if self.on_data is None else subprocess.PIPE
+        self.proc = subprocess.Popen(self._cmd(w, h), stdin=subprocess.PIPE, stdout=stdout, stderr=self._stderr)
+        if self.on_data is not None:
+            self._pump_thread = threading.Thread(target=self._pump, daemon=True)
+            self._pump_thread.start()
+
+    def _pump(self):
+        while True:
+            data = self.proc.stdout.read1(1 << 16)
+            if not data:
+                break
+            self.on_data(data)
+
+    def _error(self):
+        self._stderr.seek(0)
+        msg = self._stderr.read().decode(errors="replace").strip()
+        return RuntimeError(f"ffmpeg failed (exit {self.proc.returncode}): {msg[-2000:]}")
+
+    def __call__(self, img, fmt="bgr"):
+        if fmt == "bgr":
+            frame = img[..., ::-1]
+        else:
+            frame = img
+        if self.proc is None:
+            self._start(frame.shape[1], frame.shape[0])
+        try:
+            self.proc.stdin.write(memoryview(np.ascontiguousarray(frame, dtype=np.uint8)))
+        except BrokenPipeError:
+            self.proc.wait()
+            raise self._error()
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if self._pump_thread is not None:
+            self._pump_thread.join()
+        self.proc.wait()
+        try:
+            if self.proc.returncode != 0:
+                raise self._error()
+        finally:
+            self._stderr.close()
@@ -1,3 +1,5 @@
+import numpy as np
+
 from ..utils.load_model import load_model
 
 
@@ -10,9 +12,19 @@ class HubertStreaming:
         self.model, self.model_type = load_model(model_path, device=device, **kwargs)
         self.device = device
 
+        # the exported graph drops the batch axis from its output; several windows go through
+        # in one run only if a graph keeps a dynamic one, otherwise batch() loops
+        session = self.model.session if self.model_type == "ori" else self.model
+        if self.model_type in ("onnx", "ori"):
+            self.batch_ok = not isinstance(session.get_inputs()[0].shape[0], int) and len(session.get_outputs()[0].shape) == 3
+        else:
+            self.batch_ok = False
+
     def forward_chunk(self, audio_chunk):
         if self.model_type == "onnx":
             output = self.model.run(None, {"input_values": audio_chunk.reshape(1, -1)})[0]
+            if output.ndim == 3:
+                output = output[0]    # graphs exported with a batch axis
         elif self.model_type == "tensorrt":
             self.model.setup({"input_values": audio_chunk.reshape(1, -1)})
             self.model.infer()
@@ -27,3 +39,10 @@ class HubertStreaming:
         else:
             output = self.forward_chunk(audio_chunk)
         return output
+
+    def batch(self, audio_chunks):
+        """audio_chunks: (B, L) -> (B, T, 1024)"""
+        if len(audio_chunks) > 1 and self.batch_ok:
+            session = self.model.session if self.model_type == "ori" else self.model
+            return session.run(None, {"input_values": audio_chunks})[0]
+        return np.stack([self(audio_chunk) for audio_chunk in audio_chunks], 0)
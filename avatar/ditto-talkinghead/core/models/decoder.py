@@ -11,9 +11,28 @@ class Decoder:
         }
         self.model, self.model_type = load_model(model_path, device=device, **kwargs)
         self.device = device
-        
+
+        # a batch of frames goes through in one run unless the engine/graph has a fixed batch of 1
+        if self.model_type == "onnx":
+            self.batch_ok = not isinstance(self.model.get_inputs()[0].shape[0], int)
+        else:
+            self.batch_ok = self.model_type == "pytorch"
+
     def __call__(self, feature):
+        pred = self._run(feature)
+        pred = np.transpose(pred[0], [1, 2, 0]).clip(0, 1) * 255    # [h, w, c]
+        
+        return pred
+
+    def batch(self, feature):
+        """feature: (N, 256, 64, 64) -> (N, h, w, c)"""
+        if len(feature) > 1 and not self.batch_ok:
+            pred = np.concatenate([self._run(feature[i:i + 1]) for i in range(len(feature))], 0)
+        else:
+            pred = self._run(feature)
+        return np.transpose(pred, [0, 2, 3, 1]).clip(0, 1) * 255
 
+    def _run(self, feature):
         if self.model_type == "onnx":
             pred = self.model.run(None, {"feature": feature})[0]
         elif self.model_type == "tensorrt":
@@ -25,7 +44,5 @@ class Decoder:
                 pred = self.model(torch.from_numpy(feature).to(self.device)).float().cpu().numpy()
         else:
             raise ValueError(f"Unsupported model type: {self.model_type}")
-        
-        pred = np.transpose(pred[0], [1, 2, 0]).clip(0, 1) * 255    # [h, w, c]
-        
+
         return pred
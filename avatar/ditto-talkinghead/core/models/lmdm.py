@@ -1,3 +1,5 @@
+import threading
+
 import numpy as np
 import torch
 
@@ -27,6 +29,9 @@ class LMDM:
         self.audio_feat_dim = kwargs.get("audio_feat_dim", 1024+35)
         self.seq_frames = kwargs.get("seq_frames", 80)
 
+        # the DDIM schedule lives on the model; sessions sharing this LMDM may ask for different step counts
+        self._lock = threading.Lock()
+
         if self.model_type == "pytorch":
             pass
         else:
@@ -34,23 +39,27 @@ class LMDM:
 
     def setup(self, sampling_timesteps):
         if self.model_type == "pytorch":
-            self.model.setup(sampling_timesteps)
+            with self._lock:
+                self.model.setup(sampling_timesteps)
         else:
             self._setup_np(sampling_timesteps)
 
     def _init_np(self):
-        self.sampling_timesteps = None
+        self._np_schedules = {}   # sampling_timesteps -> schedule, see _setup_np
         self.n_timestep = 1000
 
         betas = torch.Tensor(make_beta(n_timestep=self.n_timestep))
         alphas = 1.0 - betas
         self.alphas_cumprod = torch.cumprod(alphas, axis=0).cpu().numpy()
 
+        # onnx graphs exported with a dynamic batch axis denoise all clips in one run per timestep;
+        # tensorrt engines and fixed-batch graphs fall back to one call per clip
+        self.batch_ok = self.model_type == "onnx" and not isinstance(self.model.get_inputs()[0].shape[0], int)
+
     def _setup_np(self, sampling_timesteps=50):
-        if self.sampling_timesteps == sampling_timesteps:
-            return
-        
-        self.sampling_timesteps = sampling_timesteps
+        schedule = self._np_schedules.get(sampling_timesteps)
+        if schedule is not None:
+            return schedule
 
         total_timesteps = self.n_timestep
         eta = 1
@@ -58,17 +67,18 @@ class LMDM:
 
         times = torch.linspace(-1, total_timesteps - 1, steps=sampling_timesteps + 1)   # [-1, 0, 1, 2, ..., T-1] when sampling_timesteps == total_timesteps
         times = list(reversed(times.int().tolist()))
-        self.time_pairs = list(zip(times[:-1], times[1:])) # [(T-1, T-2), (T-2, T-3), ..., (1, 0), (0, -1)]
-
-        self.time_cond_list = []
-        self.alpha_next_sqrt_list = []
-        self.sigma_list = []
-        self.c_list = []
-        self.noise_list = []
-
-        for time, time_next in self.time_pairs:
+        schedule = {
+            "time_pairs": list(zip(times[:-1], times[1:])), # [(T-1, T-2), (T-2, T-3), ..., (1, 0), (0, -1)]
+            "time_cond_list": [],
+            "alpha_next_sqrt_list": [],
+            "sigma_list": [],
+            "c_list": [],
+            "noise_list": [],
+        }
+
+        for time, time_next in schedule["time_pairs"]:
             time_cond = np.full((1,), time, dtype=np.int64)
-            self.time_cond_list.append(time_cond)
+            schedule["time_cond_list"].append(time_cond)
             if time_next < 0:
                 continue
 
@@ -79,10 +89,14 @@ class LMDM:
             c = np.sqrt(1 - alpha_next - sigma ** 2)
             noise = np.random.randn(*shape).astype(np.float32)
             
-            self.alpha_next_sqrt_list.append(np.sqrt(alpha_next))
-            self.sigma_list.append(sigma)
-            self.c_list.append(c)
-            self.noise_list.append(noise)
+            schedule["alpha_next_sqrt_list"].append(np.sqrt(alpha_next))
+            schedule["sigma_list"].append(sigma)
+            schedule["c_list"].append(c)
+            schedule["noise_list"].append(noise)
+
+        # built outside the dict so concurrent readers never see a half-filled schedule
+        self._np_schedules[sampling_timesteps] = schedule
+        return schedule
 
     def _one_step(self, x, cond_frame, cond, time_cond):
         if self.model_type == "onnx":
@@ -100,27 +114,40 @@ class LMDM:
         
         return pred_noise, x_start
 
+    def _batch_step(self, x, cond_frame, cond, time_cond):
+        B = x.shape[0]
+        if B == 1:
+            return self._one_step(x, cond_frame, cond, time_cond)
+        if self.batch_ok:
+            return self._one_step(x, cond_frame, cond, np.repeat(time_cond, B))
+        pred_noise, x_start = np.empty_like(x), np.empty_like(x)
+        for b in range(B):
+            # copied out right away, tensorrt reuses its output buffers
+            pred_noise[b:b + 1], x_start[b:b + 1] = self._one_step(x[b:b + 1], cond_frame[b:b + 1], cond[b:b + 1], time_cond)
+        return pred_noise, x_start
+
     def _call_np(self, kp_cond, aud_cond, sampling_timesteps):
-        self._setup_np(sampling_timesteps)
+        schedule = self._setup_np(sampling_timesteps)
 
         cond_frame = kp_cond
         cond = aud_cond
 
-        x = np.random.randn(1, self.seq_frames, self.motion_feat_dim).astype(np.float32)
+        # kp_cond: [B, dim], aud_cond: [B, seq_frames, dim]; the schedule noise is shared by the batch
+        x = np.random.randn(len(kp_cond), self.seq_frames, self.motion_feat_dim).astype(np.float32)
 
         x_start = None
         i = 0
-        for _, time_next in self.time_pairs:
-            time_cond = self.time_cond_list[i]
-            pred_noise, x_start = self._one_step(x, cond_frame, cond, time_cond)
+        for _, time_next in schedule["time_pairs"]:
+            time_cond = schedule["time_cond_list"][i]
+            pred_noise, x_start = self._batch_step(x, cond_frame, cond, time_cond)
             if time_next < 0:
                 x = x_start
                 continue
 
-            alpha_next_sqrt = self.alpha_next_sqrt_list[i]
-            c = self.c_list[i]
-            sigma = self.sigma_list[i]
-            noise = self.noise_list[i]
+            alpha_next_sqrt = schedule["alpha_next_sqrt_list"][i]
+            c = schedule["c_list"][i]
+            sigma = schedule["sigma_list"][i]
+            noise = schedule["noise_list"][i]
             x = x_start * alpha_next_sqrt + c * pred_noise + sigma * noise
 
             i += 1
@@ -129,11 +156,12 @@ class LMDM:
 
     def __call__(self, kp_cond, aud_cond, sampling_timesteps):
         if self.model_type == "pytorch":
-            pred_kp_seq = self.model.ddim_sample(
-                torch.from_numpy(kp_cond).to(self.device), 
-                torch.from_numpy(aud_cond).to(self.device), 
-                sampling_timesteps,
-            ).cpu().numpy()
+            with self._lock:
+                pred_kp_seq = self.model.ddim_sample(
+                    torch.from_numpy(kp_cond).to(self.device), 
+                    torch.from_numpy(aud_cond).to(self.device), 
+                    sampling_timesteps,
+                ).cpu().numpy()
         else:
             pred_kp_seq = self._call_np(kp_cond, aud_cond, sampling_timesteps)
         return pred_kp_seq
@@ -132,13 +132,14 @@ class LMDM(nn.Module):
         cond_frame = kp_cond
         cond = aud_cond
 
-        shape = (1, self.seq_frames, self.motion_feat_dim)
+        # kp_cond: [B, dim], aud_cond: [B, seq_frames, dim]; the schedule noise is shared by the batch
+        shape = (kp_cond.shape[0], self.seq_frames, self.motion_feat_dim)
         x = torch.randn(shape, device=self.device)
 
         x_start = None
         i = 0
         for _, time_next in self.time_pairs:
-            time_cond = self.time_cond_list[i]
+            time_cond = self.time_cond_list[i].expand(shape[0])
             pred_noise, x_start = self.model_predictions(x, cond_frame, cond, time_cond)
             if time_next < 0:
                 x = x_start
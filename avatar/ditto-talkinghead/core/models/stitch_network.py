@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 from ..utils.load_model import load_model
@@ -11,7 +12,19 @@ class StitchNetwork:
         self.model, self.model_type = load_model(model_path, device=device, **kwargs)
         self.device = device
 
+        # a batch of frames goes through in one run unless the engine/graph has a fixed batch of 1
+        if self.model_type == "onnx":
+            self.batch_ok = not isinstance(self.model.get_inputs()[0].shape[0], int)
+        else:
+            self.batch_ok = self.model_type == "pytorch"
+
     def __call__(self, kp_source, kp_driving):
+        """kp_source, kp_driving: (B, 21, 3)"""
+        if len(kp_driving) > 1 and not self.batch_ok:
+            return np.concatenate([self._run(kp_source[i:i + 1], kp_driving[i:i + 1]) for i in range(len(kp_driving))], 0)
+        return self._run(kp_source, kp_driving)
+
+    def _run(self, kp_source, kp_driving):
         if self.model_type == "onnx":
             pred = self.model.run(None, {"kp_source": kp_source, "kp_driving": kp_driving})[0]
         elif self.model_type == "tensorrt":
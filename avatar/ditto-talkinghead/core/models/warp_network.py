@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 from ..utils.load_model import load_model
@@ -11,11 +12,22 @@ class WarpNetwork:
         self.model, self.model_type = load_model(model_path, device=device, **kwargs)
         self.device = device
 
+        # a batch of frames goes through in one run unless the engine/graph has a fixed batch of 1
+        if self.model_type == "onnx":
+            self.batch_ok = not isinstance(self.model.get_inputs()[0].shape[0], int)
+        else:
+            self.batch_ok = self.model_type == "pytorch"
+
     def __call__(self, feature_3d, kp_source, kp_driving):
         """
-        feature_3d: np.ndarray, shape (1, 32, 16, 64, 64)
-        kp_source | kp_driving: np.ndarray, shape (1, 21, 3)
+        feature_3d: np.ndarray, shape (N, 32, 16, 64, 64)
+        kp_source | kp_driving: np.ndarray, shape (N, 21, 3)
         """
+        if len(kp_driving) > 1 and not self.batch_ok:
+            return np.concatenate([self._run(feature_3d[i:i + 1], kp_source[i:i + 1], kp_driving[i:i + 1]) for i in range(len(kp_driving))], 0)
+        return self._run(feature_3d, kp_source, kp_driving)
+
+    def _run(self, feature_3d, kp_source, kp_driving):
         if self.model_type == "onnx":
             pred = self.model.run(None, {"feature_3d": feature_3d, "kp_source": kp_source, "kp_driving": kp_driving})[0]
         elif self.model_type == "tensorrt":
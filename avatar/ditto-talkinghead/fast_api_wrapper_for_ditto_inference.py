@@ -2,32 +2,42 @@
 FastAPI wrapper to expose your Ditto model's `run` function as a simple API.
 
 - POST /infer  with JSON { audio_path, source_path, output_path, optional setup_kwargs/run_kwargs }
+  stream=true returns fragmented MP4 (or MPEG-TS) chunks while the video is still rendering.
+- PUT  /avatars/{avatar_id} to pre-register a source image once; /infer can then pass avatar_id instead of a source upload.
+- WS   /live?avatar_id=... streams PCM in and low-latency video out (online mode), for pairing with streaming TTS.
 - GET  /health for a quick health check.
 
 Notes
 -----
 * The StreamSDK is initialized **once** at startup and reused for all requests.
-* A global lock prevents concurrent GPU access. If you want parallelism, shard GPUs and run multiple workers.
+* Each request runs in its own StreamSession; DITTO_MAX_SESSIONS (default 1) bounds how many run at once.
+  With TensorRT engines the SDK is not thread-safe and the limit is forced to 1.
 * Start with: `uvicorn app:app --host 0.0.0.0 --port 8000 --workers 1`
 """
 
+import asyncio
+import glob
 import math
 import os
 import pickle
+import queue
 import random
+import re
 import threading
 from typing import Any, Dict, Optional
 
 import librosa
 import numpy as np
 import torch
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 # -----------------------------
 # Your SDK import
 # -----------------------------
+from core.atomic_components.audio2motion import SAMPLING_PRESETS
 from stream_pipeline_offline import StreamSDK
 
 
@@ -73,7 +83,8 @@ def run_inference(
     os.makedirs(os.path.dirname(os.path.abspath(output_path)) or ".", exist_ok=True)
 
     # ---- Original logic ----
-    SDK.setup(source_path, output_path, **setup_kwargs)
+    session = SDK.new_session()
+    session.setup(source_path, output_path, audio_path=audio_path, **setup_kwargs)
 
     audio, sr = librosa.core.load(audio_path, sr=16000)
     num_f = math.ceil(len(audio) / 16000 * 25)
@@ -81,9 +92,9 @@ def run_inference(
     fade_in = run_kwargs.get("fade_in", -1)
     fade_out = run_kwargs.get("fade_out", -1)
     ctrl_info = run_kwargs.get("ctrl_info", {})
-    SDK.setup_Nd(N_d=num_f, fade_in=fade_in, fade_out=fade_out, ctrl_info=ctrl_info)
+    session.setup_Nd(N_d=num_f, fade_in=fade_in, fade_out=fade_out, ctrl_info=ctrl_info)
 
-    online_mode = SDK.online_mode
+    online_mode = session.online_mode
     if online_mode:
         chunksize = run_kwargs.get("chunksize", (3, 5, 2))
         audio = np.concatenate([np.zeros((chunksize[0] * 640,), dtype=np.float32), audio], 0)
@@ -92,23 +103,24 @@ def run_inference(
             audio_chunk = audio[i: i + split_len]
             if len(audio_chunk) < split_len:
                 audio_chunk = np.pad(audio_chunk, (0, split_len - len(audio_chunk)), mode="constant")
-            SDK.run_chunk(audio_chunk, chunksize)
+            session.run_chunk(audio_chunk, chunksize)
     else:
-        aud_feat = SDK.wav2feat.wav2feat(audio)
-        SDK.audio2motion_queue.put(aud_feat)
+        aud_feat = session.wav2feat.wav2feat(audio)
+        session.audio2motion_queue.put(aud_feat)
 
-    SDK.close()
+    session.close()
 
-    # Mux video and audio with ffmpeg
-    cmd = (
-        f'ffmpeg -loglevel error -y -i "{SDK.tmp_output_path}" '
-        f'-i "{audio_path}" -map 0:v -map 1:a -c:v copy -c:a aac "{output_path}"'
-    )
-    ret = os.system(cmd)
-    if ret != 0:
-        raise RuntimeError("ffmpeg muxing failed. Ensure ffmpeg is installed and inputs are valid.")
+    # Mux video and audio with ffmpeg (the ffmpeg writer already did, in the same pass as encoding)
+    if not session.muxed_output:
+        cmd = (
+            f'ffmpeg -loglevel error -y -i "{session.tmp_output_path}" '
+            f'-i "{audio_path}" -map 0:v -map 1:a -c:v copy -c:a aac "{output_path}"'
+        )
+        ret = os.system(cmd)
+        if ret != 0:
+            raise RuntimeError("ffmpeg muxing failed. Ensure ffmpeg is installed and inputs are valid.")
 
-    if not os.path.isfile(output_path):
+    if session.stream_sink is None and not os.path.isfile(output_path):
         raise RuntimeError("Output file missing after ffmpeg step.")
 
     return output_path
@@ -138,9 +150,129 @@ class InferenceResponse(BaseModel):
 
 app = FastAPI(title="Ditto Inference API", version="1.0.0")
 
-# Global SDK instance + lock for single-GPU safety
+# Global SDK instance + bound on concurrently running sessions
 _SDK: Optional[StreamSDK] = None
-_sdk_lock = threading.Lock()
+_session_slots = threading.BoundedSemaphore(1)
+
+# Pre-registered avatar sources are kept on disk as <avatar_id><ext>
+AVATAR_DIR = os.getenv("DITTO_AVATAR_DIR", "./avatars")
+_AVATAR_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+# Streamed /infer: encoded chunks waiting for the client. Bounded, so a slow client slows
+# the render down (through the ffmpeg pipe and the session queues) instead of piling up bytes.
+STREAM_BUFFER_CHUNKS = int(os.getenv("DITTO_STREAM_BUFFER_CHUNKS", "64"))
+_STREAM_MEDIA_TYPES = {"fmp4": "video/mp4", "ts": "video/mp2t"}
+_STREAM_DONE = object()
+
+
+def _put_until_cancelled(q: "queue.Queue[Any]", item: Any, cancelled: threading.Event) -> None:
+    while not cancelled.is_set():
+        try:
+            q.put(item, timeout=1)
+            return
+        except queue.Full:
+            continue
+    # client went away: drop the bytes but let the session finish and free its slot;
+    # still wake a reader that may be blocked on the queue
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        pass
+
+
+def _stream_inference(
+        audio_path: str,
+        source_path: str,
+        output_path: str,
+        setup_kwargs: Dict[str, Any],
+        stream_format: str,
+        cleanup_paths: tuple,
+) -> StreamingResponse:
+    """Render in a background thread and stream the ffmpeg output while frames are still being made."""
+    chunks: "queue.Queue[Any]" = queue.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    cancelled = threading.Event()
+
+    def _put(item):
+        _put_until_cancelled(chunks, item, cancelled)
+
+    def _run():
+        result: Any = _STREAM_DONE
+        try:
+            with _session_slots:
+                run_inference(
+                    _SDK,
+                    audio_path=audio_path,
+                    source_path=source_path,
+                    output_path=output_path,
+                    more_kwargs={"setup_kwargs": {**setup_kwargs, "stream_sink": _put, "stream_format": stream_format}, "run_kwargs": {}},
+                )
+        except Exception as e:
+            result = e
+        finally:
+            for p in cleanup_paths:
+                try:
+                    if os.path.exists(p):
+                        os.remove(p)
+                except Exception:
+                    pass
+            _put(result)
+
+    async def _body():
+        try:
+            while True:
+                item = await run_in_threadpool(chunks.get)
+                if item is _STREAM_DONE:
+                    return
+                if isinstance(item, Exception):
+                    # headers are gone already; aborting the body is how the client learns about it
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    threading.Thread(target=_run, daemon=True).start()
+    return StreamingResponse(_body(), media_type=_STREAM_MEDIA_TYPES[stream_format], headers={"Cache-Control": "no-store"})
+
+
+class _LiveAudio:
+    """Cuts live 16 kHz PCM into the overlapping HuBERT windows that run_inference uses in online mode."""
+
+    def __init__(self, session, chunksize=(3, 5, 2)):
+        self.session = session
+        self.chunksize = chunksize
+        self.split_len = int(sum(chunksize) * 0.04 * 16000) + 80  # 6480
+        self.hop = chunksize[1] * 640
+        self.buf = np.zeros((chunksize[0] * 640,), dtype=np.float32)
+        self.n_samples = 0
+
+    def feed(self, pcm: np.ndarray) -> None:
+        # run_chunk blocks while the session queues are full, which is what slows the sender down
+        self.buf = np.concatenate([self.buf, pcm])
+        self.n_samples += len(pcm)
+        while len(self.buf) >= self.split_len:
+            self.session.run_chunk(self.buf[:self.split_len], self.chunksize)
+            self.buf = self.buf[self.hop:]
+
+    def flush(self) -> None:
+        # the length is known now: same frame count as run_inference renders for this audio
+        self.session.num_frames = math.ceil(self.n_samples / 16000 * 25)
+        while len(self.buf) > 0:
+            audio_chunk = self.buf[:self.split_len]
+            if len(audio_chunk) < self.split_len:
+                audio_chunk = np.pad(audio_chunk, (0, self.split_len - len(audio_chunk)), mode="constant")
+            self.session.run_chunk(audio_chunk, self.chunksize)
+            self.buf = self.buf[self.hop:]
+
+
+_PCM_FORMATS = {"s16le": ("<i2", 32768.0), "f32le": ("<f4", 1.0)}
+
+
+def _avatar_source_path(avatar_id: str) -> Optional[str]:
+    if not _AVATAR_ID_RE.match(avatar_id):
+        return None
+    matches = glob.glob(os.path.join(AVATAR_DIR, f"{avatar_id}.*"))
+    return matches[0] if matches else None
 
 
 @app.on_event("startup")
@@ -151,7 +283,7 @@ def _init_sdk():
     - DITTO_DATA_ROOT: path to model directory (default: ./checkpoints/ditto_trt_Ampere_Plus)
     - DITTO_CFG_PKL: path to cfg pkl (default: ./checkpoints/ditto_cfg/v0.4_hubert_cfg_trt.pkl)
     """
-    global _SDK
+    global _SDK, _session_slots
     data_root = os.getenv("DITTO_DATA_ROOT", "./checkpoints/ditto_pytorch")
     cfg_pkl = os.getenv("DITTO_CFG_PKL", "./checkpoints/ditto_cfg/v0.4_hubert_cfg_pytorch.pkl")
 
@@ -160,31 +292,93 @@ def _init_sdk():
     if not os.path.isfile(cfg_pkl):
         raise RuntimeError(f"Config pkl not found: {cfg_pkl}")
 
-    _SDK = StreamSDK(cfg_pkl, data_root)
+    _SDK = StreamSDK(
+        cfg_pkl,
+        data_root,
+        source_cache_mb=int(os.getenv("DITTO_SOURCE_CACHE_MB", "2048")),
+        audio_feat_cache_mb=int(os.getenv("DITTO_AUDIO_FEAT_CACHE_MB", "256")),
+    )
+    max_sessions = max(1, int(os.getenv("DITTO_MAX_SESSIONS", "1")))
+    if not _SDK.thread_safe and max_sessions > 1:
+        print("[ditto] TensorRT models cannot be shared between sessions; DITTO_MAX_SESSIONS forced to 1")
+        max_sessions = 1
+    _session_slots = threading.BoundedSemaphore(max_sessions)
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    if _SDK is None:
+        return {"status": "ok"}
+    feat_cache = _SDK.wav2feat.feat_cache
+    return {
+        "status": "ok",
+        "source_cache": _SDK.source_info_cache.stats(),
+        "audio_feat_cache": feat_cache.stats() if feat_cache is not None else None,
+    }
+
+
+@app.put("/avatars/{avatar_id}")
+def register_avatar(
+    avatar_id: str,
+    source: UploadFile = File(..., description="Source image or video"),
+):
+    """Store the source under avatar_id and run face registration now, so the first /infer doesn't pay for it."""
+    if _SDK is None:
+        raise HTTPException(status_code=500, detail="SDK not initialized")
+    if not _AVATAR_ID_RE.match(avatar_id):
+        raise HTTPException(status_code=400, detail="avatar_id must match [A-Za-z0-9_-]{1,64}")
+
+    os.makedirs(AVATAR_DIR, exist_ok=True)
+    source_ext = os.path.splitext(source.filename or "source.png")[1] or ".png"
+    old_path = _avatar_source_path(avatar_id)
+    source_path = os.path.join(AVATAR_DIR, f"{avatar_id}{source_ext}")
+    with open(source_path + ".part", "wb") as f:
+        while chunk := source.file.read(1024 * 1024):
+            f.write(chunk)
+
+    try:
+        source_info = _SDK.register_avatar(source_path + ".part")
+    except Exception as e:
+        os.remove(source_path + ".part")
+        raise HTTPException(status_code=400, detail=f"Avatar registration failed: {e}")
+
+    if old_path and old_path != source_path:
+        os.remove(old_path)
+    os.replace(source_path + ".part", source_path)
+    return {
+        "avatar_id": avatar_id,
+        "frames": len(source_info["x_s_info_lst"]),
+        "source_cache": _SDK.source_info_cache.stats(),
+    }
 
 
 @app.post("/infer")
 async def infer(
     audio: UploadFile = File(..., description="WAV audio file"),
-    source: UploadFile = File(..., description="Source image or video"),
+    source: Optional[UploadFile] = File(None, description="Source image or video"),
+    avatar_id: Optional[str] = Form(None, description="Avatar registered via PUT /avatars/{avatar_id} (alternative to source)"),
     background_tasks: BackgroundTasks = BackgroundTasks(),
     debug: str = Form("not debug", description="is debug?"),
-    
+    sampling_preset: Optional[str] = Form(None, description="quality | balanced | fast (default: DITTO_SAMPLING_PRESET)"),
+    stream: bool = Form(False, description="Stream the video while it renders instead of returning the finished file"),
+    stream_format: str = Form("fmp4", description="fmp4 (fragmented MP4) | ts (MPEG-TS), with stream=true"),
 ):
     global _SDK
     if _SDK is None:
         raise HTTPException(status_code=500, detail="SDK not initialized")
 
+    sampling_preset = sampling_preset or os.getenv("DITTO_SAMPLING_PRESET") or None
+    if sampling_preset is not None and sampling_preset not in SAMPLING_PRESETS:
+        raise HTTPException(status_code=400, detail=f"sampling_preset must be one of {list(SAMPLING_PRESETS)}")
+    setup_kwargs: Dict[str, Any] = {"sampling_preset": sampling_preset} if sampling_preset else {}
+    if stream and stream_format not in _STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"stream_format must be one of {list(_STREAM_MEDIA_TYPES)}")
+
     tmp_dir = os.getenv("DITTO_UPLOAD_TMP", "/tmp/ditto_uploads")
     os.makedirs(tmp_dir, exist_ok=True)
 
     audio_tmp = os.path.join(tmp_dir, f"audio_{random.getrandbits(32)}.wav")
-    source_ext = os.path.splitext(source.filename or "source.png")[1] or ".png"
+    source_ext = os.path.splitext((source.filename if source else None) or "source.png")[1] or ".png"
     source_tmp = os.path.join(tmp_dir, f"source_{random.getrandbits(32)}{source_ext}")
     output_tmp = os.path.join(tmp_dir, f"output_{random.getrandbits(32)}.mp4")
 
@@ -198,30 +392,49 @@ async def infer(
             background=background_tasks,
         )
 
+    if avatar_id:
+        registered_source = _avatar_source_path(avatar_id)
+        if registered_source is None:
+            raise HTTPException(status_code=404, detail=f"avatar_id not registered: {avatar_id}")
+    elif source is None:
+        raise HTTPException(status_code=400, detail="Provide 'source' or a registered 'avatar_id'.")
+
     try:
         # Save audio
         with open(audio_tmp, "wb") as f:
             while chunk := await audio.read(1024 * 1024):
                 f.write(chunk)
 
-        # Save source
-        with open(source_tmp, "wb") as f:
-            while chunk := await source.read(1024 * 1024):
-                f.write(chunk)
-
-        # Run inference
-        with _sdk_lock:
-            final_path = run_inference(
-                _SDK,
-                audio_path=audio_tmp,
-                source_path=source_tmp,
-                output_path=output_tmp,
-                more_kwargs={"setup_kwargs": {}, "run_kwargs": {}},
+        # Save source (registered avatars are read in place)
+        if avatar_id:
+            source_tmp = registered_source
+        else:
+            with open(source_tmp, "wb") as f:
+                while chunk := await source.read(1024 * 1024):
+                    f.write(chunk)
+
+        if stream:
+            return _stream_inference(
+                audio_tmp, source_tmp, output_tmp, setup_kwargs, stream_format,
+                cleanup_paths=(audio_tmp,) if avatar_id else (audio_tmp, source_tmp),
             )
 
+        # Run inference off the event loop so other requests (and sessions) can proceed
+        def _run():
+            with _session_slots:
+                return run_inference(
+                    _SDK,
+                    audio_path=audio_tmp,
+                    source_path=source_tmp,
+                    output_path=output_tmp,
+                    more_kwargs={"setup_kwargs": setup_kwargs, "run_kwargs": {}},
+                )
+
+        final_path = await run_in_threadpool(_run)
+
         # schedule cleanup AFTER response is sent
         def cleanup_files():
-            for p in (audio_tmp, source_tmp, final_path):
+            for p in (audio_tmp, final_path) if avatar_id else (audio_tmp, source_tmp, final_path):
                 try:
                     if os.path.exists(p):
                         os.remove(p)
@@ -241,7 +454,7 @@ async def infer(
 
     except Exception as e:
         # If something fails, try to cleanup temp inputs but we don’t delete output (likely not created)
-        for p in (audio_tmp, source_tmp):
+        for p in (audio_tmp,) if avatar_id else (audio_tmp, source_tmp):
             try:
                 if os.path.exists(p):
                     os.remove(p)
@@ -250,6 +463,133 @@ async def infer(
         raise HTTPException(status_code=500, detail=f"Inference failed: {e}")
 
 
+@app.websocket("/live")
+async def live(
+    websocket: WebSocket,
+    avatar_id: str,
+    stream_format: str = "fmp4",
+    pcm: str = "s16le",
+    sampling_preset: Optional[str] = None,
+    fade_in: int = -1,
+):
+    """Online-mode rendering for streaming TTS.
+
+    The client sends 16 kHz mono PCM (pcm=s16le | f32le) as binary messages while it is being
+    produced and the text message "end" when it is done. Video-only fMP4 (or MPEG-TS) comes back
+    as binary messages as soon as ffmpeg emits it, followed by {"status": "done", "frames": n}.
+    fade_in (frames) works as in run_kwargs; there is no fade_out, the length is not known upfront.
+    """
+    await websocket.accept()
+    source_path = _avatar_source_path(avatar_id)
+    sampling_preset = sampling_preset or os.getenv("DITTO_SAMPLING_PRESET") or None
+    if _SDK is None:
+        error = "SDK not initialized"
+    elif source_path is None:
+        error = f"avatar_id not registered: {avatar_id}"
+    elif stream_format not in _STREAM_MEDIA_TYPES:
+        error = f"stream_format must be one of {list(_STREAM_MEDIA_TYPES)}"
+    elif pcm not in _PCM_FORMATS:
+        error = f"pcm must be one of {list(_PCM_FORMATS)}"
+    elif sampling_preset is not None and sampling_preset not in SAMPLING_PRESETS:
+        error = f"sampling_preset must be one of {list(SAMPLING_PRESETS)}"
+    else:
+        error = None
+    if error is not None:
+        await websocket.send_json({"status": "error", "detail": error})
+        await websocket.close(code=1008)
+        return
+    # a live stream cannot sit in a queue behind offline renders
+    if not _session_slots.acquire(blocking=False):
+        await websocket.send_json({"status": "error", "detail": "no free session, try again later"})
+        await websocket.close(code=1013)
+        return
+
+    chunks: "queue.Queue[Any]" = queue.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    cancelled = threading.Event()
+    dtype, scale = _PCM_FORMATS[pcm]
+    tmp_dir = os.getenv("DITTO_UPLOAD_TMP", "/tmp/ditto_uploads")
+    setup_kwargs: Dict[str, Any] = {"sampling_preset": sampling_preset} if sampling_preset else {}
+    session = None
+    sender = None
+
+    async def _send():
+        try:
+            while True:
+                item = await run_in_threadpool(chunks.get)
+                if item is _STREAM_DONE:
+                    return
+                await websocket.send_bytes(item)
+        except BaseException:
+            # nobody reads the sink any more: let it drop bytes so the session can drain
+            cancelled.set()
+            raise
+
+    try:
+        session = _SDK.new_session()
+        await run_in_threadpool(
+            session.setup,
+            source_path,
+            os.path.join(tmp_dir, f"live_{random.getrandbits(32)}.mp4"),    # nothing is written there
+            online_mode=True,
+            stream_sink=lambda data: _put_until_cancelled(chunks, data, cancelled),
+            stream_format=stream_format,
+            low_latency=True,
+            **setup_kwargs,
+        )
+        session.setup_Nd(N_d=-1, fade_in=fade_in)
+        audio = _LiveAudio(session)
+        sender = asyncio.create_task(_send())
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                samples = np.frombuffer(message["bytes"], dtype=dtype).astype(np.float32) / scale
+                await run_in_threadpool(audio.feed, samples)
+            elif message.get("text") == "end":
+                break
+
+        await run_in_threadpool(audio.flush)
+        s, session = session, None
+        await run_in_threadpool(s.close)
+        _put_until_cancelled(chunks, _STREAM_DONE, cancelled)
+        await sender
+        await websocket.send_json({"status": "done", "frames": s.stage_stats["writer"][0]})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        try:
+            await websocket.send_json({"status": "error", "detail": f"Inference failed: {e}"})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        cancelled.set()
+        if sender is not None:
+            sender.cancel()
+        try:
+            chunks.put_nowait(_STREAM_DONE)
+        except queue.Full:
+            pass
+
+        def _teardown(s=session):
+            # drain what was already queued (the sink drops it now); off the event loop and
+            # outside this task, so a cancelled handler still frees its slot
+            try:
+                if s is not None and hasattr(s, "thread_list"):
+                    s.close()
+            except Exception:
+                pass
+            finally:
+                if s is not None and hasattr(s, "stop_event"):
+                    s.stop_event.set()    # unblock a run_chunk still waiting on a full queue
+                _session_slots.release()
+
+        threading.Thread(target=_teardown, daemon=True).start()
+
+
 # For local testing: `python app.py`
 if __name__ == "__main__":
     import uvicorn
@@ -31,7 +31,9 @@ def run(SDK: StreamSDK, audio_path: str, source_path: str, output_path: str, mor
     setup_kwargs = more_kwargs.get("setup_kwargs", {})
     run_kwargs = more_kwargs.get("run_kwargs", {})
 
-    SDK.setup(source_path, output_path, **setup_kwargs)
+    # per-request state lives in the session, so concurrent calls on one SDK don't interfere
+    session = SDK.new_session()
+    session.setup(source_path, output_path, audio_path=audio_path, **setup_kwargs)
 
     audio, sr = librosa.core.load(audio_path, sr=16000)
     num_f = math.ceil(len(audio) / 16000 * 25)
@@ -39,9 +41,9 @@ def run(SDK: StreamSDK, audio_path: str, source_path: str, output_path: str, mor
     fade_in = run_kwargs.get("fade_in", -1)
     fade_out = run_kwargs.get("fade_out", -1)
     ctrl_info = run_kwargs.get("ctrl_info", {})
-    SDK.setup_Nd(N_d=num_f, fade_in=fade_in, fade_out=fade_out, ctrl_info=ctrl_info)
+    session.setup_Nd(N_d=num_f, fade_in=fade_in, fade_out=fade_out, ctrl_info=ctrl_info)
 
-    online_mode = SDK.online_mode
+    online_mode = session.online_mode
     if online_mode:
         chunksize = run_kwargs.get("chunksize", (3, 5, 2))
         audio = np.concatenate([np.zeros((chunksize[0] * 640,), dtype=np.float32), audio], 0)
@@ -50,15 +52,16 @@ def run(SDK: StreamSDK, audio_path: str, source_path: str, output_path: str, mor
             audio_chunk = audio[i:i + split_len]
             if len(audio_chunk) < split_len:
                 audio_chunk = np.pad(audio_chunk, (0, split_len - len(audio_chunk)), mode="constant")
-            SDK.run_chunk(audio_chunk, chunksize)
+            session.run_chunk(audio_chunk, chunksize)
     else:
-        aud_feat = SDK.wav2feat.wav2feat(audio)
-        SDK.audio2motion_queue.put(aud_feat)
-    SDK.close()
-
-    cmd = f'ffmpeg -loglevel error -y -i "{SDK.tmp_output_path}" -i "{audio_path}" -map 0:v -map 1:a -c:v copy -c:a aac "{output_path}"'
-    print(cmd)
-    os.system(cmd)
+        aud_feat = session.wav2feat.wav2feat(audio)
+        session.audio2motion_queue.put(aud_feat)
+    session.close()
+
+    if not session.muxed_output:
+        cmd = f'ffmpeg -loglevel error -y -i "{session.tmp_output_path}" -i "{audio_path}" -map 0:v -map 1:a -c:v copy -c:a aac "{output_path}"'
+        print(cmd)
+        os.system(cmd)
 
     print(output_path)
 
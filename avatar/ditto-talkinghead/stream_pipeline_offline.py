@@ -1,23 +1,31 @@
+import copy
 import queue
 import threading
+import time
 import traceback
 
 import numpy as np
-from core.atomic_components.audio2motion import Audio2Motion
-from core.atomic_components.avatar_registrar import AvatarRegistrar, smooth_x_s_info_lst
+from core.atomic_components.audio2motion import SAMPLING_PRESETS, Audio2Motion
+from core.atomic_components.avatar_registrar import AvatarRegistrar, SourceInfoCache, smooth_x_s_info_lst
 from core.atomic_components.cfg import parse_cfg, print_cfg
 from core.atomic_components.condition_handler import ConditionHandler, _mirror_index
 from core.atomic_components.decode_f3d import DecodeF3D
 from core.atomic_components.motion_stitch import MotionStitch
-from core.atomic_components.putback import PutBack
+from core.atomic_components.putback import BufferPool, PutBack
 from core.atomic_components.warp_f3d import WarpF3D
 from core.atomic_components.wav2feat import Wav2Feat
-from core.atomic_components.writer import VideoWriterByImageIO
+from core.atomic_components.writer import VideoWriterByFFmpeg, VideoWriterByImageIO
 from tqdm import tqdm
 
 
 class StreamSDK:
-    def __init__(self, cfg_pkl, data_root, **kwargs):
+    """
+    Loads the models once and shares them read-only between requests.
+    Per-request state lives in StreamSession objects from new_session(); several
+    sessions can run at the same time. SDK.setup()/setup_Nd()/run_chunk()/close()
+    still work and drive one implicit session.
+    """
+    def __init__(self, cfg_pkl, data_root, source_cache_mb=2048, audio_feat_cache_mb=0, **kwargs):
 
         [
             avatar_registrar_cfg,
@@ -33,6 +41,7 @@ class StreamSDK:
         self.default_kwargs = default_kwargs
         
         self.avatar_registrar = AvatarRegistrar(**avatar_registrar_cfg)
+        self.source_info_cache = SourceInfoCache(max_bytes=int(source_cache_mb * 1024 * 1024))
         self.condition_handler = ConditionHandler(**condition_handler_cfg)
         self.audio2motion = Audio2Motion(lmdm_cfg)
         self.motion_stitch = MotionStitch(stitch_network_cfg)
@@ -41,6 +50,21 @@ class StreamSDK:
         self.putback = PutBack()
 
         self.wav2feat = Wav2Feat(**wav2feat_cfg)
+        if audio_feat_cache_mb > 0:
+            # the same narration is often rendered again (retries, re-renders with another avatar)
+            self.wav2feat.feat_cache = SourceInfoCache(max_bytes=int(audio_feat_cache_mb * 1024 * 1024))
+
+        # TensorRT engines share their I/O buffers between calls, so only one session may run at a time
+        model_types = [
+            self.audio2motion.lmdm.model_type,
+            self.motion_stitch.stitch_net.model_type,
+            self.warp_f3d.warp_net.model_type,
+            self.decode_f3d.decoder.model_type,
+            self.wav2feat.w2f.hubert.model_type,
+        ]
+        self.thread_safe = "tensorrt" not in model_types
+        self._register_lock = threading.Lock()
+        self._session = None
 
     def _merge_kwargs(self, default_kwargs, run_kwargs):
         for k, v in default_kwargs.items():
@@ -48,10 +72,84 @@ class StreamSDK:
                 run_kwargs[k] = v
         return run_kwargs
 
+    def _register_avatar(self, source_path, max_dim, n_frames, smo_k_s, crop_kwargs):
+        # the same portrait is sent for every slide; only register it once
+        key = SourceInfoCache.make_key(source_path, max_dim=max_dim, n_frames=n_frames, smo_k_s=smo_k_s, **crop_kwargs)
+        # serialized: the registrar models are not shared with the sessions, and concurrent
+        # requests for the same portrait should register it only once
+        with self._register_lock:
+            source_info = self.source_info_cache.get(key)
+            if source_info is not None:
+                return source_info
+
+            source_info = self.avatar_registrar(
+                source_path, 
+                max_dim=max_dim, 
+                n_frames=n_frames, 
+                **crop_kwargs,
+            )
+
+            if len(source_info["x_s_info_lst"]) > 1 and smo_k_s > 1:
+                source_info["x_s_info_lst"] = smooth_x_s_info_lst(source_info["x_s_info_lst"], smo_k=smo_k_s)
+
+            self.source_info_cache.put(key, source_info)
+        return source_info
+
+    def register_avatar(self, source_path, **kwargs):
+        """
+        Register a source image/video ahead of time; later setup() calls with the
+        same content and registration kwargs reuse it. Returns source_info.
+        """
+        kwargs = self._merge_kwargs(self.default_kwargs, dict(kwargs))
+        template_n_frames = kwargs.get("template_n_frames", -1)
+        crop_kwargs = {
+            "crop_scale": kwargs.get("crop_scale", 2.3),
+            "crop_vx_ratio": kwargs.get("crop_vx_ratio", 0),
+            "crop_vy_ratio": kwargs.get("crop_vy_ratio", -0.125),
+            "crop_flag_do_rot": kwargs.get("crop_flag_do_rot", True),
+        }
+        n_frames = template_n_frames if template_n_frames > 0 else kwargs.get("N_d", -1)
+        return self._register_avatar(source_path, kwargs.get("max_size", 1920), n_frames, kwargs.get("smo_k_s", 13), crop_kwargs)
+
+    def new_session(self):
+        return StreamSession(self)
+
+    def setup(self, source_path, output_path, **kwargs):
+        # legacy single-request API: one implicit session at a time
+        self._session = self.new_session()
+        self._session.setup(source_path, output_path, **kwargs)
+
+    def __getattr__(self, name):
+        # forwards setup_Nd/run_chunk/close/audio2motion_queue/... to the implicit session
+        session = self.__dict__.get("_session")
+        if session is None:
+            raise AttributeError(name)
+        return getattr(session, name)
+
+
+class StreamSession:
+    """
+    One request: own copies of the stateful stage wrappers (their models are shared
+    with the SDK), plus the queues, worker threads and writer.
+    """
+    def __init__(self, sdk):
+        self.sdk = sdk
+        self.default_kwargs = sdk.default_kwargs
+        self.wav2feat = sdk.wav2feat
+        self.condition_handler = copy.copy(sdk.condition_handler)
+        self.audio2motion = copy.copy(sdk.audio2motion)
+        self.motion_stitch = copy.copy(sdk.motion_stitch)
+        self.warp_f3d = sdk.warp_f3d
+        self.decode_f3d = sdk.decode_f3d
+        self.putback = copy.copy(sdk.putback)
+
     def setup_Nd(self, N_d, fade_in=-1, fade_out=-1, ctrl_info=None):
         # for eye open at video end
         self.motion_stitch.set_Nd(N_d)
 
+        # online: the last HuBERT window is zero padded, drop the frames past the audio
+        self.num_frames = N_d if N_d > 0 else None
+
         # for fade in/out alpha
         if ctrl_info is None:
             ctrl_info = self.ctrl_info
@@ -74,7 +172,12 @@ class StreamSDK:
     def setup(self, source_path, output_path, **kwargs):
 
         # ======== Prepare Options ========
-        kwargs = self._merge_kwargs(self.default_kwargs, kwargs)
+        preset = kwargs.get("sampling_preset", None)    # quality | balanced | fast
+        if preset is not None:
+            if preset not in SAMPLING_PRESETS:
+                raise ValueError(f"Unknown sampling_preset: {preset}, expected one of {list(SAMPLING_PRESETS)}")
+            kwargs = {**SAMPLING_PRESETS[preset], **kwargs}
+        kwargs = self.sdk._merge_kwargs(self.default_kwargs, kwargs)
         print("=" * 20, "setup kwargs", "=" * 20)
         print_cfg(**kwargs)
         print("=" * 50)
@@ -105,9 +208,29 @@ class StreamSDK:
         self.online_mode = kwargs.get("online_mode", False)
         self.v_min_max_for_clip = kwargs.get('v_min_max_for_clip', None)
         self.smo_k_d = kwargs.get("smo_k_d", 3)
+        self.batch_clips = kwargs.get("batch_clips", 1)    # offline: clips denoised per LMDM pass
 
         # -- motion_stitch: setup --
         self.N_d = kwargs.get("N_d", -1)
+        self.num_frames = None    # online: frames to render, set by setup_Nd once the audio length is known
+        self.stitch_batch = kwargs.get("stitch_batch", 64)    # max frames stitched per call
+
+        # -- warp_f3d / decode_f3d: micro-batching --
+        self.render_batch = max(1, kwargs.get("render_batch", 4))    # max frames per warp/decode call
+        self.render_batch_wait_ms = kwargs.get("render_batch_wait_ms", 20)    # max wait for a batch to fill
+
+        # -- putback --
+        self.putback_workers = max(1, kwargs.get("putback_workers", 2))
+
+        # -- writer --
+        self.writer_type = kwargs.get("writer", "ffmpeg")    # "ffmpeg" | "imageio"
+        self.audio_path = kwargs.get("audio_path", None)    # ffmpeg: mux this wav in the same pass
+        self.video_preset = kwargs.get("video_preset", "veryfast")
+        self.video_crf = kwargs.get("video_crf", 18)
+        self.fragmented_mp4 = kwargs.get("fragmented_mp4", False)
+        self.stream_sink = kwargs.get("stream_sink", None)    # callable(bytes): stream the encoded output instead of writing output_path
+        self.stream_format = kwargs.get("stream_format", "fmp4")    # "fmp4" | "ts"
+        self.low_latency = kwargs.get("low_latency", False)    # ffmpeg: zerolatency tune, flush every frame
         self.use_d_keys = kwargs.get("use_d_keys", None)
         self.relative_d = kwargs.get("relative_d", True)
         self.drive_eye = kwargs.get("drive_eye", None)    # None: true4image, false4video
@@ -145,15 +268,7 @@ class StreamSDK:
             "crop_flag_do_rot": self.crop_flag_do_rot,
         }
         n_frames = self.template_n_frames if self.template_n_frames > 0 else self.N_d
-        source_info = self.avatar_registrar(
-            source_path, 
-            max_dim=self.max_size, 
-            n_frames=n_frames, 
-            **crop_kwargs,
-        )
-
-        if len(source_info["x_s_info_lst"]) > 1 and self.smo_k_s > 1:
-            source_info["x_s_info_lst"] = smooth_x_s_info_lst(source_info["x_s_info_lst"], smo_k=self.smo_k_s)
+        source_info = self.sdk._register_avatar(source_path, self.max_size, n_frames, self.smo_k_s, crop_kwargs)
 
         self.source_info = source_info
         self.source_info_frames = len(source_info["x_s_info_lst"])
@@ -172,6 +287,7 @@ class StreamSDK:
             online_mode=self.online_mode,
             v_min_max_for_clip=self.v_min_max_for_clip,
             smo_k_d=self.smo_k_d,
+            batch_clips=1 if self.online_mode else self.batch_clips,
         )
 
         # ======== Setup Motion Stitch ========
@@ -194,17 +310,47 @@ class StreamSDK:
             overall_ctrl_info=self.overall_ctrl_info,
         )
 
+        # ======== Setup PutBack ========
+        self.putback.setup(is_image_flag)
+        self.putback_pool = BufferPool(max_free=self.putback_workers * 2 + 2)
+
         # ======== Video Writer ========
         self.output_path = output_path
         self.tmp_output_path = output_path + ".tmp.mp4"
-        self.writer = VideoWriterByImageIO(self.tmp_output_path)
+        if self.stream_sink is not None and self.writer_type != "ffmpeg":
+            raise ValueError("stream_sink needs writer='ffmpeg'")
+        if self.stream_format not in ("fmp4", "ts"):
+            raise ValueError(f"Unknown stream_format: {self.stream_format}, expected 'fmp4' or 'ts'")
+        if self.writer_type == "ffmpeg":
+            # with audio_path ffmpeg encodes and muxes in one pass straight into output_path;
+            # a stream has nothing left to remux either
+            self.muxed_output = self.audio_path is not None or self.stream_sink is not None
+            if self.stream_sink is not None:
+                video_path = None
+            else:
+                video_path = output_path if self.muxed_output else self.tmp_output_path
+            self.writer = VideoWriterByFFmpeg(
+                video_path,
+                audio_path=self.audio_path,
+                preset=self.video_preset,
+                crf=self.video_crf,
+                fragmented=self.fragmented_mp4,
+                on_data=self.stream_sink,
+                container="mpegts" if self.stream_format == "ts" else "mp4",
+                low_latency=self.low_latency,
+            )
+        else:
+            self.muxed_output = False
+            self.writer = VideoWriterByImageIO(self.tmp_output_path)
         self.writer_pbar = tqdm(desc="writer")
 
         # ======== Audio Feat Buffer ========
         if self.online_mode:
-            # buffer: seq_frames - valid_clip_len
-            self.audio_feat = self.wav2feat.wav2feat(np.zeros((self.overlap_v2 * 640,), dtype=np.float32), sr=16000)
-            assert len(self.audio_feat) == self.overlap_v2, f"{len(self.audio_feat)}"
+            # buffer: the first clip only renders its last fuse_length frames, so it is
+            # padded with seq_frames - fuse_length frames of silence
+            n_pad = self.audio2motion.seq_frames - self.audio2motion.fuse_length
+            self.audio_feat = self.wav2feat.wav2feat(np.zeros((n_pad * 640,), dtype=np.float32), sr=16000)
+            assert len(self.audio_feat) == n_pad, f"{len(self.audio_feat)}"
         else:
             self.audio_feat = np.zeros((0, self.wav2feat.feat_dim), dtype=np.float32)
         self.cond_idx_start = 0 - len(self.audio_feat)
@@ -215,11 +361,19 @@ class StreamSDK:
 
         self.worker_exception = None
         self.stop_event = threading.Event()
+        self.stage_stats = {k: [0, 0.0] for k in ("motion_stitch", "warp_f3d", "decode_f3d", "putback", "writer")}    # [frames, busy seconds]
+        self._stats_lock = threading.Lock()
+
+        # putback workers finish out of order; frames reach the writer by seq
+        self._reorder = {}
+        self._reorder_next = 0
+        self._reorder_lock = threading.Lock()
+        self._putback_alive = self.putback_workers
 
         self.audio2motion_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
         self.motion_stitch_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
         self.warp_f3d_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
-        self.decode_f3d_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+        self.decode_f3d_queue = queue.Queue(maxsize=max(1, QUEUE_MAX_SIZE // self.render_batch))    # items are batches
         self.putback_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
         self.writer_queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
 
@@ -228,13 +382,48 @@ class StreamSDK:
             threading.Thread(target=self.motion_stitch_worker),
             threading.Thread(target=self.warp_f3d_worker),
             threading.Thread(target=self.decode_f3d_worker),
-            threading.Thread(target=self.putback_worker),
+            *[threading.Thread(target=self.putback_worker) for _ in range(self.putback_workers)],
             threading.Thread(target=self.writer_worker),
         ]
 
         for thread in self.thread_list:
             thread.start()
 
+    def _get_batch(self, q, max_n, wait_s=0.0):
+        """
+        Blocks for the first item, then takes up to max_n items in total, waiting at most
+        wait_s for more to arrive. Returns (items, is_end); the None end marker is not in items.
+        """
+        try:
+            item = q.get(timeout=1)
+        except queue.Empty:
+            return [], False
+        if item is None:
+            return [], True
+        items = [item]
+        deadline = time.perf_counter() + wait_s
+        while len(items) < max_n:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _record_stage(self, stage, n_frames, t0):
+        dt = time.perf_counter() - t0
+        with self._stats_lock:
+            stats = self.stage_stats[stage]
+            stats[0] += n_frames
+            stats[1] += dt
+
+    def stage_fps(self):
+        """frames per busy second of each per-frame stage"""
+        return {k: (n / t if t > 0 else 0.0) for k, (n, t) in self.stage_stats.items()}
+
     def _get_ctrl_info(self, fid):
         try:
             if isinstance(self.ctrl_info, dict):
@@ -264,7 +453,10 @@ class StreamSDK:
             if item is None:
                 break
             res_frame_rgb = item
+            t0 = time.perf_counter()
             self.writer(res_frame_rgb, fmt="rgb")
+            self._record_stage("writer", 1, t0)
+            self.putback_pool.release(res_frame_rgb)
             self.writer_pbar.update()
 
     def putback_worker(self):
@@ -275,19 +467,37 @@ class StreamSDK:
             self.stop_event.set()
 
     def _putback_worker(self):
-        while not self.stop_event.is_set():
-            try:
-                item = self.putback_queue.get(timeout=1)
-            except queue.Empty:
-                continue
-            if item is None:
+        is_end = False
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    item = self.putback_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    self.putback_queue.put(None)    # for the other putback workers
+                    is_end = True
+                    break
+                seq, frame_idx, render_img = item
+                frame_rgb = self.source_info["img_rgb_lst"][frame_idx]
+                M_c2o = self.source_info["M_c2o_lst"][frame_idx]
+                t0 = time.perf_counter()
+                res_frame_rgb = self.putback(frame_rgb, render_img, M_c2o, out=self.putback_pool.acquire(frame_rgb.shape))
+                self._record_stage("putback", 1, t0)
+                self._reorder_put(seq, res_frame_rgb)
+        finally:
+            with self._reorder_lock:
+                self._putback_alive -= 1
+                last = self._putback_alive == 0
+            if last and is_end:
                 self.writer_queue.put(None)
-                break
-            frame_idx, render_img = item
-            frame_rgb = self.source_info["img_rgb_lst"][frame_idx]
-            M_c2o = self.source_info["M_c2o_lst"][frame_idx]
-            res_frame_rgb = self.putback(frame_rgb, render_img, M_c2o)
-            self.writer_queue.put(res_frame_rgb)
+
+    def _reorder_put(self, seq, res_frame_rgb):
+        with self._reorder_lock:
+            self._reorder[seq] = res_frame_rgb
+            while self._reorder_next in self._reorder:
+                self.writer_queue.put(self._reorder.pop(self._reorder_next))
+                self._reorder_next += 1
 
     def decode_f3d_worker(self):
         try:
@@ -297,6 +507,7 @@ class StreamSDK:
             self.stop_event.set()
 
     def _decode_f3d_worker(self):
+        seq = 0    # output order, for the putback reorder buffer
         while not self.stop_event.is_set():
             try:
                 item = self.decode_f3d_queue.get(timeout=1)
@@ -305,9 +516,13 @@ class StreamSDK:
             if item is None:
                 self.putback_queue.put(None)
                 break
-            frame_idx, f_3d = item
-            render_img = self.decode_f3d(f_3d)
-            self.putback_queue.put([frame_idx, render_img])
+            frame_idx_list, f_3d = item    # one warp batch
+            t0 = time.perf_counter()
+            render_img = self.decode_f3d.batch(f_3d)
+            self._record_stage("decode_f3d", len(frame_idx_list), t0)
+            for frame_idx, img in zip(frame_idx_list, render_img):
+                self.putback_queue.put([seq, frame_idx, img])
+                seq += 1
 
     def warp_f3d_worker(self):
         try:
@@ -317,18 +532,24 @@ class StreamSDK:
             self.stop_event.set()
 
     def _warp_f3d_worker(self):
-        while not self.stop_event.is_set():
-            try:
-                item = self.warp_f3d_queue.get(timeout=1)
-            except queue.Empty:
+        is_end = False
+        wait_s = self.render_batch_wait_ms / 1000
+        while not self.stop_event.is_set() and not is_end:
+            items, is_end = self._get_batch(self.warp_f3d_queue, self.render_batch, wait_s)
+            if not items:
                 continue
-            if item is None:
-                self.decode_f3d_queue.put(None)
-                break
-            frame_idx, x_s, x_d = item
-            f_s = self.source_info["f_s_lst"][frame_idx]
+            frame_idx_list = [item[0] for item in items]
+            f_s_lst = self.source_info["f_s_lst"]
+            t0 = time.perf_counter()
+            f_s = np.concatenate([f_s_lst[i] for i in frame_idx_list], 0)
+            x_s = np.concatenate([item[1] for item in items], 0)
+            x_d = np.concatenate([item[2] for item in items], 0)
             f_3d = self.warp_f3d(f_s, x_s, x_d)
-            self.decode_f3d_queue.put([frame_idx, f_3d])
+            self._record_stage("warp_f3d", len(items), t0)
+            self.decode_f3d_queue.put([frame_idx_list, f_3d])
+
+        if is_end:
+            self.decode_f3d_queue.put(None)
 
     def motion_stitch_worker(self):
         try:
@@ -338,24 +559,34 @@ class StreamSDK:
             self.stop_event.set()
 
     def _motion_stitch_worker(self):
-        while not self.stop_event.is_set():
-            try:
-                item = self.motion_stitch_queue.get(timeout=1)
-            except queue.Empty:
+        is_end = False
+        while not self.stop_event.is_set() and not is_end:
+            # stitch whatever is already queued (up to stitch_batch frames) in one go
+            items, is_end = self._get_batch(self.motion_stitch_queue, self.stitch_batch)
+            if not items:
                 continue
-            if item is None:
-                self.warp_f3d_queue.put(None)
-                break
-            
-            frame_idx, x_d_info, ctrl_kwargs = item
-            x_s_info = self.source_info["x_s_info_lst"][frame_idx]
-            x_s, x_d = self.motion_stitch(x_s_info, x_d_info, **ctrl_kwargs)
-            self.warp_f3d_queue.put([frame_idx, x_s, x_d])
+
+            frame_idx_list = [item[0] for item in items]
+            x_s_info_lst = self.source_info["x_s_info_lst"]
+            t0 = time.perf_counter()
+            if len(set(frame_idx_list)) == 1:
+                x_s_info = x_s_info_lst[frame_idx_list[0]]
+            else:
+                x_s_info = {k: np.concatenate([x_s_info_lst[i][k] for i in frame_idx_list], 0) for k in x_s_info_lst[frame_idx_list[0]]}
+            x_s, x_d = self.motion_stitch.batch(x_s_info, [item[1] for item in items], [item[2] for item in items])
+            self._record_stage("motion_stitch", len(items), t0)
+            for b, frame_idx in enumerate(frame_idx_list):
+                self.warp_f3d_queue.put([frame_idx, x_s[b:b + 1] if len(x_s) > 1 else x_s, x_d[b:b + 1]])
+
+        if is_end:
+            self.warp_f3d_queue.put(None)
 
     def audio2motion_worker(self):
         try:
-            # self._audio2motion_worker()
-            self._audio2motion_offline()
+            if self.online_mode:
+                self._audio2motion_worker()
+            else:
+                self._audio2motion_offline()
         except Exception as e:
             self.worker_exception = e
             self.stop_event.set()
@@ -377,19 +608,16 @@ class StreamSDK:
             seq_frames = self.audio2motion.seq_frames
             valid_clip_len = self.audio2motion.valid_clip_len
             num_frames = len(aud_cond_all)
-            idx = 0
-            res_kp_seq = None
-            pbar = tqdm(desc="dit")
-            while idx < num_frames:
-                pbar.update()
+            aud_cond_list = []
+            for idx in range(0, num_frames, valid_clip_len):
                 aud_cond = aud_cond_all[idx:idx + seq_frames][None]
                 if aud_cond.shape[1] < seq_frames:
                     pad = np.stack([aud_cond[:, -1]] * (seq_frames - aud_cond.shape[1]), 1)
                     aud_cond = np.concatenate([aud_cond, pad], 1)
-                res_kp_seq = self.audio2motion(aud_cond, res_kp_seq)
-                idx += valid_clip_len
+                aud_cond_list.append(aud_cond)
 
-            pbar.close()
+            print(f"dit: {len(aud_cond_list)} clips, batch_clips={self.audio2motion.batch_clips}, steps={self.audio2motion.sampling_timesteps}")
+            res_kp_seq = self.audio2motion.run_clips(aud_cond_list)
             res_kp_seq = res_kp_seq[:, :num_frames]
             res_kp_seq = self.audio2motion._smo(res_kp_seq, 0, res_kp_seq.shape[1])
 
@@ -475,6 +703,8 @@ class StreamSDK:
                     x_d_info_list = self.audio2motion.cvt_fmt(valid_res_kp_seq)
 
                     for x_d_info in x_d_info_list:
+                        if self.num_frames is not None and gen_frame_idx >= self.num_frames:
+                            break
                         frame_idx = _mirror_index(gen_frame_idx, self.source_info_frames)
                         ctrl_kwargs = self._get_ctrl_info(gen_frame_idx)
 
@@ -525,6 +755,8 @@ class StreamSDK:
         except:
             traceback.print_exc()
 
+        print("stage fps:", ", ".join(f"{k}={v:.1f}" for k, v in self.stage_fps().items()))
+
         # Check if any worker encountered an exception
         if self.worker_exception is not None:
             raise self.worker_exception
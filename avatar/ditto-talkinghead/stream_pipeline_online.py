@@ -4,7 +4,7 @@ import traceback
 
 import numpy as np
 from core.atomic_components.audio2motion import Audio2Motion
-from core.atomic_components.avatar_registrar import AvatarRegistrar, smooth_x_s_info_lst
+from core.atomic_components.avatar_registrar import AvatarRegistrar, SourceInfoCache, smooth_x_s_info_lst
 from core.atomic_components.cfg import parse_cfg, print_cfg
 from core.atomic_components.condition_handler import ConditionHandler, _mirror_index
 from core.atomic_components.decode_f3d import DecodeF3D
@@ -38,7 +38,7 @@ wav2feat_cfg:
 
 
 class StreamSDK:
-    def __init__(self, cfg_pkl, data_root, **kwargs):
+    def __init__(self, cfg_pkl, data_root, source_cache_mb=2048, **kwargs):
 
         [
             avatar_registrar_cfg,
@@ -54,6 +54,7 @@ class StreamSDK:
         self.default_kwargs = default_kwargs
         
         self.avatar_registrar = AvatarRegistrar(**avatar_registrar_cfg)
+        self.source_info_cache = SourceInfoCache(max_bytes=int(source_cache_mb * 1024 * 1024))
         self.condition_handler = ConditionHandler(**condition_handler_cfg)
         self.audio2motion = Audio2Motion(lmdm_cfg)
         self.motion_stitch = MotionStitch(stitch_network_cfg)
@@ -69,6 +70,42 @@ class StreamSDK:
                 run_kwargs[k] = v
         return run_kwargs
 
+    def _register_avatar(self, source_path, max_dim, n_frames, smo_k_s, crop_kwargs):
+        # the same portrait is sent for every slide; only register it once
+        key = SourceInfoCache.make_key(source_path, max_dim=max_dim, n_frames=n_frames, smo_k_s=smo_k_s, **crop_kwargs)
+        source_info = self.source_info_cache.get(key)
+        if source_info is not None:
+            return source_info
+
+        source_info = self.avatar_registrar(
+            source_path, 
+            max_dim=max_dim, 
+            n_frames=n_frames, 
+            **crop_kwargs,
+        )
+
+        if len(source_info["x_s_info_lst"]) > 1 and smo_k_s > 1:
+            source_info["x_s_info_lst"] = smooth_x_s_info_lst(source_info["x_s_info_lst"], smo_k=smo_k_s)
+
+        self.source_info_cache.put(key, source_info)
+        return source_info
+
+    def register_avatar(self, source_path, **kwargs):
+        """
+        Register a source image/video ahead of time; later setup() calls with the
+        same content and registration kwargs reuse it. Returns source_info.
+        """
+        kwargs = self._merge_kwargs(self.default_kwargs, dict(kwargs))
+        template_n_frames = kwargs.get("template_n_frames", -1)
+        crop_kwargs = {
+            "crop_scale": kwargs.get("crop_scale", 2.3),
+            "crop_vx_ratio": kwargs.get("crop_vx_ratio", 0),
+            "crop_vy_ratio": kwargs.get("crop_vy_ratio", -0.125),
+            "crop_flag_do_rot": kwargs.get("crop_flag_do_rot", True),
+        }
+        n_frames = template_n_frames if template_n_frames > 0 else kwargs.get("N_d", -1)
+        return self._register_avatar(source_path, kwargs.get("max_size", 1920), n_frames, kwargs.get("smo_k_s", 13), crop_kwargs)
+
     def setup_Nd(self, N_d, fade_in=-1, fade_out=-1, ctrl_info=None):
         # for eye open at video end
         self.motion_stitch.set_Nd(N_d)
@@ -166,15 +203,7 @@ class StreamSDK:
             "crop_flag_do_rot": self.crop_flag_do_rot,
         }
         n_frames = self.template_n_frames if self.template_n_frames > 0 else self.N_d
-        source_info = self.avatar_registrar(
-            source_path, 
-            max_dim=self.max_size, 
-            n_frames=n_frames, 
-            **crop_kwargs,
-        )
-
-        if len(source_info["x_s_info_lst"]) > 1 and self.smo_k_s > 1:
-            source_info["x_s_info_lst"] = smooth_x_s_info_lst(source_info["x_s_info_lst"], smo_k=self.smo_k_s)
+        source_info = self._register_avatar(source_path, self.max_size, n_frames, self.smo_k_s, crop_kwargs)
 
         self.source_info = source_info
         self.source_info_frames = len(source_info["x_s_info_lst"])
@@ -1,21 +1,30 @@
+import asyncio
+import importlib.util
+import io
+import json
 import os
 import shutil
+import socket
 import uuid
-from collections.abc import Generator
+import weakref
+import zipfile
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Coroutine, Generator
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from queue import Queue
-from threading import Event, Thread
-from time import sleep
-from typing import Dict, List, Literal, Optional
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+from typing import Any, Dict, List, Literal, Optional, Tuple, TypeVar, cast
 from uuid import UUID
 
-import requests
+import httpx
 from fastapi import Depends, FastAPI, File, HTTPException, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, StringConstraints
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, create_engine, func
+from sqlalchemy import CursorResult, DateTime, ForeignKey, Index, Integer, String, Text, create_engine, delete, distinct, func, select, update
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship, sessionmaker
 from typing_extensions import Annotated
 
@@ -280,38 +289,101 @@ def add_avatar_image(
 
 
 # ---------------------------
-# In-memory job store & queue
+# Durable job store & task queue
 # ---------------------------
+# Job state and queued slides live in DATABASE_URL, so they survive restarts and
+# can be shared by several worker processes / orchestrator replicas.
 
-
-class Job(BaseModel):
-    promptId: UUID
-    status: Literal["IN_PROGRESS", "FAILED", "DONE"]
-    lastUpdated: datetime
-    lastTouched: datetime
-    resultUrl: str
-    startedAt: datetime
-    expectedDurationSec: int
-    error: Optional[ErrorModel] = None
-
-
-JOBS: Dict[UUID, Job] = {}
+JobStatus = Literal["IN_PROGRESS", "FAILED", "DONE"]
 
 # Remove jobs after 24h of inactivity
 JOB_TTL = timedelta(hours=24)
 CLEANUP_INTERVAL_SECONDS = 900
-
-
-# FIFO Queue für einzelne Slides
+# A claimed task whose worker has not finished it after this long is handed out again
+TASK_CLAIM_TIMEOUT = timedelta(seconds=int(os.getenv("TASK_CLAIM_TIMEOUT_SECONDS", "1800")))
+# Idle workers re-check the table at least this often (tasks enqueued by other processes)
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", "1.0"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+    prompt_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), index=True)
+    result_url: Mapped[str] = mapped_column(Text, nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_updated: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_touched: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    expected_duration_sec: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error_code: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class SlideTaskRecord(Base):
+    __tablename__ = "slide_tasks"
+    __table_args__ = (Index("ix_slide_tasks_claim", "stage", "status", "seq", "created_at"),)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    prompt_id: Mapped[str] = mapped_column(String(36), index=True)
+    stage: Mapped[str] = mapped_column(String(8), nullable=False)  # audio | video
+    status: Mapped[str] = mapped_column(String(16), nullable=False)  # QUEUED | RUNNING | DONE | FAILED
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)  # slide index within its prompt -> round-robin across prompts
+    slide_no: Mapped[int] = mapped_column(Integer, nullable=False)
+    course_id: Mapped[str] = mapped_column(Text, nullable=False)
+    user_profile: Mapped[str] = mapped_column(Text, nullable=False)  # UserProfile as JSON
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    audio_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# Einzelner Slide, wie ihn ein Worker aus der Queue bekommt
 class SlideTask(BaseModel):
     promptId: UUID
     courseId: str
     userProfile: UserProfile
     text: str
     slideNo: int  # 1-based numbering
-
-
-SLIDE_QUEUE: "Queue[SlideTask]" = Queue()
+    taskId: Optional[str] = None
+    audioPath: Optional[str] = None  # set for the video stage
+
+
+# Worker pool sizes per stage; match them to what the downstream GPU services can take
+AUDIO_WORKERS = max(1, int(os.getenv("AUDIO_WORKERS", "1")))
+VIDEO_WORKERS = max(1, int(os.getenv("VIDEO_WORKERS", "1")))
+# queued slides of one prompt an audio worker synthesizes with a single /v1/audio/generate/batch call
+AUDIO_BATCH_SLIDES = max(1, int(os.getenv("AUDIO_BATCH_SLIDES", "4")))
+
+
+class StageMetrics:
+    """Latency and throughput counters for one pipeline stage (this process only)."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self._lock = Lock()
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def finished(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.last_seconds = seconds
+
+
+AUDIO_METRICS = StageMetrics("audio", AUDIO_WORKERS)
+VIDEO_METRICS = StageMetrics("video", VIDEO_WORKERS)
+# Wakes idle workers of this process right away when a task is enqueued here
+_TASK_SIGNALS: Dict[str, Event] = {"audio": Event(), "video": Event()}
 _WORKER_STARTED = Event()
 _CLEANUP_STARTED = Event()
 
@@ -320,31 +392,330 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _estimate_total_seconds_for_new_slide(job: Job) -> None:
+def _aware(dt: datetime) -> datetime:
+    """SQLite returns naive datetimes; all stored values are UTC."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def _new_job(prompt_id: UUID, now: datetime) -> VideoJob:
+    return VideoJob(
+        prompt_id=str(prompt_id),
+        status="IN_PROGRESS",
+        result_url=folder_url(prompt_id),
+        started_at=now,
+        last_updated=now,
+        last_touched=now,
+        expected_duration_sec=0,  # wird im Worker beim ersten Slide erhöht
+    )
+
+
+def _estimate_total_seconds_for_new_slide(job: VideoJob) -> None:
     """
     Erhöhe die ETA heuristisch um ~6s pro Slide. Beim ersten Slide +8s Overhead.
     """
-    if job.expectedDurationSec == 0:
-        job.expectedDurationSec = 8 + 6  # first slide
+    if job.expected_duration_sec == 0:
+        job.expected_duration_sec = 8 + 6  # first slide
     else:
-        job.expectedDurationSec += 6
+        job.expected_duration_sec += 6
 
 
-def _eta_seconds(job: Job) -> int:
+def _eta_seconds(job: VideoJob) -> int:
     if job.status in ("DONE", "FAILED"):
         return 0
-    elapsed = int((_utcnow() - job.startedAt).total_seconds())
-    remaining = job.expectedDurationSec - elapsed
+    elapsed = int((_utcnow() - _aware(job.started_at)).total_seconds())
+    remaining = job.expected_duration_sec - elapsed
     return max(0, remaining)
 
 
 def _purge_stale_jobs(now: Optional[datetime] = None) -> None:
-    """Drop job entries that have been idle longer than JOB_TTL."""
+    """Delete jobs idle longer than JOB_TTL and finished tasks older than that (indexed range deletes)."""
+    now = now or _utcnow()
+    cutoff = now - JOB_TTL
+    with SessionLocal() as db:
+        db.execute(delete(VideoJob).where(VideoJob.last_touched < cutoff))
+        db.execute(delete(SlideTaskRecord).where(SlideTaskRecord.status.in_(("DONE", "FAILED")), SlideTaskRecord.updated_at < cutoff))
+        db.commit()
+
+
+def _requeue_abandoned_tasks(now: Optional[datetime] = None) -> None:
+    """Tasks whose worker died mid-way (crash, restart) go back to the queue."""
     now = now or _utcnow()
-    for pid, job in list(JOBS.items()):
-        last_touched = getattr(job, "lastTouched", job.lastUpdated)
-        if now - last_touched > JOB_TTL:
-            JOBS.pop(pid, None)
+    with SessionLocal() as db:
+        db.execute(update(SlideTaskRecord).where(SlideTaskRecord.status == "RUNNING", SlideTaskRecord.claimed_at < now - TASK_CLAIM_TIMEOUT).values(status="QUEUED", claimed_by=None, claimed_at=None, updated_at=now))
+        db.commit()
+
+
+def _enqueue_slide(db: Session, task: SlideTask, now: datetime) -> None:
+    # seq is the slide's own index, not a count of the prompt's rows: concurrent requests of one prompt can't collide
+    db.add(
+        SlideTaskRecord(
+            id=str(uuid.uuid4()),
+            prompt_id=str(task.promptId),
+            stage="audio",
+            status="QUEUED",
+            seq=task.slideNo,
+            slide_no=task.slideNo,
+            course_id=task.courseId,
+            user_profile=task.userProfile.model_dump_json(),
+            text=task.text,
+            created_at=now,
+            updated_at=now,
+        )
+    )
+
+
+def _claim_task(stage: str) -> Optional[SlideTask]:
+    """
+    Atomically claim the next queued task of a stage. Lowest `seq` first gives round-robin
+    across prompts; the conditional UPDATE makes the claim safe across processes.
+    """
+    with SessionLocal() as db:
+        for _ in range(5):
+            task_id = db.scalars(select(SlideTaskRecord.id).where(SlideTaskRecord.stage == stage, SlideTaskRecord.status == "QUEUED").order_by(SlideTaskRecord.seq, SlideTaskRecord.created_at).limit(1)).first()
+            if task_id is None:
+                return None
+            now = _utcnow()
+            result = db.execute(update(SlideTaskRecord).where(SlideTaskRecord.id == task_id, SlideTaskRecord.status == "QUEUED").values(status="RUNNING", claimed_by=WORKER_ID, claimed_at=now, updated_at=now))
+            db.commit()
+            if cast("CursorResult[Any]", result).rowcount != 1:
+                continue  # another worker won the race; try the next one
+            rec = db.get(SlideTaskRecord, task_id)
+            if rec is None:
+                continue
+            return _task_from_record(rec)
+    return None
+
+
+def _claim_more_audio(task: SlideTask, limit: int) -> List[SlideTask]:
+    """Claim up to `limit` further queued audio tasks of the same prompt (slide order) to synthesize together with `task`."""
+    claimed: List[SlideTask] = []
+    if limit <= 0:
+        return claimed
+    with SessionLocal() as db:
+        task_ids = db.scalars(select(SlideTaskRecord.id).where(SlideTaskRecord.prompt_id == str(task.promptId), SlideTaskRecord.stage == "audio", SlideTaskRecord.status == "QUEUED").order_by(SlideTaskRecord.seq).limit(limit)).all()
+        for task_id in task_ids:
+            now = _utcnow()
+            result = db.execute(update(SlideTaskRecord).where(SlideTaskRecord.id == task_id, SlideTaskRecord.status == "QUEUED").values(status="RUNNING", claimed_by=WORKER_ID, claimed_at=now, updated_at=now))
+            db.commit()
+            if cast("CursorResult[Any]", result).rowcount != 1:
+                continue
+            rec = db.get(SlideTaskRecord, task_id)
+            if rec is not None:
+                claimed.append(_task_from_record(rec))
+    return claimed
+
+
+def _task_from_record(rec: SlideTaskRecord) -> SlideTask:
+    return SlideTask(
+        promptId=UUID(rec.prompt_id),
+        courseId=rec.course_id,
+        userProfile=UserProfile.model_validate_json(rec.user_profile),
+        text=rec.text,
+        slideNo=rec.slide_no,
+        taskId=rec.id,
+        audioPath=rec.audio_path,
+    )
+
+
+def _finish_task(task: SlideTask, ok: bool, audio_path: Optional[str] = None) -> None:
+    """Mark a claimed task done/failed; a finished audio task enqueues its video task in the same transaction."""
+    now = _utcnow()
+    handed_over = False
+    with SessionLocal() as db:
+        rec = db.get(SlideTaskRecord, task.taskId)
+        if rec is None:
+            return
+        rec.status = "DONE" if ok else "FAILED"
+        rec.updated_at = now
+        if ok and rec.stage == "audio" and audio_path:
+            db.add(
+                SlideTaskRecord(
+                    id=str(uuid.uuid4()),
+                    prompt_id=rec.prompt_id,
+                    stage="video",
+                    status="QUEUED",
+                    seq=rec.seq,
+                    slide_no=rec.slide_no,
+                    course_id=rec.course_id,
+                    user_profile=rec.user_profile,
+                    text=rec.text,
+                    audio_path=audio_path,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+            handed_over = True
+        db.commit()
+    if handed_over:
+        _TASK_SIGNALS["video"].set()
+
+
+# ---------------------------
+# Upstream HTTP client (pooled, async)
+# ---------------------------
+# All calls to the audio/video services go through one httpx.AsyncClient per event loop
+# (keep-alive, HTTP/2 when h2 is installed and the upstream negotiates it over TLS).
+# Worker threads submit their calls to a shared background loop via _run_upstream().
+
+UPSTREAM_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+GEN_AUDIO_CONCURRENCY = max(1, int(os.getenv("GEN_AUDIO_CONCURRENCY", str(AUDIO_WORKERS))))
+GEN_VIDEO_CONCURRENCY = max(1, int(os.getenv("GEN_VIDEO_CONCURRENCY", str(VIDEO_WORKERS))))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+# ask the video service to stream the MP4 while it renders; a render that fails midway aborts the body
+GEN_VIDEO_STREAM = os.getenv("GEN_VIDEO_STREAM", "0") == "1"
+# WAVs kept in memory between the audio and the video stage of this process
+AUDIO_HANDOFF_MAX_BYTES = int(os.getenv("AUDIO_HANDOFF_MAX_MB", "64")) * 1024 * 1024
+LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+T = TypeVar("T")
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram for one kind of upstream call; the last bucket is +Inf."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.failed = 0
+        self.total_seconds = 0.0
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.total_seconds += seconds
+            if not ok:
+                self.failed += 1
+
+
+UPSTREAM_LATENCY: Dict[str, LatencyHistogram] = {name: LatencyHistogram(name) for name in ("voice_register", "audio", "audio_batch", "video")}
+
+
+class _UpstreamPool:
+    """Pooled client plus per-upstream concurrency limits; bound to the loop that created it."""
+
+    def __init__(self) -> None:
+        connections = GEN_AUDIO_CONCURRENCY + GEN_VIDEO_CONCURRENCY
+        self.client = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections, keepalive_expiry=120.0),
+            http2=UPSTREAM_HTTP2,
+        )
+        self.limits = {"audio": asyncio.Semaphore(GEN_AUDIO_CONCURRENCY), "video": asyncio.Semaphore(GEN_VIDEO_CONCURRENCY)}
+
+
+_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _UpstreamPool]" = weakref.WeakKeyDictionary()
+_UPSTREAM_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_UPSTREAM_LOOP_LOCK = Lock()
+
+
+def _upstream() -> _UpstreamPool:
+    loop = asyncio.get_running_loop()
+    pool = _POOLS.get(loop)
+    if pool is None:
+        pool = _POOLS[loop] = _UpstreamPool()
+    return pool
+
+
+def _run_upstream(coro: Coroutine[Any, Any, T]) -> T:
+    """Run an upstream call from a (sync) worker thread on the shared background event loop."""
+    global _UPSTREAM_LOOP
+    with _UPSTREAM_LOOP_LOCK:
+        if _UPSTREAM_LOOP is None:
+            _UPSTREAM_LOOP = asyncio.new_event_loop()
+            Thread(target=_UPSTREAM_LOOP.run_forever, name="upstream-http", daemon=True).start()
+        loop = _UPSTREAM_LOOP
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def _close_upstream() -> None:
+    pool = _POOLS.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+@app.on_event("shutdown")
+def _shutdown_upstream() -> None:
+    if _UPSTREAM_LOOP is not None:
+        _run_upstream(_close_upstream())
+
+
+@lru_cache(maxsize=16)
+def _file_bytes(path: str, mtime_ns: int) -> bytes:
+    """Voice sample / source image bytes, re-read only when the file changes."""
+    return Path(path).read_bytes()
+
+
+def _cached_file(path: str) -> bytes:
+    return _file_bytes(path, os.stat(path).st_mtime_ns)
+
+
+# voice sample (path, mtime) -> voice_id registered at the audio service ("" = registration unavailable)
+_VOICE_IDS: Dict[Tuple[str, int], str] = {}
+# batch URLs an older audio service answered with 404/405; slides go one per request there
+_AUDIO_BATCH_MISSING: set[str] = set()
+_AUDIO_HANDOFF: "OrderedDict[str, bytes]" = OrderedDict()
+_AUDIO_HANDOFF_LOCK = Lock()
+
+
+def _handoff_put(audio_path: str, wav: bytes) -> None:
+    with _AUDIO_HANDOFF_LOCK:
+        _AUDIO_HANDOFF[audio_path] = wav
+        total = sum(len(v) for v in _AUDIO_HANDOFF.values())
+        while total > AUDIO_HANDOFF_MAX_BYTES and _AUDIO_HANDOFF:
+            _, dropped = _AUDIO_HANDOFF.popitem(last=False)
+            total -= len(dropped)
+
+
+def _handoff_take(audio_path: str) -> Optional[bytes]:
+    with _AUDIO_HANDOFF_LOCK:
+        return _AUDIO_HANDOFF.pop(audio_path, None)
+
+
+async def _timed_post(call: str, url: str, **kwargs: Any) -> httpx.Response:
+    t0 = perf_counter()
+    ok = False
+    try:
+        resp = await _upstream().client.post(url, **kwargs)
+        ok = resp.status_code < 400
+        return resp
+    finally:
+        UPSTREAM_LATENCY[call].observe(perf_counter() - t0, ok)
+
+
+async def _voice_id_for(audio_api_url: str, voice_sample: str) -> Optional[str]:
+    """Register the voice sample once at the audio service (/v1/voices) and reuse its id afterwards."""
+    key = (voice_sample, os.stat(voice_sample).st_mtime_ns)
+    if key not in _VOICE_IDS:
+        voices_url = os.getenv("GEN_AUDIO_VOICES") or audio_api_url.split("/v1/audio/", 1)[0] + "/v1/voices"
+        files = {"voice_file": (os.path.basename(voice_sample), _cached_file(voice_sample), "audio/mpeg")}
+        try:
+            resp = await _timed_post("voice_register", voices_url, files=files)
+            resp.raise_for_status()
+            _VOICE_IDS[key] = str(resp.json()["voice_id"])
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            print(f"[generate_audio] voice registration failed, uploading the sample instead: {e!r}")
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in (404, 405):
+                _VOICE_IDS[key] = ""  # older audio service without /v1/voices; don't ask again
+            return None
+    return _VOICE_IDS[key] or None
+
+
+async def _post_audio(call: str, audio_api_url: str, data: Dict[str, Any], voice_sample: str, is_debug: str) -> httpx.Response:
+    """POST to the audio service with the registered voice_id, uploading the voice sample when there is none."""
+    async with _upstream().limits["audio"]:
+        voice_id = None if is_debug == "debug" else await _voice_id_for(audio_api_url, voice_sample)
+        print(f"[generate_audio] Posting to {audio_api_url}")
+        if voice_id:
+            resp = await _timed_post(call, audio_api_url, data={**data, "debug": is_debug, "voice_id": voice_id})
+            if resp.status_code == 404:
+                # audio service lost the registration (e.g. fresh volume) -> register again next time
+                _VOICE_IDS.pop((voice_sample, os.stat(voice_sample).st_mtime_ns), None)
+                voice_id = None
+        if not voice_id:
+            files = {"voice_file": (os.path.basename(voice_sample), _cached_file(voice_sample), "audio/mpeg")}
+            resp = await _timed_post(call, audio_api_url, data={**data, "debug": is_debug}, files=files)
+    return resp
 
 
 # ---------------------------
@@ -352,7 +723,7 @@ def _purge_stale_jobs(now: Optional[datetime] = None) -> None:
 # ---------------------------
 
 
-def generate_audio(
+async def generate_audio(
     slide_text: Optional[str] = "Hello students! I want you to drink coffee.",
     course_id: Optional[str] = "course_123",
     voice_sample: str = "/app/database/voice_sample/krusche_voice.mp3",
@@ -378,19 +749,16 @@ def generate_audio(
             print(f"[generate_audio] Voice sample not found: {voice_sample}")
             return None
 
-        with open(voice_sample, "rb") as f:
-            is_debug = os.getenv("DEBUG", "not debug")
-            data = {"slide_text": slide_text, "debug": is_debug}
-            files = {"voice_file": (os.path.basename(voice_sample), f, "audio/mpeg")}
-            print(f"[generate_audio] Posting to {audio_api_url}")
-            resp = requests.post(audio_api_url, data=data, files=files, timeout=(5, 600))
+        resp = await _post_audio("audio", audio_api_url, {"slide_text": slide_text}, voice_sample, os.getenv("DEBUG", "not debug"))
         resp.raise_for_status()
 
+        # written for durability / other processes; the video stage of this process reads it from memory
         wav_path.write_bytes(resp.content)
+        _handoff_put(str(wav_path), resp.content)
         print(f"[generate_audio] OK -> {wav_path}")
         return str(wav_path)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"[generate_audio] Request error: {e}")
         return None
     except Exception as e:
@@ -398,7 +766,62 @@ def generate_audio(
         return None
 
 
-def generate_video(
+async def generate_audio_batch(
+    slide_texts: List[str],
+    slide_numbers: List[int],
+    course_id: Optional[str] = "course_123",
+    voice_sample: str = "/app/database/voice_sample/krusche_voice.mp3",
+    prompt_id: Optional[UUID] = None,
+) -> Optional[List[Optional[str]]]:
+    """
+    Generate the WAV files of several slides of a prompt with one /v1/audio/generate/batch call.
+    Saves under /data/jobs/<promptId>/<N>.wav; returns one path (None for a failed slide) per slide,
+    or None when the batch call itself failed and the slides should be sent one by one.
+    """
+    if prompt_id is None:
+        print("[generate_audio_batch] prompt_id is required")
+        return None
+
+    audio_api_url = os.getenv("GEN_AUDIO_BATCH") or os.getenv("GEN_AUDIO", "http://localhost:7000/v1/audio/generate") + "/batch"
+    if audio_api_url in _AUDIO_BATCH_MISSING or not Path(voice_sample).is_file():
+        return None
+
+    job_folder = job_dir(prompt_id)
+    try:
+        resp = await _post_audio("audio_batch", audio_api_url, {"slide_texts": slide_texts, "course_id": course_id}, voice_sample, os.getenv("DEBUG", "not debug"))
+        if resp.status_code in (404, 405) and "application/zip" not in resp.headers.get("content-type", ""):
+            print(f"[generate_audio_batch] {audio_api_url} not available ({resp.status_code}), sending slides one by one")
+            _AUDIO_BATCH_MISSING.add(audio_api_url)
+            return None
+        resp.raise_for_status()
+
+        # zip of slide_<n>.wav (n = position in slide_texts) plus manifest.json
+        wav_paths: List[Optional[str]] = []
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            manifest = json.loads(zf.read("manifest.json"))
+            for entry, slide_no in zip(manifest["slides"], slide_numbers):
+                if not entry["file"]:
+                    wav_paths.append(None)
+                    continue
+                wav = zf.read(entry["file"])
+                wav_path = job_folder / f"{slide_no}.wav"
+                wav_path.write_bytes(wav)
+                _handoff_put(str(wav_path), wav)
+                wav_paths.append(str(wav_path))
+        if len(wav_paths) != len(slide_texts):
+            raise ValueError(f"manifest lists {len(wav_paths)} slides, expected {len(slide_texts)}")
+        print(f"[generate_audio_batch] OK -> {sum(p is not None for p in wav_paths)}/{len(slide_texts)} slides of {prompt_id}")
+        return wav_paths
+
+    except httpx.HTTPError as e:
+        print(f"[generate_audio_batch] Request error: {e}")
+        return None
+    except Exception as e:
+        print(f"[generate_audio_batch] Unexpected error: {e}")
+        return None
+
+
+async def generate_video(
     audio_path: Optional[str] = None,
     prompt_id: Optional[UUID] = None,
     course_id: Optional[str] = None,
@@ -419,9 +842,12 @@ def generate_video(
     final_path = job_folder / f"{video_counter}.mp4"
 
     resolved_audio = audio_path or f"{job_folder}/{video_counter}.wav"
-    if not Path(resolved_audio).is_file():
-        print(f"[generate_video] Audio file not found: {resolved_audio}")
-        return None
+    audio_bytes = _handoff_take(resolved_audio)
+    if audio_bytes is None:
+        if not Path(resolved_audio).is_file():
+            print(f"[generate_video] Audio file not found: {resolved_audio}")
+            return None
+        audio_bytes = Path(resolved_audio).read_bytes()
 
     # choose your static image
     source_path = "/app/database/avatar_sample/image_michal.png"
@@ -430,24 +856,29 @@ def generate_video(
         return None
 
     files = {
-        "audio": ("audio.wav", open(resolved_audio, "rb"), "audio/wav"),
-        "source": ("image.png", open(source_path, "rb"), "image/png"),
+        "audio": ("audio.wav", audio_bytes, "audio/wav"),
+        "source": ("image.png", _cached_file(source_path), "image/png"),
     }
     is_debug = os.getenv("DEBUG", "not debug")
     data = {"debug": is_debug}
+    if GEN_VIDEO_STREAM:
+        data["stream"] = "true"
 
+    pool = _upstream()
+    t0 = perf_counter()
+    ok = False
     try:
         print(f"[generate_video] Posting to {video_api_url}")
-        with requests.post(video_api_url, files=files, data=data, stream=True, timeout=(5, 600)) as resp:
+        async with pool.limits["video"], pool.client.stream("POST", video_api_url, files=files, data=data) as resp:
             if resp.status_code >= 400:
+                await resp.aread()
                 print(f"[generate_video] HTTP {resp.status_code}: {resp.text[:200]}")
                 return None
 
             # Stream MP4 to temp file
             with temp_path.open("wb") as f:
-                for chunk in resp.iter_content(chunk_size=1024 * 256):
-                    if chunk:
-                        f.write(chunk)
+                async for chunk in resp.aiter_bytes(chunk_size=1024 * 256):
+                    f.write(chunk)
                 f.flush()
                 os.fsync(f.fileno())
 
@@ -456,21 +887,18 @@ def generate_video(
             return None
 
         temp_path.replace(final_path)
+        ok = True
         print(f"[generate_video] OK -> {final_path}")
         return str(final_path)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"[generate_video] Request error: {e}")
         return None
     except Exception as e:
         print(f"[generate_video] Unexpected error: {e}")
         return None
     finally:
-        for v in files.values():
-            try:
-                v[1].close()
-            except Exception:
-                pass
+        UPSTREAM_LATENCY["video"].observe(perf_counter() - t0, ok)
 
 
 # ---------------------------
@@ -480,94 +908,168 @@ def generate_video(
 
 def _cleanup_loop() -> None:
     while True:
-        _purge_stale_jobs()
+        try:
+            _purge_stale_jobs()
+            _requeue_abandoned_tasks()
+        except Exception as e:
+            print(f"[job-cleanup] {e!r}")
         sleep(CLEANUP_INTERVAL_SECONDS)
 
 
 # ---------------------------
-# Worker-Thread
+# Worker pools (audio stage -> video stage)
 # ---------------------------
 
 
-def _worker_loop() -> None:
-    print("[worker] started")
-    while True:
-        task: SlideTask = SLIDE_QUEUE.get()  # blocking
-        pid = task.promptId
-        now = _utcnow()
-        _purge_stale_jobs(now)
-        job = JOBS.get(pid)
+def _begin_slide(pid: UUID) -> None:
+    now = _utcnow()
+    with SessionLocal() as db:
+        job = db.get(VideoJob, str(pid))
 
         # Sicherheit: Job-Eintrag muss existieren
         if not job:
-            job = Job(
-                promptId=pid,
-                status="IN_PROGRESS",
-                lastUpdated=now,
-                lastTouched=now,
-                resultUrl=folder_url(pid),
-                startedAt=now,
-                expectedDurationSec=0,
-                error=None,
-            )
-            JOBS[pid] = job
-        else:
-            job.lastTouched = now
+            job = _new_job(pid, now)
+            db.add(job)
 
         # Status/ETA Update vor Start dieses Slides
         job.status = "IN_PROGRESS"
-        job.lastUpdated = now
-        job.lastTouched = now
+        job.last_updated = now
+        job.last_touched = now
         _estimate_total_seconds_for_new_slide(job)
-        JOBS[pid] = job
+        db.commit()
+
 
-        # Audio -> Video für genau diesen Slide
+def _fail_job(pid: UUID, e: Exception) -> None:
+    fail_time = _utcnow()
+    with SessionLocal() as db:
+        db.execute(update(VideoJob).where(VideoJob.prompt_id == str(pid)).values(status="FAILED", last_updated=fail_time, last_touched=fail_time, error_code="GENERATION_FAILED", error_message=str(e)))
+        db.commit()
+
+
+def _touch_progress(pid: UUID) -> None:
+    # Nach jedem Stage-Schritt die lastUpdated Zeit aktualisieren
+    done_time = _utcnow()
+    with SessionLocal() as db:
+        db.execute(update(VideoJob).where(VideoJob.prompt_id == str(pid), VideoJob.status != "FAILED").values(last_updated=done_time, last_touched=done_time))
+        db.commit()
+
+
+def _next_task(stage: str) -> SlideTask:
+    """Block until a task of this stage could be claimed (local wake-up or periodic poll)."""
+    signal = _TASK_SIGNALS[stage]
+    while True:
         try:
-            # TODO send status in progress for voice for audio with slide number (one based?) and pid
-            aurl = generate_audio(
-                slide_text=task.text,
-                course_id=task.courseId,
-                prompt_id=pid,
-                user_profile=task.userProfile,
-                audio_counter=task.slideNo,
+            task = _claim_task(stage)
+        except Exception as e:
+            print(f"[{stage}-worker] claim failed: {e!r}")
+            task = None
+        if task is not None:
+            return task
+        signal.wait(TASK_POLL_SECONDS)
+        signal.clear()
+
+
+def _run_audio_task(task: SlideTask) -> None:
+    pid = task.promptId
+    # other slides of this prompt that are already queued go to the audio service in the same call
+    tasks = [task, *_claim_more_audio(task, AUDIO_BATCH_SLIDES - 1)]
+    for _ in tasks:
+        _begin_slide(pid)
+    t0 = perf_counter()
+    aurls: List[Optional[str]] = [None] * len(tasks)
+    try:
+        # TODO send status in progress for voice for audio with slide number (one based?) and pid
+        batch = None
+        if len(tasks) > 1:
+            batch = _run_upstream(
+                generate_audio_batch(
+                    slide_texts=[t.text for t in tasks],
+                    slide_numbers=[t.slideNo for t in tasks],
+                    course_id=task.courseId,
+                    prompt_id=pid,
+                )
+            )
+        for i, t in enumerate(tasks):
+            aurls[i] = (
+                batch[i]
+                if batch is not None
+                else _run_upstream(
+                    generate_audio(
+                        slide_text=t.text,
+                        course_id=t.courseId,
+                        prompt_id=pid,
+                        user_profile=t.userProfile,
+                        audio_counter=t.slideNo,
+                    )
+                )
             )
-            # TODO send status done for voice with slide number (one based?) and pid
-            if aurl:
-                # TODO send status in progress for video for audio with slide number (one based?) and pid
+        # TODO send status done for voice with slide number (one based?) and pid
+    except Exception as e:
+        print(f"[audio-worker] error on slides {[t.slideNo for t in tasks]} for {pid}: {e!r}")
+        # mark job as failed but keep queue going for other jobs
+        _fail_job(pid, e)
+    finally:
+        seconds = (perf_counter() - t0) / len(tasks)
+        for t, aurl in zip(tasks, aurls):
+            AUDIO_METRICS.finished(seconds, aurl is not None)
+            # hand over to the video pool; this worker moves on to the next slide's audio
+            _finish_task(t, aurl is not None, audio_path=aurl)
+        _touch_progress(pid)
+
+
+def _run_video_task(task: SlideTask) -> None:
+    pid = task.promptId
+    t0 = perf_counter()
+    ok = False
+    try:
+        # TODO send status in progress for video for audio with slide number (one based?) and pid
+        ok = (
+            task.audioPath is not None
+            and _run_upstream(
                 generate_video(
-                    audio_path=aurl,
+                    audio_path=task.audioPath,
                     prompt_id=pid,
                     course_id=task.courseId,
                     user_profile=task.userProfile,
                     video_counter=task.slideNo,
                 )
-                # TODO send status done for video with slide number (one based?) and pid
+            )
+            is not None
+        )
+        # TODO send status done for video with slide number (one based?) and pid
+    except Exception as e:
+        print(f"[video-worker] error on slide {task.slideNo} for {pid}: {e!r}")
+        _fail_job(pid, e)
+    finally:
+        VIDEO_METRICS.finished(perf_counter() - t0, ok)
+        _finish_task(task, ok)
+        _touch_progress(pid)
+
+
+def _audio_worker_loop() -> None:
+    print("[audio-worker] started")
+    while True:
+        try:
+            _run_audio_task(_next_task("audio"))
+        except Exception as e:
+            print(f"[audio-worker] {e!r}")
+
+
+def _video_worker_loop() -> None:
+    print("[video-worker] started")
+    while True:
+        try:
+            _run_video_task(_next_task("video"))
         except Exception as e:
-            print(f"[worker] error on slide {task.slideNo} for {pid}: {e!r}")
-            # mark job as failed but keep queue going for other jobs
-            job = JOBS.get(pid)
-            if job:
-                fail_time = _utcnow()
-                job.status = "FAILED"
-                job.lastUpdated = fail_time
-                job.lastTouched = fail_time
-                job.error = ErrorModel(code="GENERATION_FAILED", message=str(e))
-                JOBS[pid] = job
-        finally:
-            SLIDE_QUEUE.task_done()
-            # Nach jedem Slide die lastUpdated Zeit aktualisieren
-            job = JOBS.get(pid)
-            if job and job.status != "FAILED":
-                done_time = _utcnow()
-                job.lastUpdated = done_time
-                job.lastTouched = done_time
-                JOBS[pid] = job
+            print(f"[video-worker] {e!r}")
 
 
 def _start_worker_once() -> None:
     if not _WORKER_STARTED.is_set():
-        worker_thread = Thread(target=_worker_loop, name="slide-worker", daemon=True)
-        worker_thread.start()
+        for i in range(AUDIO_WORKERS):
+            Thread(target=_audio_worker_loop, name=f"audio-worker-{i}", daemon=True).start()
+        for i in range(VIDEO_WORKERS):
+            Thread(target=_video_worker_loop, name=f"video-worker-{i}", daemon=True).start()
         _WORKER_STARTED.set()
     if not _CLEANUP_STARTED.is_set():
         cleanup_thread = Thread(target=_cleanup_loop, name="job-cleanup", daemon=True)
@@ -587,13 +1089,12 @@ def _start_worker_once() -> None:
     responses={400: {"model": ErrorModel}, 401: {"model": ErrorModel}, 500: {"model": ErrorModel}},
     tags=["video"],
 )
-def request_video_generation(payload: GenerateRequest, response: Response, request: Request) -> JSONResponse | GenerationAcceptedResponse:
+def request_video_generation(payload: GenerateRequest, response: Response, request: Request, db: Session = Depends(get_db)) -> JSONResponse | GenerationAcceptedResponse:
     """
     Nimmt einen einzelnen Slide entgegen (payload.voiceTrack),
     erwartet eine explizite Slide-Nummer (payload.slideNumber) und enqueued die Aufgabe.
     """
     now = _utcnow()
-    _purge_stale_jobs(now)
 
     # Validierung: Voice Track
     text = payload.voiceTrack.strip()
@@ -605,38 +1106,30 @@ def request_video_generation(payload: GenerateRequest, response: Response, reque
 
     # Ordner existieren lassen
     job_dir(payload.promptId)
-    folder = folder_url(payload.promptId)
 
     # Job anlegen/aktualisieren
-    job = JOBS.get(payload.promptId)
+    job = db.get(VideoJob, str(payload.promptId))
     if not job:
-        job = Job(
-            promptId=payload.promptId,
-            status="IN_PROGRESS",
-            lastUpdated=now,
-            lastTouched=now,
-            resultUrl=folder,
-            startedAt=now,
-            expectedDurationSec=0,  # wird im Worker beim ersten Slide erhöht
-            error=None,
-        )
-        JOBS[payload.promptId] = job
+        db.add(_new_job(payload.promptId, now))
     else:
-        job.lastTouched = now
-        JOBS[payload.promptId] = job
+        job.last_touched = now
 
     slide_no = payload.slideNumber
 
-    # Enqueue
-    SLIDE_QUEUE.put(
+    # Enqueue (same transaction as the job row)
+    _enqueue_slide(
+        db,
         SlideTask(
             promptId=payload.promptId,
             courseId=payload.courseId,
             userProfile=payload.userProfile,
             text=text,
             slideNo=slide_no,
-        )
+        ),
+        now,
     )
+    db.commit()
+    _TASK_SIGNALS["audio"].set()
 
     base = str(request.base_url).rstrip("/")
     response.headers["Location"] = f"{base}/v1/video/{payload.promptId}/status"
@@ -649,20 +1142,97 @@ def request_video_generation(payload: GenerateRequest, response: Response, reque
     responses={404: {"model": ErrorModel}},
     tags=["video"],
 )
-def get_generation_status(promptId: UUID) -> GenerationStatusResponse | JSONResponse:
-    _purge_stale_jobs()
-    job = JOBS.get(promptId)
-    if not job:
+def get_generation_status(promptId: UUID, db: Session = Depends(get_db)) -> GenerationStatusResponse | JSONResponse:
+    now = _utcnow()
+    job = db.get(VideoJob, str(promptId))
+    # expired jobs count as gone even before the cleanup loop deleted them
+    if not job or _aware(job.last_touched) < now - JOB_TTL:
         return JSONResponse(status_code=404, content={"code": "NOT_FOUND", "message": "Request not found"})
-    job.lastTouched = _utcnow()
-    JOBS[promptId] = job
+    job.last_touched = now
+    db.commit()
+    error = None
+    if job.error_code or job.error_message:
+        error = ErrorModel(code=job.error_code or "GENERATION_FAILED", message=job.error_message or "")
     return GenerationStatusResponse(
-        promptId=job.promptId,
-        status=job.status,
-        lastUpdated=job.lastUpdated,
-        resultUrl=job.resultUrl,
+        promptId=promptId,
+        status=cast(JobStatus, job.status),
+        lastUpdated=_aware(job.last_updated),
+        resultUrl=job.result_url,
         estimatedSecondsLeft=_eta_seconds(job),
-        error=job.error,
+        error=error,
+    )
+
+
+class StageMetricsResponse(BaseModel):
+    stage: str
+    workers: int
+    queueDepth: int
+    queuedPrompts: int
+    inFlight: int
+    completed: int
+    failed: int
+    avgSeconds: float
+    maxSeconds: float
+    lastSeconds: float
+
+
+class UpstreamLatencyResponse(BaseModel):
+    call: str
+    count: int
+    failed: int
+    avgSeconds: float
+    bucketBounds: List[float]  # upper bounds in seconds; bucketCounts has one extra +Inf bucket
+    bucketCounts: List[int]
+
+
+class SchedulerMetricsResponse(BaseModel):
+    stages: List[StageMetricsResponse]
+    upstream: List[UpstreamLatencyResponse] = []
+
+
+def _stage_snapshot(db: Session, metrics: StageMetrics) -> StageMetricsResponse:
+    """Queue depth and in-flight count come from the task table (all processes); latencies are this process's."""
+    counts = dict(db.execute(select(SlideTaskRecord.status, func.count()).where(SlideTaskRecord.stage == metrics.name, SlideTaskRecord.status.in_(("QUEUED", "RUNNING"))).group_by(SlideTaskRecord.status)).tuples().all())
+    queued_prompts = db.scalar(select(func.count(distinct(SlideTaskRecord.prompt_id))).where(SlideTaskRecord.stage == metrics.name, SlideTaskRecord.status == "QUEUED"))
+    done = metrics.completed + metrics.failed
+    return StageMetricsResponse(
+        stage=metrics.name,
+        workers=metrics.workers,
+        queueDepth=counts.get("QUEUED", 0),
+        queuedPrompts=queued_prompts or 0,
+        inFlight=counts.get("RUNNING", 0),
+        completed=metrics.completed,
+        failed=metrics.failed,
+        avgSeconds=metrics.total_seconds / done if done else 0.0,
+        maxSeconds=metrics.max_seconds,
+        lastSeconds=metrics.last_seconds,
+    )
+
+
+def _latency_snapshot(hist: LatencyHistogram) -> UpstreamLatencyResponse:
+    count = sum(hist.counts)
+    return UpstreamLatencyResponse(
+        call=hist.name,
+        count=count,
+        failed=hist.failed,
+        avgSeconds=hist.total_seconds / count if count else 0.0,
+        bucketBounds=list(LATENCY_BUCKETS),
+        bucketCounts=list(hist.counts),
+    )
+
+
+@app.get(
+    "/v1/video/metrics",
+    response_model=SchedulerMetricsResponse,
+    tags=["video"],
+)
+def get_scheduler_metrics(db: Session = Depends(get_db)) -> SchedulerMetricsResponse:
+    return SchedulerMetricsResponse(
+        stages=[
+            _stage_snapshot(db, AUDIO_METRICS),
+            _stage_snapshot(db, VIDEO_METRICS),
+        ],
+        upstream=[_latency_snapshot(h) for h in UPSTREAM_LATENCY.values()],
     )
 
 
@@ -0,0 +1,78 @@
+"""The cumsum moving average of Audio2Motion._smo against the previous frame-by-frame np.mean loop."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+DITTO_DIR = Path(__file__).resolve().parents[1] / "ditto-talkinghead"
+MOTION_DIM = 265
+
+
+@pytest.fixture
+def audio2motion(monkeypatch):
+    monkeypatch.syspath_prepend(str(DITTO_DIR))
+    from core.atomic_components.audio2motion import Audio2Motion
+
+    def make(smo_k_d):
+        a2m = Audio2Motion.__new__(Audio2Motion)
+        a2m.smo_k_d = smo_k_d
+        return a2m
+
+    return make
+
+
+def _smo_looped(smo_k_d, res_kp_seq, s, e):
+    if smo_k_d <= 1:
+        return res_kp_seq
+    new_res_kp_seq = res_kp_seq.copy()
+    n = res_kp_seq.shape[1]
+    half_k = smo_k_d // 2
+    for i in range(s, e):
+        ss = max(0, i - half_k)
+        ee = min(n, i + half_k + 1)
+        res_kp_seq[:, i, :202] = np.mean(new_res_kp_seq[:, ss:ee, :202], axis=1)
+    return res_kp_seq
+
+
+def _kp_seq(n):
+    return np.random.default_rng(n).standard_normal((1, n, MOTION_DIM)).astype(np.float32)
+
+
+@pytest.mark.parametrize("smo_k_d", [1, 2, 3, 4, 7])
+@pytest.mark.parametrize(
+    "n, s, e",
+    [
+        (80, 0, 80),  # first clip: the whole sequence
+        (190, 105, 131),  # a later clip: the fused frames plus one
+        (190, 0, 1),
+        (190, 189, 190),
+        (190, 50, 50),  # empty range
+    ],
+)
+# blocks shorter than the range smooth later blocks from the carried original values
+@pytest.mark.parametrize("block", [1, 2, 7, 1024])
+def test_smo_matches_loop(audio2motion, smo_k_d, n, s, e, block):
+    res_kp_seq = _kp_seq(n)
+    expected = _smo_looped(smo_k_d, res_kp_seq.copy(), s, e)
+
+    out = audio2motion(smo_k_d)._smo(res_kp_seq, s, e, block=block)
+
+    assert out is res_kp_seq
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-6)
+    # frames outside [s, e) and the dims past 202 stay as they were
+    assert np.array_equal(np.delete(out, np.s_[s:e], axis=1), np.delete(expected, np.s_[s:e], axis=1))
+    assert np.array_equal(out[:, :, 202:], expected[:, :, 202:])
+
+
+def test_smo_on_view_matches_loop(audio2motion):
+    # run_clips smooths a prefix view of the preallocated output
+    res_kp_seq = _kp_seq(300)
+    expected = res_kp_seq.copy()
+    _smo_looped(5, expected[:, :190], 105, 131)
+
+    audio2motion(5)._smo(res_kp_seq[:, :190], 105, 131, block=8)
+
+    np.testing.assert_allclose(res_kp_seq, expected, rtol=1e-5, atol=1e-6)
+    assert np.array_equal(res_kp_seq[:, 190:], expected[:, 190:])
@@ -0,0 +1,187 @@
+"""Smoke test of the online (streaming) Ditto session: chunks in, one rendered frame per 40 ms of audio out.
+
+The real Audio2Motion drives the clip/fuse bookkeeping; the networks, the avatar and the
+writer are stand-ins, so this runs without checkpoints, a GPU or ffmpeg.
+"""
+
+import math
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+DITTO_DIR = Path(__file__).resolve().parents[1] / "ditto-talkinghead"
+CHUNKSIZE = (3, 5, 2)
+FEAT_DIM = 8
+MOTION_DIM = 265
+
+
+class FakeNet:
+    model_type = "pytorch"
+
+
+class FakeLMDM(FakeNet):
+    seq_frames = 80
+    motion_feat_dim = MOTION_DIM
+
+    def setup(self, sampling_timesteps):
+        pass
+
+    def __call__(self, kp_cond, aud_cond, sampling_timesteps):
+        return np.repeat(aud_cond[:, :, :1], MOTION_DIM, 2)
+
+
+class FakeWav2Feat:
+    feat_dim = FEAT_DIM
+    support_streaming = True
+    w2f = types.SimpleNamespace(hubert=FakeNet())
+
+    def __call__(self, audio_chunk, chunksize=CHUNKSIZE):
+        assert len(audio_chunk) == int(sum(chunksize) * 0.04 * 16000) + 80
+        return np.ones((chunksize[1], FEAT_DIM), dtype=np.float32)
+
+    def wav2feat(self, audio, sr=16000):
+        return np.zeros((math.ceil(len(audio) / 640), FEAT_DIM), dtype=np.float32)
+
+
+class FakeConditionHandler:
+    def setup(self, source_info, emo, eye_f0_mode=False, ch_info=None):
+        self.x_s_info_0 = source_info["x_s_info_lst"][0]
+
+    def __call__(self, aud_feat, idx):
+        return aud_feat[None]
+
+
+class FakeMotionStitch:
+    stitch_net = FakeNet()
+    d0 = None
+
+    def setup(self, N_d=-1, **kwargs):
+        self.N_d = N_d
+
+    def set_Nd(self, N_d=-1):
+        self.N_d = N_d
+
+    def batch(self, x_s_info, x_d_info_list, ctrl_kwargs_list):
+        return np.zeros((1, 4), dtype=np.float32), np.stack([d["exp"][0] for d in x_d_info_list])
+
+
+class FakeRender:
+    warp_net = decoder = FakeNet()
+
+    def __call__(self, f_s, x_s, x_d):
+        return x_d
+
+    def batch(self, f_3d):
+        return np.zeros((len(f_3d), 4, 4, 3), dtype=np.float32)
+
+
+class FakePutBack:
+    def setup(self, is_image_flag=True):
+        pass
+
+    def __call__(self, frame_rgb, render_img, M_c2o, out=None):
+        return render_img.astype(np.uint8)
+
+
+class FakeBufferPool:
+    def __init__(self, max_free=0):
+        pass
+
+    def acquire(self, shape):
+        return None
+
+    def release(self, buf):
+        pass
+
+
+class FakeWriter:
+    def __init__(self, path, **kwargs):
+        self.frames = 0
+
+    def __call__(self, img, fmt="bgr"):
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+@pytest.fixture
+def stream_pipeline(monkeypatch):
+    # the registrar, putback and writer pull in cv2/imageio/ffmpeg; nothing of theirs runs here
+    monkeypatch.syspath_prepend(str(DITTO_DIR))
+    fakes = {
+        "core.atomic_components.avatar_registrar": _module("avatar_registrar", AvatarRegistrar=None, SourceInfoCache=None, smooth_x_s_info_lst=None),
+        "core.atomic_components.putback": _module("putback", PutBack=FakePutBack, BufferPool=FakeBufferPool),
+        "core.atomic_components.writer": _module("writer", VideoWriterByFFmpeg=FakeWriter, VideoWriterByImageIO=FakeWriter),
+    }
+    for name, module in fakes.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.delitem(sys.modules, "stream_pipeline_offline", raising=False)
+    import stream_pipeline_offline
+
+    return stream_pipeline_offline
+
+
+def _new_session(stream_pipeline):
+    audio2motion = stream_pipeline.Audio2Motion.__new__(stream_pipeline.Audio2Motion)
+    audio2motion.lmdm = FakeLMDM()
+    source_info = {
+        "x_s_info_lst": [{"exp": np.zeros((1, 63), dtype=np.float32), "kp": np.zeros((1, 63), dtype=np.float32)}],
+        "f_s_lst": [np.zeros((1, 4), dtype=np.float32)],
+        "M_c2o_lst": [np.eye(3, dtype=np.float32)],
+        "img_rgb_lst": [np.zeros((4, 4, 3), dtype=np.uint8)],
+        "is_image_flag": True,
+    }
+    sdk = types.SimpleNamespace(
+        default_kwargs={},
+        wav2feat=FakeWav2Feat(),
+        condition_handler=FakeConditionHandler(),
+        audio2motion=audio2motion,
+        motion_stitch=FakeMotionStitch(),
+        warp_f3d=FakeRender(),
+        decode_f3d=FakeRender(),
+        putback=FakePutBack(),
+        _merge_kwargs=lambda default_kwargs, run_kwargs: {**default_kwargs, **run_kwargs},
+        _register_avatar=lambda *args: source_info,
+    )
+    return stream_pipeline.StreamSession(sdk)
+
+
+def _run_chunks(session, audio):
+    # same windows as run_inference in online mode
+    audio = np.concatenate([np.zeros((CHUNKSIZE[0] * 640,), dtype=np.float32), audio], 0)
+    split_len = int(sum(CHUNKSIZE) * 0.04 * 16000) + 80
+    n_chunks = 0
+    for i in range(0, len(audio), CHUNKSIZE[1] * 640):
+        audio_chunk = audio[i : i + split_len]
+        if len(audio_chunk) < split_len:
+            audio_chunk = np.pad(audio_chunk, (0, split_len - len(audio_chunk)), mode="constant")
+        session.run_chunk(audio_chunk, CHUNKSIZE)
+        n_chunks += 1
+    return n_chunks
+
+
+@pytest.mark.parametrize("overlap_v2", [10, 70])
+@pytest.mark.parametrize("seconds", [0.5, 7.3, 12.0])
+def test_online_session_renders_whole_audio(stream_pipeline, tmp_path, overlap_v2, seconds):
+    session = _new_session(stream_pipeline)
+    session.setup("avatar.png", str(tmp_path / "out.mp4"), online_mode=True, overlap_v2=overlap_v2, writer="imageio", smo_k_d=3)
+    audio = np.zeros((int(seconds * 16000),), dtype=np.float32)
+    num_f = math.ceil(len(audio) / 16000 * 25)
+    session.setup_Nd(N_d=num_f)
+
+    n_chunks = _run_chunks(session, audio)
+    session.close()
+
+    assert n_chunks > 1
+    assert session.writer.frames == num_f
+    assert session.stage_stats["writer"][0] == num_f
@@ -0,0 +1,117 @@
+"""MotionStitch.batch against calling the stitcher frame by frame on the same frames and ctrl kwargs."""
+
+import copy
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+DITTO_DIR = Path(__file__).resolve().parents[1] / "ditto-talkinghead"
+# x_s_info/x_d_info layout of the Ditto motion features (arr2dic); x_d_info has no "kp"
+INFO_DIMS = {"scale": 1, "pitch": 66, "yaw": 66, "roll": 66, "t": 3, "exp": 63}
+
+
+class FakeStitchNet:
+    # row-wise like the real network, so a batch must give the rows of the per-frame calls
+    def __call__(self, x_s, x_d):
+        assert len(x_s) == len(x_d)
+        return x_d + 0.1 * np.tanh(x_s)
+
+
+@pytest.fixture
+def motion_stitch(monkeypatch):
+    monkeypatch.syspath_prepend(str(DITTO_DIR))
+    from core.atomic_components.motion_stitch import MotionStitch
+
+    def make(**setup_kwargs):
+        ms = MotionStitch.__new__(MotionStitch)
+        ms.stitch_net = FakeStitchNet()
+        ms.setup(**setup_kwargs)
+        return ms
+
+    return make
+
+
+def _info(rng, n=1, kp=True):
+    info = {k: rng.standard_normal((n, dim)).astype(np.float32) for k, dim in INFO_DIMS.items()}
+    info["scale"] = np.abs(info["scale"]) + 1
+    if kp:
+        info["kp"] = rng.standard_normal((n, 63)).astype(np.float32)
+    return info
+
+
+def _run_per_frame(ms, x_s_info, x_d_info_list, ctrl_kwargs_list):
+    per_frame = len(x_s_info["scale"]) > 1
+    x_s_list, x_d_list = [], []
+    for b, (x_d_info, kwargs) in enumerate(zip(x_d_info_list, ctrl_kwargs_list)):
+        x_s_info_b = {k: v[b : b + 1] for k, v in x_s_info.items()} if per_frame else x_s_info
+        x_s, x_d = ms(copy.deepcopy(x_s_info_b), copy.deepcopy(x_d_info), **copy.deepcopy(kwargs))
+        x_s_list.append(x_s)
+        x_d_list.append(x_d)
+    return np.concatenate(x_s_list, 0) if per_frame else x_s_list[0], np.concatenate(x_d_list, 0)
+
+
+def _compare(make, setup_kwargs, batches, per_frame_source=False, seed=0):
+    """Feed the same frames through batch() in chunks of `batches` and through __call__ one by one."""
+    rng = np.random.default_rng(seed)
+    n = sum(len(kw) for kw in batches)
+    source = _info(rng, n if per_frame_source else 1)
+    frames = [_info(rng, kp=False) for _ in range(n)]
+    setup_source = {k: v[:1] for k, v in source.items()}
+
+    batched = make(x_s_info=copy.deepcopy(setup_source), **setup_kwargs)
+    looped = make(x_s_info=copy.deepcopy(setup_source), **setup_kwargs)
+    s = 0
+    for ctrl_kwargs_list in batches:
+        e = s + len(ctrl_kwargs_list)
+        x_s_info = {k: v[s:e] for k, v in source.items()} if per_frame_source else source
+        x_s, x_d = batched.batch(copy.deepcopy(x_s_info), copy.deepcopy(frames[s:e]), copy.deepcopy(ctrl_kwargs_list))
+        x_s_ref, x_d_ref = _run_per_frame(looped, x_s_info, frames[s:e], ctrl_kwargs_list)
+
+        assert x_d.shape == x_d_ref.shape == (e - s, 21, 3)
+        np.testing.assert_allclose(x_s, x_s_ref, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(x_d, x_d_ref, rtol=1e-5, atol=1e-5)
+        s = e
+    assert batched.idx == looped.idx == n
+
+
+@pytest.mark.parametrize("relative_d", [True, False])
+@pytest.mark.parametrize("batch_sizes", [(1,), (8,), (3, 5, 1, 7)])
+def test_batch_matches_per_frame_image(motion_stitch, relative_d, batch_sizes):
+    _compare(motion_stitch, {"relative_d": relative_d}, [[{}] * b for b in batch_sizes])
+
+
+def test_batch_matches_per_frame_blinking(motion_stitch):
+    # the blink index carries over between batches
+    delta_eye_arr = np.random.default_rng(1).standard_normal((15, 63)).astype(np.float32) * 0.01
+    setup_kwargs = {"N_d": 60, "delta_eye_arr": delta_eye_arr, "delta_eye_open_n": 4}
+    _compare(motion_stitch, setup_kwargs, [[{}] * b for b in (7, 13, 1, 20)])
+
+
+@pytest.mark.parametrize("fade_type", ["", "d0", "s"])
+def test_batch_matches_per_frame_vad_and_fade(motion_stitch, fade_type):
+    # fade in over the first frames, a few muted ones, then fade out
+    kwargs = [{"fade_alpha": a} for a in (0.0, 0.25, 0.5, 0.75)] + [{}] * 3 + [{"vad_alpha": 0.3}] * 2 + [{"fade_alpha": 0.6, "vad_alpha": 0.5}, {"fade_alpha": 0.2}]
+    _compare(motion_stitch, {"fade_type": fade_type}, [kwargs[:5], kwargs[5:]])
+
+
+def test_batch_matches_per_frame_overall_ctrl(motion_stitch):
+    _compare(motion_stitch, {"fade_type": "s", "overall_ctrl_info": {"vad_alpha": 0.5}}, [[{}, {"fade_alpha": 0.4}, {}]])
+
+
+def test_batch_matches_per_frame_video_source(motion_stitch):
+    # one x_s_info row per frame; no cached source keypoints, no gaze fix
+    _compare(motion_stitch, {"is_image_flag": False, "fade_type": "s"}, [[{}] * 4, [{"fade_alpha": 0.5}] * 3 + [{}]], per_frame_source=True)
+
+
+@pytest.mark.parametrize(
+    "ctrl_kwargs_list",
+    [
+        [{}, {"delta_pitch": 3.0}, {}],
+        [{"alpha_yaw": 0.5}] * 3,
+        [{"delta_exp": 0.01}, {}, {}],
+        [{"fade_alpha": 0.5, "fade_out_keys": ("exp",)}, {"fade_alpha": 0.5, "fade_out_keys": ("exp", "t")}],
+    ],
+)
+def test_batch_falls_back_to_per_frame(motion_stitch, ctrl_kwargs_list):
+    _compare(motion_stitch, {"fade_type": "s"}, [ctrl_kwargs_list, [{}] * 2])
@@ -0,0 +1,127 @@
+"""Batched watermark embedding/detection of ToneColorConverter against the previous one-window-at-a-time loops.
+
+wavmark is replaced by a fixed random projection that, like the real model, handles every row of a
+batch independently, so the two paths must give the same audio and the same decoded message.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+OPENVOICE_DIR = Path(__file__).resolve().parents[1] / "OpenVoice"
+K = 16000
+COEFF = 2
+MESSAGE = "@MyShell"  # string_to_bits pads to 8 characters: 64 bits -> 2 windows
+
+
+class FakeWatermarkModel:
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.codes = torch.from_numpy(rng.choice([-1.0, 1.0], size=(32, K)).astype(np.float32))
+
+    def encode(self, signal, message):
+        assert signal.ndim == 2 and signal.shape[1] == K and message.shape == (len(signal), 32)
+        return signal + 0.01 * (2 * message - 1) @ self.codes
+
+    def decode(self, signal):
+        assert signal.ndim == 2 and signal.shape[1] == K
+        return torch.sigmoid(signal @ self.codes.T / 10)
+
+
+@pytest.fixture
+def openvoice(monkeypatch):
+    # openvoice.text pulls in the Chinese/English text frontends, which only the TTS path uses
+    monkeypatch.syspath_prepend(str(OPENVOICE_DIR))
+    monkeypatch.setitem(sys.modules, "openvoice.text", types.SimpleNamespace(text_to_sequence=None))
+    from openvoice import api, utils
+
+    return api, utils
+
+
+def _converter(api):
+    return types.SimpleNamespace(watermark_model=FakeWatermarkModel(), device="cpu", _watermark_windows=api.ToneColorConverter._watermark_windows)
+
+
+def _add_watermark_looped(utils, model, audio, message):
+    bits = utils.string_to_bits(message).reshape(-1)
+    n_repeat = len(bits) // 32
+    for n in range(n_repeat):
+        trunck = audio[(COEFF * n) * K : (COEFF * n + 1) * K]
+        if len(trunck) != K:
+            break
+        with torch.no_grad():
+            signal = torch.FloatTensor(trunck)[None]
+            message_tensor = torch.FloatTensor(bits[n * 32 : (n + 1) * 32])[None]
+            signal_wmd_npy = model.encode(signal, message_tensor).detach().cpu().squeeze()
+        audio[(COEFF * n) * K : (COEFF * n + 1) * K] = signal_wmd_npy
+    return audio
+
+
+def _detect_watermark_looped(utils, model, audio, n_repeat):
+    bits = []
+    for n in range(n_repeat):
+        trunck = audio[(COEFF * n) * K : (COEFF * n + 1) * K]
+        if len(trunck) != K:
+            return "Fail"
+        with torch.no_grad():
+            signal = torch.FloatTensor(trunck).unsqueeze(0)
+            bits.append((model.decode(signal) >= 0.5).int().detach().cpu().numpy().squeeze())
+    return utils.bits_to_string(np.stack(bits).reshape(-1, 8))
+
+
+def _audio(n_samples):
+    return (0.1 * np.random.default_rng(1).standard_normal(n_samples)).astype(np.float32)
+
+
+# whole windows, a partial last window, exactly enough for all windows, gaps only, and too short for any
+@pytest.mark.parametrize("n_samples", [10 * K, 5 * K + 123, 7 * K, 2 * K + 1, K - 1])
+@pytest.mark.parametrize("n_repeat", [1, 2, 4])
+def test_watermark_windows_match_slices(openvoice, n_samples, n_repeat):
+    api, _ = openvoice
+    idx = api.ToneColorConverter._watermark_windows(n_samples, n_repeat)
+    expected = []
+    for n in range(n_repeat):
+        window = np.arange(n_samples)[(COEFF * n) * K : (COEFF * n + 1) * K]
+        if len(window) != K:
+            break
+        expected.append(window)
+    assert idx.shape == (len(expected), K)
+    assert np.array_equal(idx, np.array(expected).reshape(-1, K))
+
+
+@pytest.mark.parametrize("n_samples", [10 * K, 3 * K, 2 * K + 123, K, K - 1])
+def test_add_watermark_matches_loop(openvoice, n_samples):
+    api, utils = openvoice
+    conv = _converter(api)
+    audio = _audio(n_samples)
+
+    batched = api.ToneColorConverter.add_watermark(conv, audio.copy(), MESSAGE)
+    looped = _add_watermark_looped(utils, conv.watermark_model, audio.copy(), MESSAGE)
+
+    assert batched.dtype == looped.dtype
+    np.testing.assert_allclose(batched, looped, rtol=0, atol=1e-6)
+    # the gaps between windows and the tail are left alone
+    untouched = np.ones(n_samples, dtype=bool)
+    untouched[api.ToneColorConverter._watermark_windows(n_samples, 2).reshape(-1)] = False
+    assert np.array_equal(batched[untouched], audio[untouched])
+
+
+@pytest.mark.parametrize("n_samples", [10 * K, 3 * K, 3 * K - 1, K - 1])
+def test_detect_watermark_matches_loop(openvoice, n_samples):
+    api, utils = openvoice
+    conv = _converter(api)
+    n_repeat = len(utils.string_to_bits(MESSAGE).reshape(-1)) // 32
+    audio = _add_watermark_looped(utils, conv.watermark_model, _audio(n_samples), MESSAGE)
+
+    batched = api.ToneColorConverter.detect_watermark(conv, audio, n_repeat)
+    looped = _detect_watermark_looped(utils, conv.watermark_model, audio, n_repeat)
+
+    assert batched == looped
+    if n_samples >= (COEFF * (n_repeat - 1) + 1) * K:
+        assert batched == MESSAGE
+    else:
+        assert batched == "Fail"
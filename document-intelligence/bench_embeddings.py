@@ -0,0 +1,122 @@
+"""
+Throughput of EmbeddingService.embed_batch against a local stub of the Ollama embedding API.
+
+    python bench_embeddings.py --texts 200 --concurrency 1 4 8 16
+
+The stub answers /api/embeddings (one text) and /api/embed (many texts) after a fixed per-request
+latency plus a per-text compute time, with --server-slots requests computed at a time, and fails
+--error-rate of the requests with 503. "serial" is the previous client: a new AsyncClient and
+one awaited /api/embeddings request per text.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from docint_app.services.embedding_service import EmbeddingService  # noqa: E402
+
+DIM = 768
+
+
+def make_stub(latency: float, per_text: float, slots: int, error_rate: float, with_embed: bool) -> ThreadingHTTPServer:
+    gpu = threading.Semaphore(slots)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _reply(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            if random.random() < error_rate:
+                return self._reply(503, {"error": "busy"})
+            if self.path.endswith("/api/embeddings"):
+                texts = [payload["prompt"]]
+            elif self.path.endswith("/api/embed") and with_embed:
+                texts = payload["input"]
+            else:
+                return self._reply(404, {"error": "not found"})
+            with gpu:
+                time.sleep(per_text * len(texts))
+            vectors = [[float(len(t) % 7)] * DIM for t in texts]
+            self._reply(200, {"embedding": vectors[0]} if self.path.endswith("/api/embeddings") else {"embeddings": vectors})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def serial_embed(base_url: str, texts: List[str]) -> List[List[float]]:
+    out = []
+    for text in texts:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{base_url}/api/embeddings", json={"model": "m", "prompt": text}, timeout=30.0)
+            response.raise_for_status()
+            out.append(response.json()["embedding"])
+    return out
+
+
+async def bench(base_url: str, texts: List[str], concurrency: int, batch_size: int) -> float:
+    service = EmbeddingService(base_url=base_url, max_concurrency=concurrency, batch_size=batch_size, backoff_base=0.05)
+    t0 = time.perf_counter()
+    vectors = await service.embed_batch(texts)
+    seconds = time.perf_counter() - t0
+    await service.aclose()
+    assert len(vectors) == len(texts) and all(len(v) == DIM for v in vectors)
+    return seconds
+
+
+async def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=200, help="texts per embed_batch call (about a 60-slide deck plus captions)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="per request (network + queueing)")
+    parser.add_argument("--per-text-ms", type=float, default=4.0, help="compute per text")
+    parser.add_argument("--server-slots", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OLLAMA_API_KEY", "bench")
+    texts = [f"slide {i}: " + "lorem ipsum " * (i % 40 + 1) for i in range(args.texts)]
+
+    for with_embed in (False, True):
+        server = make_stub(args.latency_ms / 1000, args.per_text_ms / 1000, args.server_slots, args.error_rate if with_embed else 0.0, with_embed)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"--- stub with{'' if with_embed else 'out'} /api/embed ---")
+        if not with_embed:
+            t0 = time.perf_counter()
+            await serial_embed(base_url, texts)
+            seconds = time.perf_counter() - t0
+            base = seconds
+            print(f"serial          : {seconds:6.2f}s  {args.texts / seconds:7.1f} texts/s")
+        for c in args.concurrency:
+            seconds = await bench(base_url, texts, c, args.batch_size)
+            print(f"concurrency={c:<4}: {seconds:6.2f}s  {args.texts / seconds:7.1f} texts/s  ({base / seconds:.1f}x)")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,13 +21,17 @@ from fastapi import (  # noqa: F401
     Security,
     status,
 )
+from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from docint_app.models.extra_models import TokenModel  # noqa: F401
 from pydantic import Field, StrictBytes, StrictStr
-from typing import Any, Tuple, Union
+from typing import Any, Optional, Tuple, Union
 from typing_extensions import Annotated
 from docint_app.models.retrieval_response import RetrievalResponse
+from docint_app.models.upload_job import UploadJob
 from docint_app.models.upload_response import UploadResponse
+from docint_app.services.upload_job_service import get_upload_job_service
+import uuid
 
 
 router = APIRouter()
@@ -92,7 +96,95 @@ async def retrieves_data_for_generation(
 async def uploads_document(
     courseId: Annotated[StrictStr, Field(description="The course ID.")] = Path(..., description="The course ID."),
     body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]] = Body(None, description=""),
+    documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")] = Query(None, description="Existing document of the course to replace; only pages that changed are processed again.", alias="documentId"),
 ) -> UploadResponse:
     if not BaseDocintApi.subclasses:
         raise HTTPException(status_code=500, detail="Not implemented")
-    return await BaseDocintApi.subclasses[0]().uploads_document(courseId, body)
+    return await BaseDocintApi.subclasses[0]().uploads_document(courseId, body, documentId)
+
+
+@router.post(
+    "/v1/upload-jobs/{courseId}",
+    responses={
+        202: {"model": UploadResponse, "description": "Accepted. Returns the ID of the document being ingested."},
+        400: {"description": "Bad Request – missing file or parameters."},
+        404: {"description": "Not Found – resource not found."},
+        413: {"description": "Payload Too Large."},
+        415: {"description": "Unsupported Media Type (only PDFs accepted)."},
+    },
+    tags=["docint"],
+    summary="uploads a PDF document for background ingestion",
+    response_model_by_alias=True,
+    status_code=202,
+)
+async def uploads_document_async(
+    courseId: Annotated[StrictStr, Field(description="The course ID.")] = Path(..., description="The course ID."),
+    body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]] = Body(None, description=""),
+    documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")] = Query(None, description="Existing document of the course to replace; only pages that changed are processed again.", alias="documentId"),
+) -> UploadResponse:
+    """Stores the PDF and returns its document ID right away; OCR, captioning and ingestion run in the background. Progress is available from &#x60;GET /v1/upload-jobs/status/{documentId}&#x60; and is also pushed, as described by that endpoint, over a websocket at &#x60;/v1/upload-jobs/status/{documentId}/live&#x60; whenever a page finishes."""
+    if not BaseDocintApi.subclasses:
+        raise HTTPException(status_code=500, detail="Not implemented")
+    return await BaseDocintApi.subclasses[0]().uploads_document_async(courseId, body, documentId)
+
+
+@router.get(
+    "/v1/upload-jobs/status/{documentId}",
+    responses={
+        200: {"model": UploadJob, "description": "The current state of the upload job."},
+        404: {"description": "Not Found – resource not found."},
+    },
+    tags=["docint"],
+    summary="Get the ingestion progress of an uploaded document",
+    response_model_by_alias=True,
+)
+async def gets_upload_job(
+    documentId: Annotated[StrictStr, Field(description="The document ID.")] = Path(..., description="The document ID."),
+) -> UploadJob:
+    if not BaseDocintApi.subclasses:
+        raise HTTPException(status_code=500, detail="Not implemented")
+    return await BaseDocintApi.subclasses[0]().gets_upload_job(documentId)
+
+
+@router.post(
+    "/v1/upload-jobs/status/{documentId}/resume",
+    responses={
+        202: {"model": UploadJob, "description": "The job after requeueing."},
+        404: {"description": "Not Found – resource not found."},
+    },
+    tags=["docint"],
+    summary="Retries the failed pages of an upload job",
+    response_model_by_alias=True,
+    status_code=202,
+)
+async def resumes_upload_job(
+    documentId: Annotated[StrictStr, Field(description="The document ID.")] = Path(..., description="The document ID."),
+) -> UploadJob:
+    """Queues a FAILED job again; pages that were already ingested are not processed again. Jobs in any other state are returned unchanged."""
+    if not BaseDocintApi.subclasses:
+        raise HTTPException(status_code=500, detail="Not implemented")
+    return await BaseDocintApi.subclasses[0]().resumes_upload_job(documentId)
+
+
+@router.websocket("/v1/upload-jobs/status/{documentId}/live")
+async def websocket_upload_job(
+    websocket: WebSocket,
+    documentId: Annotated[StrictStr, Field(description="The document ID.")] = Path(..., description="The document ID."),
+) -> None:
+    await websocket.accept()
+    id = str(uuid.uuid4())
+    job_service = get_upload_job_service()
+    if job_service.get_job(documentId) is None:
+        await websocket.close(code=1008, reason="Unknown document")
+        return
+
+    async def send_job_update(job) -> None:
+        await websocket.send_text(UploadJob.from_dict(job).to_json())
+
+    await job_service.add_listener(documentId, id, send_job_update)
+
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        job_service.remove_listener(documentId, id)
@@ -3,9 +3,10 @@
 from typing import ClassVar, Tuple  # noqa: F401
 
 from pydantic import Field, StrictBytes, StrictStr
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 from typing_extensions import Annotated
 from docint_app.models.retrieval_response import RetrievalResponse
+from docint_app.models.upload_job import UploadJob
 from docint_app.models.upload_response import UploadResponse
 
 
@@ -34,5 +35,31 @@ class BaseDocintApi:
         self,
         courseId: Annotated[StrictStr, Field(description="The course ID.")],
         body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]],
+        documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")],
     ) -> UploadResponse:
         ...
+
+
+    async def uploads_document_async(
+        self,
+        courseId: Annotated[StrictStr, Field(description="The course ID.")],
+        body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]],
+        documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")],
+    ) -> UploadResponse:
+        """Stores the PDF and returns its document ID right away; OCR, captioning and ingestion run in the background. Progress is available from &#x60;GET /v1/upload-jobs/status/{documentId}&#x60; and is also pushed, as described by that endpoint, over a websocket at &#x60;/v1/upload-jobs/status/{documentId}/live&#x60; whenever a page finishes."""
+        ...
+
+
+    async def gets_upload_job(
+        self,
+        documentId: Annotated[StrictStr, Field(description="The document ID.")],
+    ) -> UploadJob:
+        ...
+
+
+    async def resumes_upload_job(
+        self,
+        documentId: Annotated[StrictStr, Field(description="The document ID.")],
+    ) -> UploadJob:
+        """Queues a FAILED job again; pages that were already ingested are not processed again. Jobs in any other state are returned unchanged."""
+        ...
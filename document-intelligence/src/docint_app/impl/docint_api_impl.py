@@ -1,13 +1,16 @@
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
+from fastapi import HTTPException
 from pydantic import Field, StrictBytes, StrictStr
 from typing_extensions import Annotated
 
 from docint_app.apis.docint_api_base import BaseDocintApi
 from docint_app.models.retrieval_response import RetrievalResponse
+from docint_app.models.upload_job import UploadJob
 from docint_app.models.upload_response import UploadResponse
 from docint_app.services.pdf_upload_service import get_upload_pdf_service
 from docint_app.services.retrieval_service import get_retrieval_service
+from docint_app.services.upload_job_service import get_upload_job_service
 
 
 class DocintApiImpl(BaseDocintApi):  # type: ignore[no-untyped-call]
@@ -24,8 +27,48 @@ class DocintApiImpl(BaseDocintApi):  # type: ignore[no-untyped-call]
         self,
         courseId: Annotated[StrictStr, Field(description="The course ID.")],
         body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]],
+        documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")],
     ) -> UploadResponse:
         service = get_upload_pdf_service()
 
-        document_id = await service.upload_pdf(courseId, body)
+        try:
+            document_id = await service.upload_pdf(courseId, body, documentId)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         return UploadResponse(documentId=document_id)
+
+    async def uploads_document_async(
+        self,
+        courseId: Annotated[StrictStr, Field(description="The course ID.")],
+        body: Union[StrictBytes, StrictStr, Tuple[StrictStr, StrictBytes]],
+        documentId: Annotated[Optional[StrictStr], Field(description="Existing document of the course to replace; only pages that changed are processed again.")],
+    ) -> UploadResponse:
+        service = get_upload_job_service()
+
+        try:
+            document_id = await service.submit(courseId, body, documentId)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return UploadResponse(documentId=document_id)
+
+    async def gets_upload_job(
+        self,
+        documentId: Annotated[StrictStr, Field(description="The document ID.")],
+    ) -> UploadJob:
+        job = get_upload_job_service().get_job(documentId)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"No upload job for document {documentId}")
+        return UploadJob.from_dict(dict(job))
+
+    async def resumes_upload_job(
+        self,
+        documentId: Annotated[StrictStr, Field(description="The document ID.")],
+    ) -> UploadJob:
+        job = await get_upload_job_service().resume(documentId)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"No upload job for document {documentId}")
+        return UploadJob.from_dict(dict(job))
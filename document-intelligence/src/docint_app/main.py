@@ -11,15 +11,37 @@ Generated by OpenAPI Generator (https://openapi-generator.tech)
 Do not edit the class manually.
 """  # noqa: E501
 
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from docint_app.apis.docint_api import router as DocintApiRouter
+from docint_app.services.upload_job_service import UploadJobService, get_upload_job_service
 
 # Load environment variables once at startup
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # resume the upload jobs a previous run left unfinished
+    job_service: Optional[UploadJobService] = None
+    try:
+        job_service = get_upload_job_service()
+        await job_service.start()
+    except Exception as e:
+        logger.error(f"Could not start the upload job workers: {e}")
+    yield
+    if job_service is not None:
+        await job_service.stop()
+
+
 app = FastAPI(
     title="Document Intelligence API",
     description=(
@@ -30,6 +52,7 @@ app = FastAPI(
         "License: MIT (see repository)."
     ),
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
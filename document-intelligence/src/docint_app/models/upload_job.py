@@ -0,0 +1,109 @@
+# coding: utf-8
+
+"""
+    Document Intelligence API
+
+    API for the Orpheus document intelligence orchestration. From the repository: \"The Orpheus System transforms static slides into interactive lecture videos with lifelike professor avatars, combining expressive narration, visual presence, and dynamic content to create engaging, personalized learning experiences.\" License: MIT (see repository).
+
+    The version of the OpenAPI document: 0.1.0
+    Generated by OpenAPI Generator (https://openapi-generator.tech)
+
+    Do not edit the class manually.
+"""  # noqa: E501
+
+
+from __future__ import annotations
+import pprint
+import re  # noqa: F401
+import json
+
+
+
+
+from pydantic import BaseModel, ConfigDict, Field, StrictInt, StrictStr, field_validator
+from typing import Any, ClassVar, Dict, List
+try:
+    from typing import Self
+except ImportError:
+    from typing_extensions import Self
+
+class UploadJob(BaseModel):
+    """
+    UploadJob
+    """ # noqa: E501
+    document_id: StrictStr = Field(description="The ID of the stored document.", alias="documentId")
+    course_id: StrictStr = Field(description="The course ID.", alias="courseId")
+    state: StrictStr = Field(description="FAILED if the job broke off or at least one page could not be ingested.")
+    total_pages: StrictInt = Field(description="Pages of the document; 0 until the job has started.", alias="totalPages")
+    pages_done: List[StrictInt] = Field(description="1-based pages that are ingested.", alias="pagesDone")
+    pages_failed: List[StrictInt] = Field(description="1-based pages that failed in the last run.", alias="pagesFailed")
+    errors: List[StrictStr] = Field(description="Errors of the last run.")
+    __properties: ClassVar[List[str]] = ["documentId", "courseId", "state", "totalPages", "pagesDone", "pagesFailed", "errors"]
+
+    @field_validator('state')
+    def state_validate_enum(cls, value):
+        """Validates the enum"""
+        if value not in ('QUEUED', 'RUNNING', 'DONE', 'FAILED',):
+            raise ValueError("must be one of enum values ('QUEUED', 'RUNNING', 'DONE', 'FAILED')")
+        return value
+
+    model_config = {
+        "populate_by_name": True,
+        "validate_assignment": True,
+        "protected_namespaces": (),
+    }
+
+
+    def to_str(self) -> str:
+        """Returns the string representation of the model using alias"""
+        return pprint.pformat(self.model_dump(by_alias=True))
+
+    def to_json(self) -> str:
+        """Returns the JSON representation of the model using alias"""
+        # TODO: pydantic v2: use .model_dump_json(by_alias=True, exclude_unset=True) instead
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, json_str: str) -> Self:
+        """Create an instance of UploadJob from a JSON string"""
+        return cls.from_dict(json.loads(json_str))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the dictionary representation of the model using alias.
+
+        This has the following differences from calling pydantic's
+        `self.model_dump(by_alias=True)`:
+
+        * `None` is only added to the output dict for nullable fields that
+          were set at model initialization. Other fields with value `None`
+          are ignored.
+        """
+        _dict = self.model_dump(
+            by_alias=True,
+            exclude={
+            },
+            exclude_none=True,
+        )
+        return _dict
+
+    @classmethod
+    def from_dict(cls, obj: Dict) -> Self:
+        """Create an instance of UploadJob from a dict"""
+        if obj is None:
+            return None
+
+        if not isinstance(obj, dict):
+            return cls.model_validate(obj)
+
+        _obj = cls.model_validate({
+            "documentId": obj.get("documentId"),
+            "courseId": obj.get("courseId"),
+            "state": obj.get("state"),
+            "totalPages": obj.get("totalPages"),
+            "pagesDone": obj.get("pagesDone"),
+            "pagesFailed": obj.get("pagesFailed"),
+            "errors": obj.get("errors")
+        })
+        return _obj
+
+
@@ -26,7 +26,7 @@ class ImageDescriptionService:
             self._client = ollama.Client(host=self.base_url, headers={"Authorization": f"Bearer {api_key}"})
         return self._client
 
-    def _get_image_caption(self, base64_string: str) -> str:
+    def _get_image_caption(self, base64_string: str) -> Optional[str]:
         """
         Generate a caption for a single image from base64 string.
 
@@ -34,7 +34,7 @@ class ImageDescriptionService:
             base64_string: Base64 encoded image data
 
         Returns:
-            Image caption as string
+            Image caption as string, or None if the image could not be captioned
         """
         prompt = "Explain the given image. Write the explanation into a single, continuous string. Do not include any formatting, markdown, or commentary. Provide ONLY the raw, extracted text."
 
@@ -42,7 +42,7 @@ class ImageDescriptionService:
             image_bytes = base64.b64decode(base64_string)
         except Exception as e:
             print(f"Base64 decode error: {e}")
-            return ""
+            return None
 
         try:
             response = self.client.chat(
@@ -60,41 +60,34 @@ class ImageDescriptionService:
             print(f"Ollama error: {e.error}")
             if getattr(e, "status_code", None) == 401:
                 print("Authentication failed. Check OLLAMA_API_KEY.")
-            return ""
+            return None
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return ""
+            return None
 
-    def caption_images_grouped(self, images_grouped: List[List[Dict[str, str]]]) -> List[List[Dict[str, str]]]:
+    def caption_page_images(self, page_items: List[Dict[str, str]], page_idx: int) -> List[Dict[str, Optional[str]]]:
         """
-        Generate captions for grouped images (by pages).
+        Generate captions for the images of one page.
 
         Args:
-            images_grouped: List of pages, each containing list of images with 'data' key
+            page_items: Images of the page with 'data' key
+            page_idx: 1-based page number, for logging
 
         Returns:
-            List of pages with images containing both 'data' and 'caption' keys
+            Images containing both 'data' and 'caption' keys; 'caption' is None where captioning failed
         """
-        out: List[List[Dict[str, str]]] = []
-        for page_idx, page_items in enumerate(images_grouped, start=1):
-            if not page_items:
-                print(f"[Seite {page_idx}] (keine Bilder)")
-                out.append([])
-                continue
-
-            page_out = []
-            for img_idx, item in enumerate(page_items, start=1):
-                caption = self._get_image_caption(item["data"])
-                page_out.append({"data": item["data"], "caption": caption})
-                # Print caption directly
-                cap = caption or "<leer oder blockiert>"
-                print(f"[Seite {page_idx}, Bild {img_idx}] {cap}")
-            out.append(page_out)
-
-        total = sum(len(p) for p in out)
-        print(f"Seiten: {len(out)} | Bilder: {total}")
-
-        return out
+        if not page_items:
+            print(f"[Seite {page_idx}] (keine Bilder)")
+            return []
+
+        page_out: List[Dict[str, Optional[str]]] = []
+        for img_idx, item in enumerate(page_items, start=1):
+            caption = self._get_image_caption(item["data"])
+            page_out.append({"data": item["data"], "caption": caption})
+            # Print caption directly
+            cap = caption or "<leer oder blockiert>"
+            print(f"[Seite {page_idx}, Bild {img_idx}] {cap}")
+        return page_out
 
 
 def get_image_description_service() -> ImageDescriptionService:
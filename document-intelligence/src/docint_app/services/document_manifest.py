@@ -0,0 +1,73 @@
+"""
+Document Manifest
+Per-page fingerprints of an ingested document (hash of the rendered page and its extracted images) with
+the OCR text and captions that were stored for them, kept as JSON next to the uploaded PDF.
+A re-upload of the document compares against it and only reprocesses the pages that changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, TypedDict
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class _PageEntry(TypedDict):
+    fingerprint: str
+    text: str
+    captions: List[str]
+
+
+def page_fingerprint(image: Image.Image, items: List[Dict[str, str]]) -> str:
+    """sha256 over the page raster (mode, size, pixels) and the extracted images in page order."""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}|{image.size[0]}x{image.size[1]}|".encode())
+    h.update(image.tobytes())
+    for item in items:
+        h.update(b"|img|")
+        h.update(item["data"].encode())
+    return h.hexdigest()
+
+
+class DocumentManifest:
+    def __init__(self, path: str):
+        """
+        Args:
+            path: JSON file of the manifest; a missing or unreadable file is an empty manifest
+        """
+        self.path = Path(path)
+        # slide number -> what is stored in the vector store for it right now
+        self.pages: Dict[int, _PageEntry] = {}
+        if self.path.exists():
+            try:
+                self.pages = {int(slide_no): entry for slide_no, entry in json.loads(self.path.read_text())["pages"].items()}
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def by_fingerprint(self) -> Dict[str, _PageEntry]:
+        return {entry["fingerprint"]: entry for entry in self.pages.values()}
+
+    def set(self, slide_no: int, entry: Optional[_PageEntry]) -> None:
+        """Record what was stored for a slide; None when its stored state is unknown (e.g. it failed)."""
+        if entry is None:
+            self.pages.pop(slide_no, None)
+        else:
+            self.pages[slide_no] = entry
+
+    def drop_after(self, last_slide_no: int) -> None:
+        self.pages = {slide_no: entry for slide_no, entry in self.pages.items() if slide_no <= last_slide_no}
+
+    def dumps(self) -> str:
+        return json.dumps({"pages": {str(slide_no): entry for slide_no, entry in sorted(self.pages.items())}})
+
+    def write(self, data: str) -> None:
+        """Write a dumps() snapshot; no access to the pages, so it can run in a thread while they change."""
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(data)
+        os.replace(tmp_path, self.path)
@@ -2,16 +2,121 @@
 Embedding Service using Ollama API
 """
 
+import asyncio
+import logging
 import os
-from typing import Any, Dict, List, cast
+import random
+from typing import Any, Dict, List, Optional, cast
 
 import httpx
 
+from docint_app.services.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# rate limited or the GPU box is busy/restarting: worth another try
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
 
 class EmbeddingService:
-    def __init__(self, base_url: str = "https://gpu.aet.cit.tum.de/ollama"):
+    def __init__(
+        self,
+        base_url: str = "https://gpu.aet.cit.tum.de/ollama",
+        max_concurrency: int = 8,
+        batch_size: int = 32,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.model = "nomic-embed-text:latest"
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+
+        self._headers: Optional[Dict[str, str]] = None
+        # one pooled client per event loop; an AsyncClient cannot be used from another loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # multi-input /api/embed (Ollama >= 0.3); None until the first request finds out
+        self._batch_endpoint: Optional[bool] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Lazy read of OLLAMA_API_KEY."""
+        if self._headers is None:
+            api_key = os.getenv("OLLAMA_API_KEY")
+            if not api_key:
+                raise ValueError("OLLAMA_API_KEY environment variable is required")
+            self._headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        return self._headers
+
+    def _get_client(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._limit is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._limit
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST with retries on 429/5xx and connection errors (exponential backoff, full jitter)."""
+        client, limit = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            retry_after = 0.0
+            async with limit:
+                try:
+                    response = await client.post(path, json=payload)
+                except httpx.TransportError as e:
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"Embedding request to {path} failed ({e!r}), retrying")
+                else:
+                    if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                        response.raise_for_status()
+                        return cast(Dict[str, Any], response.json())
+                    logger.warning(f"Embedding request to {path} returned {response.status_code}, retrying")
+                    try:
+                        retry_after = float(response.headers.get("Retry-After", 0))
+                    except ValueError:
+                        pass
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+            await asyncio.sleep(max(delay, retry_after))
+        raise AssertionError("unreachable")
+
+    async def _embed_one(self, text: str) -> List[float]:
+        data = await self._post("/api/embeddings", {"model": self.model, "prompt": text})
+        return cast(List[float], data.get("embedding", []))
+
+    async def _embed_group(self, texts: List[str]) -> List[List[float]]:
+        if self._batch_endpoint is not False:
+            try:
+                data = await self._post("/api/embed", {"model": self.model, "input": texts})
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404 or self._batch_endpoint:
+                    raise
+                logger.info("Ollama has no /api/embed, falling back to one /api/embeddings request per text")
+                self._batch_endpoint = False
+            else:
+                self._batch_endpoint = True
+                return cast(List[List[float]], data.get("embeddings", []))
+        return list(await asyncio.gather(*(self._embed_one(text) for text in texts)))
 
     async def embed_text(self, text: str) -> List[float]:
         """
@@ -23,40 +128,80 @@ class EmbeddingService:
         Returns:
             List of float values representing the embedding vector
         """
-        api_key = os.getenv("OLLAMA_API_KEY")
-        if not api_key:
-            raise ValueError("OLLAMA_API_KEY environment variable is required")
-
-        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/embeddings",
-                json={"model": self.model, "prompt": text},
-                headers=headers,
-                timeout=30.0,
-            )
-            response.raise_for_status()
-            data = cast(Dict[str, Any], response.json())
-            emb = cast(List[float], data.get("embedding", []))
-            return emb
+        return (await self.embed_batch([text]))[0]
 
     async def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for multiple texts.
 
+        Cached texts and repeats within the call are only embedded once; the rest go out batch_size
+        per /api/embed request, at most max_concurrency requests at a time.
+        Empty texts get an empty vector without a request, as /api/embeddings returns for them.
+
         Args:
             texts: List of texts to embed
 
         Returns:
             List of embedding vectors
         """
-        embeddings = []
-        for text in texts:
-            embedding = await self.embed_text(text)
-            embeddings.append(embedding)
+        embeddings: List[List[float]] = [[] for _ in texts]
+        # one request per distinct key; positions that share it are filled from the same vector
+        positions: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text.strip():
+                key = EmbeddingCache.make_key(self.model, text) if self.cache is not None else text
+                positions.setdefault(key, []).append(i)
+
+        # the persistent tier reads and commits SQLite: keep that off the event loop
+        if self.cache is not None and positions:
+            for key, vec in (await asyncio.to_thread(self.cache.get_many, list(positions))).items():
+                for i in positions.pop(key):
+                    embeddings[i] = vec
+
+        keys = list(positions)
+        groups = [keys[i : i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        if not groups:
+            return embeddings
+
+        def _texts(group: List[str]) -> List[str]:
+            return [texts[positions[key][0]] for key in group]
+
+        results: List[List[List[float]]] = []
+        if self._batch_endpoint is None:
+            # find out which endpoint the server has before fanning out
+            results.append(await self._embed_group(_texts(groups[0])))
+            groups_left = groups[1:]
+        else:
+            groups_left = groups
+        results.extend(await asyncio.gather(*(self._embed_group(_texts(group)) for group in groups_left)))
+
+        fresh: Dict[str, List[float]] = {}
+        for group, vectors in zip(groups, results):
+            if len(vectors) != len(group):
+                raise ValueError(f"Expected {len(group)} embeddings, got {len(vectors)}")
+            fresh.update(zip(group, vectors))
+        for key, vec in fresh.items():
+            for i in positions[key]:
+                embeddings[i] = vec
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, fresh)
         return embeddings
 
 
+_embedding_service: Optional[EmbeddingService] = None
+
+
 def get_embedding_service() -> EmbeddingService:
-    return EmbeddingService()
+    """Shared instance, so ingestion and retrieval reuse one connection pool."""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService(
+            max_concurrency=int(os.getenv("EMBED_CONCURRENCY", "8")),
+            batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+            max_retries=int(os.getenv("EMBED_MAX_RETRIES", "4")),
+            cache=EmbeddingCache(
+                path=os.getenv("EMBED_CACHE_PATH", "embedding_cache/embeddings.sqlite3") or None,
+                max_entries=int(os.getenv("EMBED_CACHE_ENTRIES", "10000")),
+            ),
+        )
+    return _embedding_service
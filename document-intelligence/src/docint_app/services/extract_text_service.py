@@ -4,7 +4,7 @@ Extract Text Service using Ollama API
 
 import io
 import os
-from typing import List
+from typing import List, Optional
 
 import ollama
 from pdf2image import convert_from_path
@@ -20,10 +20,10 @@ class ExtractTextService:
         self.model = "gemma3:27b"
         self.client = ollama.Client(host=self.base_url, headers={"Authorization": f"Bearer {self.api_key}"})
 
-    def extract_text_from_slide(self, image: Image.Image) -> str:
+    def extract_text_from_slide(self, image: Image.Image) -> Optional[str]:
         """
         Extracts all text and formulas from a single slide image using Ollama API.
-        Returns the raw extracted text as a string.
+        Returns the raw extracted text as a string, or None if the request failed.
         """
         byte_arr = io.BytesIO()
         image.save(byte_arr, format="PNG")
@@ -47,28 +47,21 @@ class ExtractTextService:
                 print("Authentication failed. Please check your API key.")
             else:
                 print(f"An error occurred with status code {status_code}.")
-        return ""
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+        return None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> List[str]:
+    def rasterize_page(self, pdf_path: str, page_no: int, dpi: int = 200) -> Optional[Image.Image]:
         """
-        Converts a PDF to images and extracts text from each slide.
-        Returns a list of extracted text blocks (one per page).
+        Renders a single page (1-based) of the PDF, so only the pages being worked on are held in memory.
+        Returns None if the page cannot be rendered.
         """
         try:
-            pages = convert_from_path(pdf_path, 200)
-            print("successfully converted images")
+            pages = convert_from_path(pdf_path, dpi, first_page=page_no, last_page=page_no)
         except Exception as e:
-            print("Error converting PDF to images. Ensure Poppler is installed and the path is correct.")
-            print(f"Details: {e}")
-            return []
-        texts = []
-        for i, page in enumerate(pages):
-            slide_text_block = ""
-            extracted_text = self.extract_text_from_slide(page)
-            slide_text_block += extracted_text + "\n\n"
-            texts.append(slide_text_block)
-        self.save_texts_to_txt(texts, "lectureSlides/out.txt")
-        return texts
+            print(f"Error converting page {page_no} of the PDF to an image: {e}")
+            return None
+        return pages[0] if pages else None
 
     @staticmethod
     def save_texts_to_txt(texts: List[str], base_filename: str = "output.txt") -> None:
@@ -6,19 +6,43 @@ Processes PDF files by extracting text and images, generating descriptions, and
 import asyncio
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar, Union
+
+import fitz  # PyMuPDF
+from PIL import Image
 
 from docint_app.services.describe_images_service import get_image_description_service
+from docint_app.services.document_manifest import DocumentManifest, page_fingerprint
 from docint_app.services.extract_text_service import get_extract_text_service
-from docint_app.services.ingestion_service import IngestionService
+from docint_app.services.ingestion_service import IngestionService, _IngestResults
 from docint_app.services.pdf_image_extractor_service import get_pdf_image_extractor_service
 
 # Set up logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+T = TypeVar("T")
+
+DOCUMENT_ID_RE = re.compile(r"[\w.-]+")
+
+# documents stored or queued for processing in this process and not finished yet; a re-upload has to wait for them
+_documents_in_progress: Set[str] = set()
+
+
+def reserve_document(document_id: str) -> None:
+    """Claim a document until release_document(); raises ValueError while someone else holds it."""
+    if document_id in _documents_in_progress:
+        raise ValueError(f"Document '{document_id}' is still being processed")
+    _documents_in_progress.add(document_id)
+
+
+def release_document(document_id: str) -> None:
+    _documents_in_progress.discard(document_id)
+
 
 class PDFUploadService:
     def __init__(self, base_url: str = "http://docint-weaviate:28947", storage_dir: str = "uploaded_pdfs"):
@@ -28,6 +52,9 @@ class PDFUploadService:
         Args:
             base_url: Weaviate database URL
             storage_dir: Directory to store uploaded PDFs
+
+        Pages go through rasterize -> OCR, image extraction -> captioning, embed + upsert
+        independently; PDF_*_WORKERS bound each stage and PDF_PAGES_IN_FLIGHT the pages held at once.
         """
 
         base_url = os.getenv("WEAVIATE_URL", base_url)
@@ -38,32 +65,40 @@ class PDFUploadService:
             self.image_descriptor = get_image_description_service()
             self.ingestion_service = IngestionService(base_url=base_url)
             self.storage_dir = Path(storage_dir)
+            self.pages_in_flight = max(1, int(os.getenv("PDF_PAGES_IN_FLIGHT", "8")))
+            self.raster_workers = max(1, int(os.getenv("PDF_RASTER_WORKERS", "2")))
+            self.ocr_workers = max(1, int(os.getenv("PDF_OCR_WORKERS", "4")))
+            self.caption_workers = max(1, int(os.getenv("PDF_CAPTION_WORKERS", "4")))
+            self.ingest_workers = max(1, int(os.getenv("PDF_INGEST_WORKERS", "1")))
             self.storage_dir.mkdir(exist_ok=True)
             logger.info("Successfully initialized all PDF processing services")
         except Exception as e:
             logger.error(f"Failed to initialize PDFUploadService: {e}")
             raise
 
-    def _save_pdf(self, course_id: str, pdf_bytes: bytes) -> Tuple[str, str]:
+    def _save_pdf(self, course_id: str, pdf_bytes: bytes, document_id: Optional[str] = None) -> Tuple[str, str]:
         """
         Save PDF to storage with course name and timestamp.
 
         Args:
             course_id: Course identifier
             pdf_bytes: PDF file bytes
+            document_id: Existing document of the course to replace; a new one is created if None
 
         Returns:
             Tuple of (saved_file_path, document_id)
         """
-        # Create timestamp for unique file naming
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
         # Create course directory
         course_dir = self.storage_dir / course_id
         course_dir.mkdir(exist_ok=True)
 
-        # Generate document ID and filename
-        document_id = f"{course_id}_{timestamp}"
+        if document_id is None:
+            # Create timestamp for unique file naming
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            document_id = f"{course_id}_{timestamp}"
+        elif not DOCUMENT_ID_RE.fullmatch(document_id) or not (course_dir / f"{document_id}.pdf").exists():
+            raise FileNotFoundError(f"Document '{document_id}' does not exist in course '{course_id}'")
+
         filename = f"{document_id}.pdf"
         file_path = course_dir / filename
 
@@ -104,54 +139,242 @@ class PDFUploadService:
 
         return pdf_bytes
 
-    async def upload_pdf(self, course_id: str, body: Union[bytes, str, Tuple[str, bytes]]) -> str:
+    async def process_pages(
+        self,
+        course_id: str,
+        document_id: str,
+        pdf_path: str,
+        skip_pages: Optional[Set[int]] = None,
+        on_page: Optional[Callable[[int, bool], Awaitable[None]]] = None,
+    ) -> _IngestResults:
         """
-        Process and upload PDF to vector database.
+        Run every page through the pipeline, pages concurrently, each stage with its own bound.
+
+        Pages are fingerprinted (rendered page + extracted images) against the document's manifest:
+        unchanged pages are skipped, moved ones reuse their stored text and captions, and only new
+        content goes through OCR and captioning. Slides beyond the new page count are deleted.
+        The caller holds the document's reservation (see save_upload / reserve_document).
 
         Args:
             course_id: Unique course identifier
-            body: PDF file data
+            document_id: Unique document identifier
+            pdf_path: Saved PDF
+            skip_pages: 1-based pages already ingested by an earlier run
+            on_page: Awaited with (page_no, ok) as soon as a page is stored or has failed
 
         Returns:
-            Document ID string
+            Ingestion results of the whole document
         """
-        logger.info(f"Starting PDF upload for course_id: '{course_id}'")
+        loop = asyncio.get_running_loop()
+        # OCR, captioning, PyMuPDF and Weaviate are synchronous: one thread per stage worker
+        workers = self.raster_workers + self.ocr_workers + self.caption_workers + self.ingest_workers + 1
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-page")
+
+        def _run(fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+            return loop.run_in_executor(pool, fn, *args)
+
+        try:
+            pdf = await _run(fitz.open, pdf_path)
+        except BaseException:
+            pool.shutdown(wait=False)
+            raise
+        try:
+            page_count = len(pdf)
+            logger.info(f"Processing {page_count} pages ({self.pages_in_flight} at a time)")
+            await _run(self.ingestion_service.ensure_schema)
+            results = self.ingestion_service.new_results(course_id, document_id, page_count)
+            texts: List[str] = [""] * page_count
+
+            manifest = DocumentManifest(str(Path(pdf_path).with_suffix(".manifest.json")))
+            stored = dict(manifest.pages)  # what the store holds per slide before this run
+            known = manifest.by_fingerprint()
+
+            in_flight = asyncio.Semaphore(self.pages_in_flight)
+            raster = asyncio.Semaphore(self.raster_workers)
+            ocr = asyncio.Semaphore(self.ocr_workers)
+            pdf_lock = asyncio.Lock()  # one PyMuPDF document, one page at a time
+            caption = asyncio.Semaphore(self.caption_workers)
+            ingest = asyncio.Semaphore(self.ingest_workers)
+            manifest_lock = asyncio.Lock()
+
+            async def _save_manifest() -> None:
+                # snapshot on the loop, write in a thread; one write at a time, in the order the pages finished
+                async with manifest_lock:
+                    await asyncio.to_thread(manifest.write, manifest.dumps())
+
+            async def _raster(page_no: int) -> Optional[Image.Image]:
+                async with raster:
+                    return await _run(self.text_extractor.rasterize_page, pdf_path, page_no)
+
+            async def _extract(page_no: int) -> Optional[List[Dict[str, str]]]:
+                try:
+                    async with pdf_lock:
+                        return await _run(lambda: self.image_extractor.extract_page_images(pdf, pdf.load_page(page_no - 1), page_no))
+                except Exception as e:
+                    logger.error(f"Failed to extract images of page {page_no}: {e}")
+                    results["errors"].append(f"Slide {page_no} image extraction error: {e}")
+                    return None
+
+            async def _text(image: Optional[Image.Image]) -> Optional[str]:
+                if image is None:
+                    return ""
+                async with ocr:
+                    text = await _run(self.text_extractor.extract_text_from_slide, image)
+                return None if text is None else text + "\n\n"
+
+            async def _captions(page_no: int, items: List[Dict[str, str]]) -> List[Dict[str, Optional[str]]]:
+                if not items:
+                    return []
+                async with caption:
+                    return await _run(self.image_descriptor.caption_page_images, items, page_no)
+
+            async def _ingest(page_no: int, image: Optional[Image.Image], items: Optional[List[Dict[str, str]]], fingerprint: Optional[str]) -> bool:
+                previous = known.get(fingerprint) if fingerprint is not None else None
+                complete = True
+                if previous is not None and items is not None:
+                    # same content as a slide we already have, at another position
+                    text = previous["text"]
+                    images = [{"data": item["data"], "caption": cap} for item, cap in zip(items, previous["captions"])]
+                else:
+                    new_text, captioned = await asyncio.gather(_text(image), _captions(page_no, items or []))
+                    # store what we got, but keep the page out of the manifest so the next run tries again
+                    failed_captions = sum(img["caption"] is None for img in captioned)
+                    if new_text is None:
+                        results["errors"].append(f"Slide {page_no} OCR error")
+                    if failed_captions:
+                        results["errors"].append(f"Slide {page_no} caption error: {failed_captions}/{len(captioned)} images")
+                    complete = new_text is not None and not failed_captions
+                    text = new_text or ""
+                    images = [{"data": item["data"], "caption": img["caption"] or ""} for item, img in zip(items or [], captioned)]
+                texts[page_no - 1] = text
+
+                async with ingest:
+                    ok = await self.ingestion_service.ingest_slide(course_id, document_id, page_no, text, images, results)
+                    old = stored.get(page_no)
+                    if ok and stored and (old is None or len(old["captions"]) > len(images)):
+                        # the slide may have had more images before
+                        try:
+                            await _run(self.ingestion_service.delete_slide_images, document_id, page_no, len(images))
+                        except Exception as e:
+                            logger.error(f"Failed to delete old images of slide {page_no}: {e}")
+                            results["errors"].append(f"Slide {page_no} image cleanup error: {e}")
+                            ok = False
+                ok = ok and items is not None and complete
+                if ok and fingerprint is not None:
+                    manifest.set(page_no, {"fingerprint": fingerprint, "text": text, "captions": [img.get("caption", "") for img in images]})
+                else:
+                    manifest.set(page_no, None)
+                return ok
+
+            async def _page(page_no: int) -> None:
+                async with in_flight:
+                    try:
+                        image, items = await asyncio.gather(_raster(page_no), _extract(page_no))
+                        fingerprint = page_fingerprint(image, items) if image is not None and items is not None else None
+                        old = stored.get(page_no)
+                        if fingerprint is not None and old is not None and old["fingerprint"] == fingerprint:
+                            texts[page_no - 1] = old["text"]
+                            results["unchanged_slides"] += 1
+                            ok = True
+                        else:
+                            ok = await _ingest(page_no, image, items, fingerprint)
+                            await _save_manifest()
+                    except Exception as e:
+                        # a failed page must not take the other pages down with it
+                        logger.error(f"Failed to process page {page_no}: {e}")
+                        results["errors"].append(f"Slide {page_no} processing error: {e}")
+                        manifest.set(page_no, None)
+                        ok = False
+                logger.info(f"Page {page_no}/{page_count} done")
+                if on_page is not None:
+                    await on_page(page_no, ok)
+
+            skip = skip_pages or set()
+            tasks = [asyncio.ensure_future(_page(page_no)) for page_no in range(1, page_count + 1) if page_no not in skip]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # cancelled, or a listener failed: stop the other pages before the PDF and the pool go away
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            # slides a previous, longer version of the document had
+            try:
+                await _run(self.ingestion_service.delete_slides_after, document_id, page_count)
+                manifest.drop_after(page_count)
+                await _save_manifest()
+            except Exception as e:
+                logger.error(f"Failed to delete slides after {page_count}: {e}")
+                results["errors"].append(f"Cleanup error: {e}")
+        finally:
+            # calls already running in the pool may still use the PDF or write to the store: let them finish first
+            pool.shutdown(wait=False, cancel_futures=True)
+            await asyncio.to_thread(pool.shutdown)
+            pdf.close()
+
+        self.text_extractor.save_texts_to_txt(texts, "lectureSlides/out.txt")
+        logger.info(f"Ingestion completed. Processed {results['processed_slides']}/{results['total_slides']} slides ({results['unchanged_slides']} unchanged), {results['processed_images']}/{results['total_images']} images")
+        if results["errors"]:
+            logger.warning(f"Ingestion completed with {len(results['errors'])} errors")
+        return results
+
+    async def save_upload(self, course_id: str, body: Union[bytes, str, Tuple[str, bytes]], document_id: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Validate and store an uploaded PDF without processing it.
+
+        The document stays reserved until release_document(document_id): a replacement of a
+        document that is still queued or being processed is rejected instead of overwriting its PDF.
 
+        Args:
+            course_id: Unique course identifier
+            body: PDF file data
+            document_id: Existing document of the course to replace with this version
+
+        Returns:
+            Tuple of (saved_file_path, document_id)
+        """
         if not course_id or not course_id.strip():
             raise ValueError("course_id must be a non-empty string")
 
-        try:
-            # Step 1: Extract PDF bytes and save file
-            pdf_bytes = self._extract_pdf_bytes(body)
-            pdf_path, document_id = self._save_pdf(course_id, pdf_bytes)
-            logger.info(f"PDF saved with document ID: {document_id}")
+        pdf_bytes = self._extract_pdf_bytes(body)
+        if document_id is None:
+            pdf_path, new_document_id = await asyncio.to_thread(self._save_pdf, course_id, pdf_bytes)
+            reserve_document(new_document_id)
+            return pdf_path, new_document_id
 
-            # Step 2: Extract text from slides
-            slide_texts = self.text_extractor.extract_text_from_pdf(pdf_path)
-            logger.info(f"Extracted text from {len(slide_texts)} slides")
+        reserve_document(document_id)
+        try:
+            return await asyncio.to_thread(self._save_pdf, course_id, pdf_bytes, document_id)
+        except BaseException:
+            release_document(document_id)
+            raise
 
-            if not slide_texts:
-                logger.warning("No text extracted from PDF")
-                # Continue anyway - might have images
+    async def upload_pdf(self, course_id: str, body: Union[bytes, str, Tuple[str, bytes]], document_id: Optional[str] = None) -> str:
+        """
+        Process and upload PDF to vector database.
 
-            # Step 3: Extract images from PDF
-            images_by_page = self.image_extractor.extract_images_grouped(pdf_path)
-            total_images = sum(len(page_images) for page_images in images_by_page)
-            logger.info(f"Extracted {total_images} images from {len(images_by_page)} pages")
+        Args:
+            course_id: Unique course identifier
+            body: PDF file data
+            document_id: Existing document of the course to replace; only its changed pages are processed
 
-            # Ensure same number of pages for text and images
-            max_pages = max(len(slide_texts), len(images_by_page))
-            while len(slide_texts) < max_pages:
-                slide_texts.append("")
-            while len(images_by_page) < max_pages:
-                images_by_page.append([])
+        Returns:
+            Document ID string
+        """
+        logger.info(f"Starting PDF upload for course_id: '{course_id}'")
 
-            # Step 4: Generate image descriptions
-            described_images = self.image_descriptor.caption_images_grouped(images_by_page)
+        try:
+            # Step 1: Extract PDF bytes and save file
+            pdf_path, document_id = await self.save_upload(course_id, body, document_id)
+            logger.info(f"PDF saved with document ID: {document_id}")
 
-            # Step 5: Ingest into vector database
-            logger.info("Ingesting data into vector database...")
-            await self.ingestion_service.ingest(course_id=course_id, document_id=document_id, slide_texts=slide_texts, slide_images=described_images)
+            # Step 2: Stream the pages through OCR, image extraction + captioning and ingestion
+            try:
+                await self.process_pages(course_id, document_id, pdf_path)
+            finally:
+                release_document(document_id)
 
             logger.info(f"PDF upload completed successfully! Document ID: {document_id}")
             return document_id
@@ -0,0 +1,230 @@
+"""
+Upload Job Service
+Runs PDF ingestion in the background: an upload is stored and answered with its document ID right away,
+a pool of workers processes the queued documents, and per-page progress is pushed to listeners and kept
+in a job file next to the PDF, so a restarted service resumes unfinished jobs with the pages still missing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict, Union
+
+import fitz  # PyMuPDF
+
+from docint_app.services.pdf_upload_service import PDFUploadService, get_upload_pdf_service, release_document, reserve_document
+
+# Set up logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+UNFINISHED_STATES = ("QUEUED", "RUNNING")
+
+
+class _UploadJob(TypedDict):
+    # same keys as the UploadJob API schema, so the job file is also the response body
+    documentId: str
+    courseId: str
+    state: str
+    totalPages: int
+    pagesDone: List[int]
+    pagesFailed: List[int]
+    errors: List[str]
+
+
+_Listener = Callable[[_UploadJob], Awaitable[None]]
+
+
+def _count_pages(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as pdf:
+        return len(pdf)
+
+
+def _write_job_file(job_file: Path, data: str) -> None:
+    tmp_file = job_file.with_suffix(".tmp")
+    tmp_file.write_text(data)
+    os.replace(tmp_file, job_file)
+
+
+class UploadJobService:
+    def __init__(self, upload_service: Optional[PDFUploadService] = None, workers: int = 1):
+        """
+        Args:
+            upload_service: Pipeline the jobs run through; its storage_dir also holds the job files
+            workers: Documents processed at a time (each one already runs its pages concurrently)
+        """
+        self.upload_service = upload_service or get_upload_pdf_service()
+        self.workers = max(1, workers)
+        self.jobs: Dict[str, _UploadJob] = {}
+        self.listeners: Dict[str, Dict[str, _Listener]] = {}
+        self._pdf_paths: Dict[str, str] = {}
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._file_locks: Dict[str, asyncio.Lock] = {}
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    async def start(self) -> None:
+        """Start the workers and requeue the jobs a previous run did not finish."""
+        if self._tasks:
+            return
+        for job_file in sorted(self.upload_service.storage_dir.glob("*/*.job.json")):
+            try:
+                job: _UploadJob = json.loads(job_file.read_text())
+            except Exception as e:
+                logger.error(f"Skipping unreadable job file {job_file}: {e}")
+                continue
+            document_id = job["documentId"]
+            self.jobs[document_id] = job
+            self._pdf_paths[document_id] = str(job_file.with_name(f"{document_id}.pdf"))
+            if job["state"] in UNFINISHED_STATES:
+                try:
+                    reserve_document(document_id)
+                except ValueError as e:
+                    # replaced by a synchronous upload in the meantime; /resume can retry it later
+                    job["state"] = "FAILED"
+                    job["errors"].append(f"Job error: {e}")
+                    continue
+                logger.info(f"Resuming upload job {document_id} ({len(job['pagesDone'])}/{job['totalPages']} pages done)")
+                job["state"] = "QUEUED"
+                self._queue.put_nowait(document_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} upload job worker(s), {self._queue.qsize()} job(s) queued")
+
+    async def stop(self) -> None:
+        """Cancel the workers; running jobs stay RUNNING on disk and resume on the next start()."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, course_id: str, body: Union[bytes, str, Tuple[str, bytes]], document_id: Optional[str] = None) -> str:
+        """
+        Store the PDF and queue it for ingestion; the document stays reserved until its job is DONE or FAILED.
+
+        Args:
+            course_id: Unique course identifier
+            body: PDF file data
+            document_id: Existing document of the course to replace; only its changed pages are processed
+
+        Returns:
+            Document ID string
+        """
+        await self.start()
+        pdf_path, document_id = await self.upload_service.save_upload(course_id, body, document_id)
+        job: _UploadJob = {
+            "documentId": document_id,
+            "courseId": course_id,
+            "state": "QUEUED",
+            "totalPages": 0,
+            "pagesDone": [],
+            "pagesFailed": [],
+            "errors": [],
+        }
+        self.jobs[document_id] = job
+        self._pdf_paths[document_id] = pdf_path
+        try:
+            await self._publish(job)
+        except BaseException:
+            release_document(document_id)
+            raise
+        self._queue.put_nowait(document_id)
+        logger.info(f"Queued upload job {document_id} ({self._queue.qsize()} in queue)")
+        return document_id
+
+    def get_job(self, document_id: str) -> Optional[_UploadJob]:
+        return self.jobs.get(document_id)
+
+    async def resume(self, document_id: str) -> Optional[_UploadJob]:
+        """Queue a FAILED job again; only its failed pages are processed. Other jobs are left as they are."""
+        await self.start()
+        job = self.jobs.get(document_id)
+        if job is not None and job["state"] == "FAILED":
+            try:
+                reserve_document(document_id)
+            except ValueError as e:
+                logger.warning(f"Not requeueing upload job {document_id}: {e}")
+                return job
+            job["state"] = "QUEUED"
+            await self._publish(job)
+            self._queue.put_nowait(document_id)
+            logger.info(f"Requeued upload job {document_id}")
+        return job
+
+    async def add_listener(self, document_id: str, reference: str, listener: _Listener) -> None:
+        """Subscribe to updates of a job; the current state is sent right away."""
+        self.listeners.setdefault(document_id, {})[reference] = listener
+        job = self.jobs.get(document_id)
+        if job is not None:
+            await listener(job)
+
+    def remove_listener(self, document_id: str, reference: str) -> None:
+        listeners = self.listeners.get(document_id)
+        if listeners is None:
+            return
+        listeners.pop(reference, None)
+        if not listeners:
+            self.listeners.pop(document_id, None)
+
+    async def _publish(self, job: _UploadJob) -> None:
+        # written on every page: what is in the file is what a restart will skip
+        job_file = Path(self._pdf_paths[job["documentId"]]).with_suffix(".job.json")
+        # pages finish concurrently: one write at a time per job, in the order the updates happened
+        async with self._file_locks.setdefault(job["documentId"], asyncio.Lock()):
+            await asyncio.to_thread(_write_job_file, job_file, json.dumps(job))
+
+        for reference, listener in list(self.listeners.get(job["documentId"], {}).items()):
+            try:
+                await listener(job)
+            except Exception as e:
+                logger.warning(f"Dropping listener {reference} of upload job {job['documentId']}: {e}")
+                self.remove_listener(job["documentId"], reference)
+
+    async def _worker(self) -> None:
+        while True:
+            document_id = await self._queue.get()
+            job = self.jobs[document_id]
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Upload job {document_id} failed: {e}")
+                job["state"] = "FAILED"
+                job["errors"].append(f"Job error: {e}")
+                await self._publish(job)
+            finally:
+                self._queue.task_done()
+            release_document(document_id)
+
+    async def _run(self, job: _UploadJob) -> None:
+        document_id = job["documentId"]
+        pdf_path = self._pdf_paths[document_id]
+        job["state"] = "RUNNING"
+        job["pagesFailed"] = []
+        job["errors"] = []
+        if not job["totalPages"]:
+            job["totalPages"] = await asyncio.to_thread(_count_pages, pdf_path)
+        await self._publish(job)
+
+        async def on_page(page_no: int, ok: bool) -> None:
+            (job["pagesDone"] if ok else job["pagesFailed"]).append(page_no)
+            await self._publish(job)
+
+        results = await self.upload_service.process_pages(job["courseId"], document_id, pdf_path, skip_pages=set(job["pagesDone"]), on_page=on_page)
+
+        job["pagesDone"].sort()
+        job["pagesFailed"].sort()
+        job["errors"] = results["errors"]
+        job["state"] = "FAILED" if job["pagesFailed"] else "DONE"
+        await self._publish(job)
+        logger.info(f"Upload job {document_id} {job['state']}: {len(job['pagesDone'])}/{job['totalPages']} pages")
+
+
+_upload_job_service: Optional[UploadJobService] = None
+
+
+def get_upload_job_service() -> UploadJobService:
+    """Shared instance: the queue, the workers and the listeners live for the whole app."""
+    global _upload_job_service
+    if _upload_job_service is None:
+        _upload_job_service = UploadJobService(workers=int(os.getenv("UPLOAD_JOB_WORKERS", "1")))
+    return _upload_job_service
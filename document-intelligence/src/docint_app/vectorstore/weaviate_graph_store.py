@@ -22,6 +22,7 @@ WeaviateGraphStore — graph-first vector store wrapper (requests-based)
   * ensure_schema()               -> idempotent schema creation + reference property
   * upsert_slide(...)             -> create/replace Slide with text vector
   * upsert_images_and_link(...)   -> create SlideImage objects + link to Slide.images
+  * delete_slides_after(...) / delete_slide_images(...) -> drop what a re-ingested document no longer has
   * search_slides_with_images(...) -> single GraphQL query: ANN + traverse images
   * to_retrieval_response(...)    -> map hits -> OpenAPI RetrievalResponse
 
@@ -360,6 +361,62 @@ class WeaviateGraphStore:
 
         return created_ids
 
+    # Deletes (for documents that are ingested again)
+    def delete_slides_after(self, *, document_id: str, last_slide_no: int) -> None:
+        """
+        Delete the Slide and SlideImage objects of a document whose slideNo is beyond last_slide_no
+        (the pages a shorter re-upload no longer has).
+        Batch endpoint: DELETE /v1/batch/objects with a where filter
+        """
+        for class_name in ("SlideImage", "Slide"):
+            self._delete(
+                "/v1/batch/objects",
+                {
+                    "match": {
+                        "class": class_name,
+                        "where": {
+                            "operator": "And",
+                            "operands": [
+                                {"operator": "Equal", "path": ["documentId"], "valueText": document_id},
+                                {"operator": "GreaterThan", "path": ["slideNo"], "valueInt": int(last_slide_no)},
+                            ],
+                        },
+                    }
+                },
+            )
+
+    def delete_slide_images(self, *, document_id: str, slide_no: int, keep: int) -> List[str]:
+        """
+        Delete the SlideImage objects of a slide other than its first `keep` images
+        (left over when a re-ingested slide has fewer images than before).
+        :return: UUIDs of the deleted images
+        """
+        keep_ids = {self._default_image_uuid(document_id, slide_no, idx) for idx in range(1, keep + 1)}
+        gql = f"""
+        {{
+          Get {{
+            SlideImage(
+              where: {{
+                operator: And
+                operands: [
+                  {{ operator: Equal, path: ["documentId"], valueText: {json.dumps(document_id)} }},
+                  {{ operator: Equal, path: ["slideNo"],  valueInt: {int(slide_no)} }}
+                ]
+              }}
+              limit: 1000
+            ) {{
+              _additional {{ id }}
+            }}
+          }}
+        }}
+        """
+        res = self._post("/v1/graphql", {"query": gql})
+        found = [(im.get("_additional") or {}).get("id") for im in res.get("data", {}).get("Get", {}).get("SlideImage", []) or []]
+        deleted = [img_id for img_id in found if img_id and img_id not in keep_ids]
+        for img_id in deleted:
+            self._delete(f"/v1/objects/SlideImage/{img_id}")
+        return deleted
+
     # Query (dual-channel with fusion: text on Slide + image-description on SlideImage)
     def search_slides_fused_with_images(
         self,